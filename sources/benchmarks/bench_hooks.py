@@ -0,0 +1,286 @@
+""" Микробенчмарки методов-хуков middleware с сохранением базовых значений.
+
+    Измеряет время одного вызова (в наносекундах) для:
+
+    - KwargsHandler.make_handler_kwargs (обработчики read и info);
+    - get_error_body (SimpleHandler и WrapsKwargsHandler);
+    - SimpleHandler.get_json_dumps и WrapsKwargsHandler.get_json_dumps_bytes
+      (оболочка ответа с экземплярами PersonInfo);
+    - создания экземпляра WrapRequest и быстрой валидации оболочки запроса
+      (WrapsKwargsHandler.get_wrap_request);
+    - WrapResponse.dict().
+
+    Методы вызываются с запросами из make_mocked_request, данные - списки
+    из 1, 10 и 100 персон. Все хуки измеряются --runs раз (проходами по
+    всем хукам, поэтому кратковременная нагрузка на машину попадает в один
+    проход, а не во все измерения хука). В проходе время вызова - минимум по
+    REPEAT повторам (количество вызовов в повторе подбирается так, чтобы
+    повтор длился не меньше 0.2 секунды), а результат - медиана по
+    проходам. Шум хука - разброс времени по проходам (в процентах от
+    медианы).
+
+    С ключом --save результаты сохраняются как базовые значения (в
+    BASELINE_PATH). Без него результаты сравниваются с базовыми значениями,
+    и, если какой-то хук стал медленнее больше, чем на --threshold
+    процентов (и больше, чем на NOISE_FACTOR его шумов), бенчмарк
+    завершается с кодом 1 (для проверки в CI). Базовые значения зависят от
+    машины, поэтому их нужно сохранять на той же машине (в том же окружении
+    CI), на которой выполняется сравнение. Порог по умолчанию выбран выше
+    шума, измеренного в этом окружении.
+
+    Запуск (из каталога sources):
+
+        PYTHONPATH=. python benchmarks/bench_hooks.py --save
+        PYTHONPATH=. python benchmarks/bench_hooks.py --threshold 40
+        PYTHONPATH=. python benchmarks/bench_hooks.py --filter wrap
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import timeit
+from typing import Any, Callable, Dict, List, Tuple
+from uuid import uuid4
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from data_classes.person import PersonInfo
+from data_classes.wraps import WrapRequest, WrapResponse
+from handlers.wraps import info, read
+from middlewares.simple_handler import SimpleHandler
+from middlewares.utils import ArgumentsManager
+from middlewares.wraps_handler import WrapsKwargsHandler
+
+BASELINE_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "baselines", "hooks.json"
+)
+
+SIZES = (1, 10, 100)
+REPEAT = 3
+RUNS = 5
+# Замедление меньше этого количества шумов хука регрессией не считается
+NOISE_FACTOR = 2
+
+
+def run_coroutine(coroutine) -> Any:
+    """ Выполняет корутину, которая ничего не ждет (без цикла событий).
+    """
+    try:
+        coroutine.send(None)
+    except StopIteration as stop:
+        return stop.value
+
+    raise RuntimeError("Coroutine is suspended")
+
+
+def get_wraps_handler() -> WrapsKwargsHandler:
+
+    arguments_manager = ArgumentsManager()
+    arguments_manager.reg_request_body("data")
+    arguments_manager.reg_app_key("storage")
+    arguments_manager.reg_match_info_key("info_id")
+
+    return WrapsKwargsHandler(arguments_manager=arguments_manager)
+
+
+def get_cases() -> List[Tuple[str, Callable[[], Any]]]:
+    """ Возвращает список пар (имя, функция без аргументов).
+    """
+    app = web.Application()
+    app["storage"] = {}
+    request = make_mocked_request(
+        "POST", "/info/1", app=app, match_info={"info_id": "1"}
+    )
+    error = ValueError("Some error")
+
+    simple_handler = SimpleHandler()
+    wraps_handler = get_wraps_handler()
+
+    cases = [
+        (
+            "make_handler_kwargs/read",
+            lambda: wraps_handler.make_handler_kwargs(request, read, "id"),
+        ),
+        (
+            "make_handler_kwargs/info",
+            lambda: wraps_handler.make_handler_kwargs(request, info, None),
+        ),
+        (
+            "get_error_body/simple",
+            lambda: simple_handler.get_error_body(request, error),
+        ),
+        (
+            "get_error_body/wraps",
+            lambda: wraps_handler.get_error_body(request, error),
+        ),
+    ]
+
+    for size in SIZES:
+        persons = [{"id": str(uuid4()), "name": "Ivan"}] * size
+        models = [PersonInfo(id=uuid4(), name="Ivan")] * size
+        wrap_request = {"data": [{"name": "Ivan"}] * size, "id": 1}
+        wrap_response = WrapResponse(success=True, result=models, id=1)
+
+        cases += [
+            (
+                f"json_dumps/simple/{size}",
+                lambda persons=persons: run_coroutine(
+                    simple_handler.get_json_dumps(request, persons)
+                ),
+            ),
+            (
+                f"json_dumps_bytes/wraps/{size}",
+                lambda models=models: run_coroutine(
+                    wraps_handler.get_json_dumps_bytes(
+                        request, wraps_handler.get_wrap_response(models, 1)
+                    )
+                ),
+            ),
+            (
+                f"WrapRequest/{size}",
+                lambda wrap_request=wrap_request: WrapRequest(**wrap_request),
+            ),
+            (
+                f"get_wrap_request/{size}",
+                lambda wrap_request=wrap_request: (
+                    wraps_handler.get_wrap_request(wrap_request)
+                ),
+            ),
+            (
+                f"WrapResponse.dict/{size}",
+                wrap_response.dict,
+            ),
+        ]
+
+    return cases
+
+
+def measure(func: Callable[[], Any]) -> float:
+    """ Возвращает время одного вызова func в наносекундах.
+    """
+    timer = timeit.Timer(func)
+
+    # Количество вызовов, которые выполняются не меньше 0.2 секунды
+    number, _ = timer.autorange()
+
+    return min(timer.repeat(REPEAT, number)) / number * 1e9
+
+
+def measure_runs(
+    cases: List[Tuple[str, Callable[[], Any]]], runs: int
+) -> Tuple[Dict[str, float], Dict[str, float]]:
+    """ Измеряет хуки runs проходами, и возвращает словари с медианами
+        времени вызова (в наносекундах) и шумом (в процентах).
+    """
+    values: Dict[str, List[float]] = {name: [] for name, _ in cases}
+
+    for _ in range(runs):
+        for name, func in cases:
+            values[name].append(measure(func))
+
+    results = {}
+    noise = {}
+    for name, times in values.items():
+        median = statistics.median(times)
+        results[name] = round(median, 1)
+        noise[name] = round((max(times) - min(times)) / median * 100, 1)
+
+    return results, noise
+
+
+def compare(
+    results: Dict[str, float], noise: Dict[str, float],
+    baseline: Dict[str, float], threshold: float,
+) -> List[str]:
+    """ Печатает сравнение results с baseline и возвращает имена хуков,
+        которые стали медленнее больше, чем на threshold процентов (и
+        больше, чем на NOISE_FACTOR их шумов).
+    """
+    regressions = []
+
+    for name, value in results.items():
+        if name not in baseline:
+            print(f"{name:>30}: {value:10.1f} ns (no baseline)")
+            continue
+
+        change = (value / baseline[name] - 1) * 100
+        mark = ""
+        if change > max(threshold, NOISE_FACTOR * noise[name]):
+            regressions.append(name)
+            mark = " REGRESSION"
+
+        print(
+            f"{name:>30}: {value:10.1f} ns, baseline {baseline[name]:10.1f}"
+            f" ns, {change:+6.1f}%, noise {noise[name]:5.1f}%{mark}"
+        )
+
+    return regressions
+
+
+def get_args() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--save", action="store_true",
+        help="сохранить результаты как базовые значения",
+    )
+    parser.add_argument(
+        "--threshold", type=float, default=40.0,
+        help="допустимое замедление относительно базового значения, в %%",
+    )
+    parser.add_argument(
+        "--runs", type=int, default=RUNS, help="количество проходов",
+    )
+    parser.add_argument(
+        "--filter", default="", help="измерять только хуки с этой подстрокой",
+    )
+    parser.add_argument("--baseline", default=BASELINE_PATH)
+
+    return parser.parse_args()
+
+
+def main() -> None:
+
+    args = get_args()
+
+    cases = [(name, func) for name, func in get_cases() if args.filter in name]
+    results, noise = measure_runs(cases, args.runs)
+
+    if args.save:
+        baseline = {}
+        if os.path.exists(args.baseline):
+            with open(args.baseline) as baseline_file:
+                baseline = json.load(baseline_file)
+        baseline.update(results)
+
+        os.makedirs(os.path.dirname(args.baseline), exist_ok=True)
+        with open(args.baseline, "w") as baseline_file:
+            json.dump(baseline, baseline_file, indent=2, sort_keys=True)
+            baseline_file.write("\n")
+
+        for name, value in results.items():
+            print(
+                f"{name:>30}: {value:10.1f} ns, noise {noise[name]:5.1f}% "
+                f"(saved)"
+            )
+        return
+
+    if not os.path.exists(args.baseline):
+        sys.exit(f"No baseline {args.baseline}, run with --save first")
+
+    with open(args.baseline) as baseline_file:
+        baseline = json.load(baseline_file)
+
+    regressions = compare(results, noise, baseline, args.threshold)
+    if regressions:
+        sys.exit(
+            f"{len(regressions)} hook(s) slower than baseline by more than "
+            f"{args.threshold}%: {', '.join(regressions)}"
+        )
+
+
+if __name__ == "__main__":
+
+    main()
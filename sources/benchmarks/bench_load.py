@@ -0,0 +1,323 @@
+""" Нагрузочный бенчмарк сервисов run_simple, run_kwargs и run_wraps.
+
+    Каждый сервис запускается в отдельном процессе на localhost (как при
+    обычном запуске, см. launcher) и нагружается асинхронным генератором
+    запросов. Сценарии:
+
+    - run_simple: эхо-запросы /some_handler с небольшим, средним и большим
+      телом;
+    - run_kwargs и run_wraps: создание одной, PERSONS_MEDIUM и PERSONS_BULK
+      персон (/create) и чтение персоны по id (/read).
+
+    Каждый сценарий выполняется для каждого уровня одновременности
+    (количества соединений). Для каждого прогона печатается (в формате json)
+    пропускная способность (запросов в секунду), задержки p50/p95/p99 в
+    миллисекундах, количество ответов с ошибками и объем памяти процесса
+    сервиса (RSS, после прогона).
+
+    Запуск (из каталога sources):
+
+        PYTHONPATH=. python benchmarks/bench_load.py
+        PYTHONPATH=. python benchmarks/bench_load.py --variants run_wraps \\
+            --concurrency 1 10 100 --requests 5000 --output result.json
+
+    Настройки сервисов берутся из переменных окружения (см. settings),
+    например, STORAGE=sqlite python benchmarks/bench_load.py
+"""
+import argparse
+import asyncio
+import contextlib
+import importlib
+import json
+import multiprocessing
+import os
+import platform
+import socket
+import sys
+import time
+from dataclasses import dataclass
+from itertools import cycle
+from typing import Dict, List, Optional
+
+import aiohttp
+from aiohttp import ClientSession, TCPConnector
+
+from launcher import run
+
+VARIANTS = ("run_simple", "run_kwargs", "run_wraps")
+
+PERSONS_MEDIUM = 100
+PERSONS_BULK = 5_000
+READ_PERSONS = 1_000
+
+
+@dataclass
+class Scenario:
+    """ Сценарий нагрузки: запросы POST к path с телами из bodies (по
+        кругу).
+    """
+    name: str
+    path: str
+    bodies: List[bytes]
+    # Количество запросов в прогоне делится на это значение (для сценариев
+    # с большими телами)
+    requests_divisor: int = 1
+
+
+def get_persons(count: int) -> List[dict]:
+
+    return [{"name": f"Person {i}"} for i in range(count)]
+
+
+def wrap(data, variant: str, id_: int = 1) -> bytes:
+    """ Тело запроса для сервиса variant (в run_wraps данные передаются в
+        оболочке).
+    """
+    if variant == "run_wraps":
+        data = {"data": data, "id": id_}
+
+    return json.dumps(data).encode()
+
+
+def get_echo_scenarios() -> List[Scenario]:
+
+    return [
+        Scenario("echo_small", "/some_handler", [wrap({"a": 1}, "")]),
+        Scenario(
+            "echo_medium", "/some_handler",
+            [wrap(get_persons(PERSONS_MEDIUM), "")], 10,
+        ),
+        Scenario(
+            "echo_bulk", "/some_handler",
+            [wrap(get_persons(PERSONS_BULK), "")], 100,
+        ),
+    ]
+
+
+def get_create_scenarios(variant: str) -> List[Scenario]:
+
+    return [
+        Scenario("create_small", "/create", [wrap({"name": "Ivan"}, variant)]),
+        Scenario(
+            "create_medium", "/create",
+            [wrap(get_persons(PERSONS_MEDIUM), variant)], 10,
+        ),
+        Scenario(
+            "create_bulk", "/create",
+            [wrap(get_persons(PERSONS_BULK), variant)], 100,
+        ),
+    ]
+
+
+async def get_read_scenario(url: str, variant: str) -> Scenario:
+    """ Создает READ_PERSONS персон и возвращает сценарий чтения их по id.
+    """
+    async with ClientSession() as session:
+        async with session.post(
+            url + "/create", data=wrap(get_persons(READ_PERSONS), variant)
+        ) as response:
+            persons = await response.json()
+
+    if variant == "run_wraps":
+        persons = persons["result"]
+
+    return Scenario("read", "/read", [
+        wrap(person["id"], variant, i) for i, person in enumerate(persons)
+    ])
+
+
+def get_free_port() -> int:
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_service(variant: str, port: int) -> None:
+
+    # Строка о запуске сервиса не должна попасть в результаты
+    sys.stdout = open(os.devnull, "w")
+
+    module = importlib.import_module(variant)
+    run(module.get_app, "127.0.0.1", port)
+
+
+def get_rss_mb(pid: int) -> Optional[float]:
+    """ Объем памяти процесса pid (RSS) в мегабайтах (None, если его
+        нельзя узнать).
+    """
+    with contextlib.suppress(OSError):
+        with open(f"/proc/{pid}/status") as status:
+            for line in status:
+                if line.startswith("VmRSS:"):
+                    return round(int(line.split()[1]) / 1024, 1)
+
+    return None
+
+
+def get_percentile(values: List[float], percent: float) -> float:
+    """ Значение перцентиля percent из отсортированного списка values.
+    """
+    index = max(0, int(len(values) * percent / 100 + 0.5) - 1)
+
+    return values[min(index, len(values) - 1)]
+
+
+async def wait_service(url: str, timeout: float = 30.0) -> None:
+
+    deadline = time.monotonic() + timeout
+
+    async with ClientSession() as session:
+        while True:
+            try:
+                async with session.get(url + "/"):
+                    return
+            except aiohttp.ClientConnectionError:
+                if time.monotonic() > deadline:
+                    raise
+                await asyncio.sleep(0.1)
+
+
+async def send_requests(
+    session: ClientSession, url: str, bodies, count: int,
+    latencies: List[float], errors: List[int],
+) -> None:
+
+    headers = {"Content-Type": "application/json"}
+
+    for _ in range(count):
+        started = time.perf_counter()
+        async with session.post(
+            url, data=next(bodies), headers=headers
+        ) as response:
+            await response.read()
+        latencies.append(time.perf_counter() - started)
+
+        if response.status != 200:
+            errors.append(response.status)
+
+
+async def run_scenario(
+    url: str, scenario: Scenario, concurrency: int, requests: int,
+) -> Dict:
+    """ Выполняет прогон сценария и возвращает его результаты.
+    """
+    requests = max(concurrency, requests // scenario.requests_divisor)
+    bodies = cycle(scenario.bodies)
+    latencies: List[float] = []
+    errors: List[int] = []
+
+    connector = TCPConnector(limit=concurrency)
+    async with ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            send_requests(
+                session, url + scenario.path, bodies,
+                requests // concurrency, latencies, errors,
+            )
+            for _ in range(concurrency)
+        ))
+        elapsed = time.perf_counter() - started
+
+    latencies.sort()
+
+    return {
+        "scenario": scenario.name,
+        "concurrency": concurrency,
+        "requests": len(latencies),
+        "errors": len(errors),
+        "rps": round(len(latencies) / elapsed, 1),
+        "p50_ms": round(get_percentile(latencies, 50) * 1e3, 3),
+        "p95_ms": round(get_percentile(latencies, 95) * 1e3, 3),
+        "p99_ms": round(get_percentile(latencies, 99) * 1e3, 3),
+    }
+
+
+async def run_variant(
+    variant: str, url: str, pid: int, concurrency: List[int], requests: int,
+) -> List[Dict]:
+
+    await wait_service(url)
+
+    if variant == "run_simple":
+        scenarios = get_echo_scenarios()
+    else:
+        scenarios = get_create_scenarios(variant)
+        scenarios.append(await get_read_scenario(url, variant))
+
+    results = []
+    for scenario in scenarios:
+        for connections in concurrency:
+            result = await run_scenario(url, scenario, connections, requests)
+            result["variant"] = variant
+            result["rss_mb"] = get_rss_mb(pid)
+            results.append(result)
+
+            print(
+                f"{variant:>10} {scenario.name:>13} c={connections:<4} "
+                f"{result['rps']:9.1f} rps, p99 {result['p99_ms']:8.2f} ms",
+                file=sys.stderr,
+            )
+
+    return results
+
+
+def get_args() -> argparse.Namespace:
+
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[0])
+    parser.add_argument(
+        "--variants", nargs="+", choices=VARIANTS, default=list(VARIANTS),
+    )
+    parser.add_argument(
+        "--concurrency", nargs="+", type=int, default=[1, 10, 50],
+        help="уровни одновременности (количество соединений)",
+    )
+    parser.add_argument(
+        "--requests", type=int, default=2_000,
+        help="количество запросов в прогоне небольших запросов",
+    )
+    parser.add_argument(
+        "--output", help="файл для результатов (по умолчанию - stdout)",
+    )
+
+    return parser.parse_args()
+
+
+def main() -> None:
+
+    args = get_args()
+    context = multiprocessing.get_context("spawn")
+
+    results = []
+    for variant in args.variants:
+        port = get_free_port()
+        process = context.Process(target=run_service, args=(variant, port))
+        process.start()
+
+        try:
+            results.extend(asyncio.run(run_variant(
+                variant, f"http://127.0.0.1:{port}", process.pid,
+                args.concurrency, args.requests,
+            )))
+        finally:
+            process.terminate()
+            process.join()
+
+    report = {
+        "python": platform.python_version(),
+        "aiohttp": aiohttp.__version__,
+        "cpu_count": os.cpu_count(),
+        "results": results,
+    }
+
+    if args.output:
+        with open(args.output, "w") as output:
+            json.dump(report, output, indent=2)
+    else:
+        json.dump(report, sys.stdout, indent=2)
+        print()
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,103 @@
+""" Микробенчмарк сборки kwargs для обработчика.
+
+    Сравнивает текущий KwargsHandler.make_handler_kwargs (с планами
+    аргументов, собранными один раз) с прежним способом, при котором на
+    каждый запрос копировались аннотации обработчика, создавался
+    RawDataForArgument и выполнялся поиск в ArgumentsManager.getters.
+
+    Запуск (из каталога sources):
+
+        PYTHONPATH=. python benchmarks/bench_make_handler_kwargs.py
+"""
+import timeit
+from copy import copy
+from typing import Any, Callable
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from handlers.wraps import info, read
+from middlewares.kwargs_handler import KwargsHandler
+from middlewares.utils import ArgumentsManager, RawDataForArgument
+
+NUMBER = 200_000
+
+
+def legacy_make_handler_kwargs(
+    arguments_manager: ArgumentsManager, request: web.Request,
+    handler: Callable, request_body: Any
+) -> dict:
+    """ Прежняя реализация KwargsHandler.make_handler_kwargs.
+    """
+    kwargs = {}
+
+    annotations = copy(handler.__annotations__)
+    annotations.pop("return", None)
+
+    raw_data = RawDataForArgument(request, request_body)
+
+    for arg_name, annotation in annotations.items():
+
+        if annotation is web.Request:
+            kwargs[arg_name] = request
+            continue
+
+        raw_data.arg_name = arg_name
+        get_arg_value = arguments_manager.getters[arg_name]
+        kwargs[arg_name] = get_arg_value(raw_data)
+
+    return kwargs
+
+
+def get_arguments_manager() -> ArgumentsManager:
+
+    arguments_manager = ArgumentsManager()
+    arguments_manager.reg_request_body("data")
+    arguments_manager.reg_app_key("storage")
+    arguments_manager.reg_match_info_key("info_id")
+
+    return arguments_manager
+
+
+def main() -> None:
+
+    app = web.Application()
+    app["storage"] = {}
+
+    request = make_mocked_request(
+        "POST", "/info/1", app=app, match_info={"info_id": "1"}
+    )
+    arguments_manager = get_arguments_manager()
+    kwargs_handler = KwargsHandler(arguments_manager=arguments_manager)
+
+    for handler in (read, info):
+
+        legacy = legacy_make_handler_kwargs(
+            arguments_manager, request, handler, "body"
+        )
+        current = kwargs_handler.make_handler_kwargs(request, handler, "body")
+        assert legacy == current
+
+        legacy_time = timeit.timeit(
+            lambda: legacy_make_handler_kwargs(
+                arguments_manager, request, handler, "body"
+            ),
+            number=NUMBER,
+        )
+        current_time = timeit.timeit(
+            lambda: kwargs_handler.make_handler_kwargs(
+                request, handler, "body"
+            ),
+            number=NUMBER,
+        )
+        print(
+            f"{handler.__name__:>8}: "
+            f"legacy {legacy_time / NUMBER * 1e9:8.1f} ns/call, "
+            f"plan {current_time / NUMBER * 1e9:8.1f} ns/call, "
+            f"x{legacy_time / current_time:.2f}"
+        )
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,101 @@
+""" Микробенчмарк накладных расходов метрик middleware.
+
+    Измеряет, сколько на один запрос добавляет таймер этапов (четыре отметки
+    этапов и отправка длительностей в гистограммы), по сравнению с
+    NullTimer (метрики выключены). Затем сравнивает полный проход запроса
+    через middleware с метриками и без них.
+
+    Запуск (из каталога sources):
+
+        PYTHONPATH=. python benchmarks/bench_metrics.py
+"""
+import asyncio
+import timeit
+
+from aiohttp import web
+from aiohttp.test_utils import make_mocked_request
+
+from middlewares.metrics import NULL_TIMER, Metrics
+from middlewares.simple_handler import SimpleHandler
+
+NUMBER = 200_000
+REQUESTS = 20_000
+
+
+def run_timer(metrics: Metrics) -> None:
+
+    timer = metrics.get_timer("/some_handler")
+    timer.mark("request_body")
+    timer.mark("handler")
+    timer.mark("response")
+    timer.finish(200)
+
+
+def run_null_timer() -> None:
+
+    timer = NULL_TIMER
+    timer.mark("request_body")
+    timer.mark("handler")
+    timer.mark("response")
+    timer.finish(200)
+
+
+async def some_handler(request: web.Request, data: dict) -> dict:
+    return data
+
+
+class FakeRequest(dict):
+    """ Замена web.Request с готовым телом запроса (как и web.Request -
+        словарь для данных middleware).
+    """
+    def __init__(self, match_info: web.UrlMappingMatchInfo, body: bytes):
+        super().__init__()
+        self.match_info = match_info
+        self.body = body
+
+    async def read(self) -> bytes:
+        return self.body
+
+
+async def run_requests(service_handler: SimpleHandler) -> float:
+
+    app = web.Application()
+    app.router.add_post("/some_handler", some_handler)
+
+    match_info = await app.router.resolve(
+        make_mocked_request("POST", "/some_handler", app=app)
+    )
+    request = FakeRequest(match_info, b'{"name": "Ivan"}')
+    middleware = service_handler.middleware
+
+    started = timeit.default_timer()
+    for _ in range(REQUESTS):
+        await middleware(request, some_handler)
+
+    return timeit.default_timer() - started
+
+
+def main() -> None:
+
+    metrics = Metrics()
+
+    timer_time = timeit.timeit(lambda: run_timer(metrics), number=NUMBER)
+    null_time = timeit.timeit(run_null_timer, number=NUMBER)
+    print(
+        f"timer: {timer_time / NUMBER * 1e9:8.1f} ns/request, "
+        f"null timer: {null_time / NUMBER * 1e9:8.1f} ns/request, "
+        f"overhead: {(timer_time - null_time) / NUMBER * 1e6:.2f} us/request"
+    )
+
+    without_metrics = asyncio.run(run_requests(SimpleHandler()))
+    with_metrics = asyncio.run(run_requests(SimpleHandler(metrics=Metrics())))
+    print(
+        f"middleware: without metrics "
+        f"{without_metrics / REQUESTS * 1e6:6.2f} us/request, "
+        f"with metrics {with_metrics / REQUESTS * 1e6:6.2f} us/request"
+    )
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,115 @@
+""" Бенчмарк задержки небольших запросов на фоне больших.
+
+    Запускает сервис run_wraps (в этом же процессе) без выноса работы из
+    цикла событий и с пулом процессов (см. middlewares.offload). Пока
+    несколько клиентов отправляют большие запросы /create, еще один клиент
+    отправляет небольшие запросы /create и измеряет их задержку (p50, p99 и
+    максимум).
+
+    Хранилище заменено на "пустое" (записи не сохраняются), чтобы
+    измерялась работа middleware и валидации, а не рост хранилища.
+
+    Запуск (из каталога sources):
+
+        PYTHONPATH=. python benchmarks/bench_offload.py
+"""
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+from aiohttp import ClientSession
+from aiohttp.test_utils import TestServer
+
+import run_wraps
+from storages.base import BaseStorage
+
+LARGE_PERSONS = 2_000
+LARGE_CLIENTS = 1
+SMALL_REQUESTS = 50
+
+
+class NullStorage(BaseStorage):
+    """ Хранилище, которое ничего не сохраняет.
+    """
+    async def put_many(self, items) -> None:
+        pass
+
+
+async def send_large(session: ClientSession, url: str, body: bytes, stop):
+
+    while not stop.is_set():
+        async with session.post(url, data=body) as response:
+            await response.read()
+
+
+async def measure_small(session: ClientSession, url: str) -> List[float]:
+
+    body = json.dumps({"data": {"name": "Ivan"}, "id": 1}).encode()
+    latencies = []
+
+    for _ in range(SMALL_REQUESTS):
+        started = time.perf_counter()
+        async with session.post(url, data=body) as response:
+            await response.read()
+        latencies.append(time.perf_counter() - started)
+        await asyncio.sleep(0.005)
+
+    return latencies
+
+
+async def run(offload_executor: str) -> List[float]:
+
+    run_wraps.OFFLOAD_EXECUTOR = offload_executor
+    app = run_wraps.get_app()
+    app["storage"] = NullStorage()
+
+    server = TestServer(app)
+    await server.start_server()
+
+    url = str(server.make_url("/create"))
+    large_body = json.dumps({
+        "data": [{"name": f"Person {i}"} for i in range(LARGE_PERSONS)],
+        "id": 1,
+    }).encode()
+
+    stop = asyncio.Event()
+    async with ClientSession() as session:
+        # Прогрев (в том числе запуск процессов пула)
+        await send_large_once(session, url, large_body)
+
+        large = [
+            asyncio.ensure_future(send_large(session, url, large_body, stop))
+            for _ in range(LARGE_CLIENTS)
+        ]
+        latencies = await measure_small(session, url)
+
+        stop.set()
+        await asyncio.gather(*large)
+
+    await server.close()
+
+    return latencies
+
+
+async def send_large_once(session: ClientSession, url: str, body: bytes):
+
+    async with session.post(url, data=body) as response:
+        await response.read()
+
+
+def main() -> None:
+
+    for name, offload_executor in (("inline", ""), ("process", "process")):
+        latencies = sorted(asyncio.run(run(offload_executor)))
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(
+            f"{name:>8}: p50 {statistics.median(latencies) * 1e3:7.2f} ms, "
+            f"p99 {p99 * 1e3:7.2f} ms, max {latencies[-1] * 1e3:7.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,89 @@
+""" Бенчмарк памяти хранилищ записей о персонах.
+
+    Сравнивает количество байт на одну запись для:
+
+    - dict: словарь {UUID: {"id": UUID, "name": str}} (как раньше в
+      run_wraps.py);
+    - MemoryStorage: хранилище общего вида;
+    - PersonStorage: компактное хранилище записей о персонах.
+
+    Строки имен создаются заранее и не учитываются (они одинаковы для всех
+    хранилищ).
+
+    Запуск (из каталога sources):
+
+        PYTHONPATH=. python benchmarks/bench_person_storage_memory.py [N]
+
+    N - количество записей.
+"""
+import asyncio
+import sys
+import tracemalloc
+from uuid import uuid4
+
+from storages.memory import MemoryStorage
+from storages.persons import PersonStorage
+
+COUNT = 100_000
+
+
+async def fill_dict(names):
+
+    storage = {}
+    for name in names:
+        person_id = uuid4()
+        storage[person_id] = {"id": person_id, "name": name}
+
+    return storage
+
+
+async def fill_storage(storage, names):
+
+    for name in names:
+        person_id = uuid4()
+        await storage.put(person_id, {"id": person_id, "name": name})
+
+    return storage
+
+
+async def measure(fill, names) -> float:
+    """ Возвращает количество байт на одну запись.
+    """
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+
+    storage = await fill(names)
+
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    assert len(storage) == len(names)
+
+    return (after - before) / len(names)
+
+
+async def main(count: int) -> None:
+
+    names = [f"name{n}" for n in range(count)]
+
+    results = {
+        "dict": await measure(fill_dict, names),
+        "MemoryStorage": await measure(
+            lambda names: fill_storage(MemoryStorage(), names), names
+        ),
+        "PersonStorage": await measure(
+            lambda names: fill_storage(PersonStorage(), names), names
+        ),
+    }
+
+    baseline = results["dict"]
+    for name, bytes_per_record in results.items():
+        print(
+            f"{name:>14}: {bytes_per_record:7.1f} bytes/record "
+            f"({bytes_per_record / baseline:.0%} of dict)"
+        )
+
+
+if __name__ == "__main__":
+
+    asyncio.run(main(int(sys.argv[1]) if len(sys.argv) > 1 else COUNT))
@@ -0,0 +1,138 @@
+""" Нагрузочный бенчмарк режимов запуска сервиса (см. launcher).
+
+    Для каждого режима запускает сервис run_simple в отдельном процессе и
+    отправляет ему REQUESTS запросов /some_handler из CONCURRENCY
+    соединений (keep-alive). Печатает пропускную способность (запросов в
+    секунду) и задержку (p50, p99).
+
+    Журнал запросов в процессе сервиса пишется (в os.devnull) с уровнем
+    INFO, как при обычной эксплуатации, поэтому видна и его цена: режим
+    "default + no access log" отличается от "default" только выключенным
+    журналом.
+
+    Клиент работает на той же машине, что и сервис, поэтому результаты
+    сравнимы между собой, но не с нагрузкой по сети.
+
+    Запуск (из каталога sources):
+
+        PYTHONPATH=. python benchmarks/bench_serving.py
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import socket
+import statistics
+import time
+from typing import List, Tuple
+
+from aiohttp import ClientSession, TCPConnector
+
+import run_simple
+from launcher import ServingOptions, get_serving_options, run
+
+REQUESTS = 20_000
+CONCURRENCY = 50
+
+MODES = [
+    ("default", get_serving_options("default")),
+    ("default + no access log",
+     get_serving_options("default", access_log=False)),
+    ("tuned (asyncio)", get_serving_options("tuned", event_loop="asyncio")),
+    ("tuned", get_serving_options("tuned")),
+]
+
+
+def get_free_port() -> int:
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def run_service(port: int, options: ServingOptions) -> None:
+
+    logging.basicConfig(
+        level=logging.INFO, stream=open(os.devnull, "w")
+    )
+    run(run_simple.get_app, "127.0.0.1", port, options=options)
+
+
+async def wait_service(url: str) -> None:
+
+    async with ClientSession() as session:
+        for _ in range(100):
+            try:
+                async with session.post(url, json={}) as response:
+                    await response.read()
+                    return
+            except OSError:
+                await asyncio.sleep(0.1)
+
+    raise RuntimeError("Service is not started")
+
+
+async def send_requests(
+    session: ClientSession, url: str, count: int, latencies: List[float]
+) -> None:
+
+    body = b'{"name": "Ivan", "age": 30}'
+    headers = {"Content-Type": "application/json"}
+
+    for _ in range(count):
+        started = time.perf_counter()
+        async with session.post(url, data=body, headers=headers) as response:
+            await response.read()
+        latencies.append(time.perf_counter() - started)
+
+
+async def load(url: str) -> Tuple[float, List[float]]:
+    """ Возвращает время работы и задержки запросов.
+    """
+    await wait_service(url)
+
+    latencies: List[float] = []
+    connector = TCPConnector(limit=CONCURRENCY)
+
+    async with ClientSession(connector=connector) as session:
+        started = time.perf_counter()
+        await asyncio.gather(*(
+            send_requests(session, url, REQUESTS // CONCURRENCY, latencies)
+            for _ in range(CONCURRENCY)
+        ))
+        elapsed = time.perf_counter() - started
+
+    return elapsed, latencies
+
+
+def main() -> None:
+
+    print(f"{REQUESTS} requests, {CONCURRENCY} connections")
+
+    context = multiprocessing.get_context("spawn")
+
+    for name, options in MODES:
+        port = get_free_port()
+        process = context.Process(target=run_service, args=(port, options))
+        process.start()
+
+        try:
+            elapsed, latencies = asyncio.run(
+                load(f"http://127.0.0.1:{port}/some_handler")
+            )
+        finally:
+            process.terminate()
+            process.join()
+
+        latencies.sort()
+        p99 = latencies[int(len(latencies) * 0.99) - 1]
+        print(
+            f"{name:>24}: {len(latencies) / elapsed:8.0f} rps, "
+            f"p50 {statistics.median(latencies) * 1e3:6.2f} ms, "
+            f"p99 {p99 * 1e3:6.2f} ms"
+        )
+
+
+if __name__ == "__main__":
+
+    main()
@@ -0,0 +1,58 @@
+""" Микробенчмарк оболочек запроса и ответа WrapsKwargsHandler.
+
+    Сравнивает строгий режим (создание экземпляров WrapRequest и
+    WrapResponse) и быстрый режим (заранее собранный валидатор оболочки
+    запроса и сборка словаря оболочки ответа напрямую). В обоих случаях
+    измеряется и дамп оболочки ответа в json.
+
+    Запуск (из каталога sources):
+
+        PYTHONPATH=. python benchmarks/bench_wraps_envelope.py
+"""
+import timeit
+from uuid import uuid4
+
+from data_classes.person import PersonInfo
+from middlewares.utils import ArgumentsManager
+from middlewares.wraps_handler import WrapsKwargsHandler
+
+NUMBER = 20_000
+
+
+def main() -> None:
+
+    arguments_manager = ArgumentsManager()
+    handlers = {
+        "strict": WrapsKwargsHandler(
+            arguments_manager, strict_envelope_validation=True
+        ),
+        "fast": WrapsKwargsHandler(arguments_manager),
+    }
+
+    for count in (1, 10, 100):
+        request_body = {"data": [{"name": "Ivan"}] * count, "id": 1}
+        result = [PersonInfo(id=uuid4(), name="Ivan") for _ in range(count)]
+        number = NUMBER // count
+
+        times = {}
+        for name, handler in handlers.items():
+
+            def run():
+                wrap_request = handler.get_wrap_request(request_body)
+                handler.json_codec.dumps_bytes(
+                    handler.get_wrap_response(result, wrap_request["id"])
+                )
+
+            times[name] = timeit.timeit(run, number=number) / number
+
+        print(
+            f"{count:>4} items: "
+            f"strict {times['strict'] * 1e6:8.2f} us/call, "
+            f"fast {times['fast'] * 1e6:8.2f} us/call, "
+            f"saved {(times['strict'] - times['fast']) * 1e6:8.2f} us/call"
+        )
+
+
+if __name__ == "__main__":
+
+    main()
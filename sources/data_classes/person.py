@@ -1,5 +1,6 @@
 """ Классы данных для Персоны.
 """
+from typing import List
 from uuid import UUID
 
 from pydantic import Field, StrictStr
@@ -18,3 +19,12 @@ class PersonInfo(BaseApi):
     """
     id: UUID = Field(description="Идентификатор.")
     name: StrictStr = Field(description="Имя.")
+
+
+class PersonsReadResult(BaseApi):
+    """ Результат чтения нескольких персон.
+    """
+    found: List[PersonInfo] = Field(description="Найденные персоны.")
+    missing: List[UUID] = Field(
+        description="Идентификаторы, для которых персоны не найдены."
+    )
@@ -2,7 +2,7 @@
 """
 from typing import Any, Optional
 
-from pydantic import Field, StrictInt
+from pydantic import Field, StrictInt, StrictStr
 
 from data_classes.base import BaseApi
 
@@ -16,6 +16,24 @@ class WrapRequest(BaseApi):
     id: Optional[StrictInt] = Field(description=_ID_DESCRIPTION)
 
 
+class WrapBatchRequest(WrapRequest):
+    """ Запрос в пакете запросов.
+    """
+    id: Optional[StrictInt] = Field(
+        description=(
+            f"{_ID_DESCRIPTION} Ответы на запросы пакета возвращаются в том "
+            "же порядке, что и запросы (и с их id). Непустые id в пакете не "
+            "должны повторяться."
+        )
+    )
+    method: Optional[StrictStr] = Field(
+        description=(
+            "Имя апи-метода (путь без начального '/'). Если не указано, то "
+            "используется апи-метод, в который отправлен пакет."
+        )
+    )
+
+
 class WrapResponse(BaseApi):
     """ Ответ.
     """
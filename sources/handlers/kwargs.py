@@ -16,8 +16,8 @@
                             Аннотация может быть любой (нужно ставить ту,
                             которая описывает вх.данные для обработчика).
 
-    - storage: dict        - В него будет передаваться передаваться
-                            экземпляр хранилища .
+    - storage: BaseStorage - В него будет передаваться передаваться
+                            экземпляр хранилища (см. storages.base).
                             Имя аргумента обязательно должно быть "storage".
                             Аннотация может быть любой (нужно ставить ту,
                             которая описывает экземпляр хранилища).
@@ -33,15 +33,45 @@
                             в url (иначе будет 500 ошибка KeyError).
 
     Внимание! Аннотации ко всем аргументам у обработчиков - обязательны!
+
+    Для обработчика create_stream включен потоковый разбор тела запроса (в
+    аргумент data передается асинхронный итератор JSONArrayStream).
+
+    Ответы обработчиков read, read_many и info кэшируются (если кэш включен в
+    настройках), а create и create_stream сбрасывают записи кэша с id
+    созданных персон.
 """
-from typing import List, Union
+from typing import Any, List, Union
 from uuid import uuid4
 
 from aiohttp import web
 
+from middlewares.response_cache import cache_response, invalidate_cache
+from middlewares.stream_body import JSONArrayStream, stream_request_body
+from settings import (CREATE_STREAM_MAX_BODY_SIZE, CREATE_STREAM_MAX_ITEMS,
+                      CREATE_STREAM_MAX_ITEM_SIZE, REQUEST_MAX_DEPTH,
+                      RESPONSE_CACHE_TTL)
+from storages.base import BaseStorage
+
+
+def requested_ids(data: Any) -> List[str]:
+    """ Теги записи кэша - id запрошенных персон (data - один id или их
+        список).
+    """
+    return data if isinstance(data, list) else [data, ]
+
 
+def created_ids(data: Any, result: Any) -> List[str]:
+    """ Теги для сброса записей кэша - id созданных персон.
+    """
+    persons = result if isinstance(result, list) else [result, ]
+
+    return [person["id"] for person in persons]
+
+
+@invalidate_cache(tags=created_ids)
 async def create(
-    data: Union[dict, List[dict]], storage: dict,
+    data: Union[dict, List[dict]], storage: BaseStorage,
 ) -> Union[dict, List[dict]]:
     """ Создает запись или несколько записей о персоне и сохраняет в хранилище.
         Возвращает созданную запись или их список.
@@ -50,26 +80,57 @@ async def create(
 
     persons = data if data_is_list else [data, ]
 
+    result = [
+        dict(id=str(uuid4()), name=person["name"]) for person in persons
+    ]
+
+    # Добавим в хранилище новые записи
+    await storage.put_many(
+        {person_info["id"]: person_info for person_info in result}
+    )
+
+    return result if data_is_list else result[0]
+
+
+@stream_request_body(
+    max_body_size=CREATE_STREAM_MAX_BODY_SIZE,
+    max_items=CREATE_STREAM_MAX_ITEMS,
+    max_item_depth=REQUEST_MAX_DEPTH,
+    max_item_size=CREATE_STREAM_MAX_ITEM_SIZE,
+)
+@invalidate_cache(tags=created_ids)
+async def create_stream(
+    data: JSONArrayStream, storage: BaseStorage,
+) -> List[dict]:
+    """ Создает записи о персонах (по мере разбора тела запроса) и сохраняет
+        их в хранилище.
+        Возвращает список созданных записей.
+    """
     result = []
-    for person in persons:
-        person_info = dict(id=str(uuid4()), name=person["name"])
+    async for persons in data.chunks():
+        persons_info = [
+            dict(id=str(uuid4()), name=person["name"]) for person in persons
+        ]
 
-        # Добавим в хранилище новую запись
-        storage[person_info["id"]] = person_info
+        # Добавим в хранилище новые записи (одной операцией на порцию)
+        await storage.put_many(
+            {person_info["id"]: person_info for person_info in persons_info}
+        )
 
-        result.append(person_info)
+        result.extend(persons_info)
 
-    return result if data_is_list else result[0]
+    return result
 
 
 class PersonNotFound(Exception):
     pass
 
 
-async def read(storage: dict, data: str) -> dict:
+@cache_response(ttl=RESPONSE_CACHE_TTL, tags=requested_ids)
+async def read(storage: BaseStorage, data: str) -> dict:
     """ Читает запись с id=data из хранилища, и возвращает её.
     """
-    person = storage.get(data)
+    person = await storage.get(data)
 
     if person is None:
         raise PersonNotFound(f"Person whith id={data} not found!")
@@ -77,6 +138,26 @@ async def read(storage: dict, data: str) -> dict:
     return dict(id=person["id"], name=person["name"])
 
 
+@cache_response(ttl=RESPONSE_CACHE_TTL, tags=requested_ids)
+async def read_many(storage: BaseStorage, data: List[str]) -> dict:
+    """ Читает записи с id из списка data из хранилища.
+        Возвращает найденные записи и список id, для которых записей нет.
+    """
+    # Повторяющиеся id читаем один раз (порядок сохраняется)
+    ids = list(dict.fromkeys(data))
+
+    persons = await storage.get_many(ids)
+
+    return dict(
+        found=[
+            dict(id=persons[id_]["id"], name=persons[id_]["name"])
+            for id_ in ids if id_ in persons
+        ],
+        missing=[id_ for id_ in ids if id_ not in persons],
+    )
+
+
+@cache_response(ttl=RESPONSE_CACHE_TTL)
 async def info(info_id: int, request: web.Request) -> str:
     """ Информация.
     """
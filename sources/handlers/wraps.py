@@ -16,8 +16,8 @@
                             Аннотация может быть любой (нужно ставить ту,
                             которая описывает вх.данные для обработчика).
 
-    - storage: dict        - В него будет передаваться передаваться
-                            экземпляр хранилища .
+    - storage: BaseStorage - В него будет передаваться передаваться
+                            экземпляр хранилища (см. storages.base).
                             Имя аргумента обязательно должно быть "storage".
                             Аннотация может быть любой (нужно ставить ту,
                             которая описывает экземпляр хранилища).
@@ -33,19 +33,51 @@
                             в url (иначе будет 500 ошибка KeyError).
 
     Внимание! Аннотации ко всем аргументам у обработчиков - обязательны!
+
+    Для обработчика create_stream включен потоковый разбор тела запроса (тело
+    запроса - json-массив без оболочки, в аргумент data передается
+    асинхронный итератор JSONArrayStream).
+
+    Ответы обработчиков read, read_many и info кэшируются (если кэш включен в
+    настройках), а create и create_stream сбрасывают записи кэша с id
+    созданных персон.
 """
 from typing import Any, List, Union
 from uuid import UUID, uuid4
 
 from aiohttp import web
-from valdec.decorators import async_validate as validate
 
-from data_classes.person import PersonCreate, PersonInfo
+from data_classes.person import PersonCreate, PersonInfo, PersonsReadResult
+from middlewares.response_cache import cache_response, invalidate_cache
+from middlewares.stream_body import JSONArrayStream, stream_request_body
+from middlewares.validation import validate
+from settings import (CREATE_STREAM_MAX_BODY_SIZE, CREATE_STREAM_MAX_ITEMS,
+                      CREATE_STREAM_MAX_ITEM_SIZE, REQUEST_MAX_DEPTH,
+                      RESPONSE_CACHE_TTL)
+from storages.base import BaseStorage
+
+
+def requested_ids(data: Any) -> List[str]:
+    """ Теги записи кэша - id запрошенных персон (data - один id или их
+        список, уже прошедшие валидацию в обработчике).
+    """
+    ids = data if isinstance(data, list) else [data, ]
+
+    return [str(UUID(id_)) for id_ in ids]
 
 
+def created_ids(data: Any, result: Any) -> List[str]:
+    """ Теги для сброса записей кэша - id созданных персон.
+    """
+    persons = result if isinstance(result, list) else [result, ]
+
+    return [str(person.id) for person in persons]
+
+
+@invalidate_cache(tags=created_ids)
 @validate("data", "return")
 async def create(
-    data: Union[PersonCreate, List[PersonCreate]], storage: dict,
+    data: Union[PersonCreate, List[PersonCreate]], storage: BaseStorage,
 ) -> Union[PersonInfo, List[PersonInfo]]:
     """ Создает запись или несколько записей о персоне и сохраняет в хранилище.
         Возвращает созданную запись или их список.
@@ -54,30 +86,63 @@ async def create(
 
     persons = data if data_is_list else [data, ]
 
+    result = [PersonInfo(id=uuid4(), name=person.name) for person in persons]
+
+    # Добавим в хранилище новые записи
+    await storage.put_many(
+        {person_info.id: person_info.dict() for person_info in result}
+    )
+
+    return result if data_is_list else result[0]
+
+
+@stream_request_body(
+    max_body_size=CREATE_STREAM_MAX_BODY_SIZE,
+    max_items=CREATE_STREAM_MAX_ITEMS,
+    max_item_depth=REQUEST_MAX_DEPTH,
+    max_item_size=CREATE_STREAM_MAX_ITEM_SIZE,
+    item_model=PersonCreate,
+)
+@invalidate_cache(tags=created_ids)
+@validate("return")
+async def create_stream(
+    data: JSONArrayStream, storage: BaseStorage,
+) -> List[PersonInfo]:
+    """ Создает записи о персонах (по мере разбора тела запроса) и сохраняет
+        их в хранилище.
+        Возвращает список созданных записей.
+    """
     result = []
-    for person in persons:
-        person_info = PersonInfo(id=uuid4(), name=person.name)
+    async for persons in data.chunks():
+        persons_info = [
+            PersonInfo(id=uuid4(), name=person.name) for person in persons
+        ]
 
-        # Добавим в хранилище новую запись
-        storage[person_info.id] = person_info.dict()
+        # Добавим в хранилище новые записи (одной операцией на порцию)
+        await storage.put_many({
+            person_info.id: person_info.dict() for person_info in persons_info
+        })
 
-        result.append(person_info)
+        result.extend(persons_info)
 
-    return result if data_is_list else result[0]
+    return result
 
 
 class PersonNotFound(Exception):
     pass
 
 
+@cache_response(ttl=RESPONSE_CACHE_TTL, tags=requested_ids)
 @validate("data", "return")
-async def read(storage: dict, req: web.Request, data: UUID) -> PersonInfo:
+async def read(
+    storage: BaseStorage, req: web.Request, data: UUID,
+) -> PersonInfo:
     """ Читает запись с id=data из хранилища, и возвращает её.
     """
     # Параметр req не используется в коде этой функции, дан здесь просто
     # для примера.
 
-    person = storage.get(data)
+    person = await storage.get(data)
 
     if person is None:
         raise PersonNotFound(f"Person whith id={data} not found!")
@@ -85,6 +150,27 @@ async def read(storage: dict, req: web.Request, data: UUID) -> PersonInfo:
     return PersonInfo(id=person["id"], name=person["name"])
 
 
+@cache_response(ttl=RESPONSE_CACHE_TTL, tags=requested_ids)
+@validate("data", "return")
+async def read_many(
+    storage: BaseStorage, data: List[UUID],
+) -> PersonsReadResult:
+    """ Читает записи с id из списка data из хранилища.
+        Возвращает найденные записи и список id, для которых записей нет.
+    """
+    # Повторяющиеся id читаем один раз (порядок сохраняется)
+    ids = list(dict.fromkeys(data))
+
+    persons = await storage.get_many(ids)
+
+    # Валидация всех найденных записей - при создании одного экземпляра
+    return PersonsReadResult(
+        found=[persons[id_] for id_ in ids if id_ in persons],
+        missing=[id_ for id_ in ids if id_ not in persons],
+    )
+
+
+@cache_response(ttl=RESPONSE_CACHE_TTL)
 @validate("info_id")
 async def info(info_id: int, request: web.Request) -> Any:
     """ Информация.
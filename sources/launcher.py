@@ -0,0 +1,338 @@
+""" Запуск сервиса в одном или нескольких процессах.
+
+    При workers > 1 запускается workers процессов-воркеров, каждый из
+    которых создает свое приложение (через get_app) и слушает тот же адрес
+    с опцией SO_REUSEPORT (входящие соединения распределяет ядро).
+    Родительский процесс следит за воркерами:
+
+    - воркер, который завершился (упал), запускается заново (если он падает
+      сразу после запуска, то перезапуски выполняются с нарастающей
+      задержкой);
+    - по SIGTERM/SIGINT воркерам отправляется SIGTERM (aiohttp завершает
+      работу штатно), и те из них, кто не завершился за shutdown_timeout
+      секунд, принудительно останавливаются;
+    - сигналы SIGUSR1 и SIGUSR2 пересылаются всем воркерам (например, для
+      включения профилировщика, см. middlewares.profiler). Воркер, в
+      котором приложение не установило обработчик сигнала (или еще не
+      запустилось), его игнорирует.
+
+    Режим запуска (см. ServingOptions и SERVING_MODES) задает цикл событий
+    и параметры web.run_app: "default" - asyncio и настройки aiohttp по
+    умолчанию, "tuned" - uvloop (если установлен), большая очередь
+    соединений, короткий keep-alive и выключенный журнал запросов (запись
+    строки журнала на каждый запрос заметно снижает пропускную способность).
+
+    Внимание! Каждый воркер - отдельный процесс со своей памятью, поэтому
+    при workers > 1 хранилище должно быть общим для процессов (например,
+    "sqlite", см. storages).
+"""
+import asyncio
+import logging
+import multiprocessing
+import os
+import signal
+import time
+from dataclasses import dataclass, replace
+from inspect import signature
+from multiprocessing.connection import wait
+from multiprocessing.process import BaseProcess
+from typing import Any, Callable, Dict, Optional, Union
+
+from aiohttp import __version__ as aiohttp_version
+from aiohttp import web
+
+logger = logging.getLogger(__name__)
+
+# Воркер, который проработал меньше этого времени (в секундах), считается
+# упавшим при запуске
+MIN_UPTIME = 1.0
+# Максимальная задержка перезапуска упавшего при запуске воркера
+MAX_RESTART_DELAY = 10.0
+
+FORWARDED_SIGNALS = (signal.SIGUSR1, signal.SIGUSR2)
+
+
+@dataclass(frozen=True)
+class ServingOptions:
+    """ Параметры запуска приложения.
+    """
+    # Цикл событий: "asyncio", "uvloop" или "auto" (uvloop, если установлен)
+    event_loop: str = "asyncio"
+    # Время (в секундах), которое открытое соединение ждет следующий запрос
+    keepalive_timeout: float = 75.0
+    # Размер очереди входящих соединений сокета
+    backlog: int = 128
+    # Журнал запросов (строка в логгере aiohttp.access на каждый запрос)
+    access_log: bool = True
+    # Отмена обработчика, если клиент разорвал соединение (aiohttp >= 3.9)
+    handler_cancellation: bool = False
+
+
+SERVING_MODES = {
+    "default": ServingOptions(),
+    "tuned": ServingOptions(
+        event_loop="auto", keepalive_timeout=15.0, backlog=2048,
+        access_log=False,
+    ),
+}
+
+
+def get_serving_options(mode: str, **overrides: Any) -> ServingOptions:
+    """ Возвращает параметры запуска для режима mode. Параметры из
+        overrides со значением, отличным от None, заменяют значения режима.
+    """
+    if mode not in SERVING_MODES:
+        raise ValueError(f"Unknown serving mode: '{mode}'")
+
+    return replace(
+        SERVING_MODES[mode],
+        **{name: value for name, value in overrides.items()
+           if value is not None}
+    )
+
+
+def set_event_loop_policy(event_loop: str) -> str:
+    """ Устанавливает политику цикла событий и возвращает имя цикла, который
+        будет использоваться ("asyncio" или "uvloop").
+    """
+    if event_loop == "asyncio":
+        return event_loop
+
+    if event_loop not in ("uvloop", "auto"):
+        raise ValueError(f"Unknown event loop: '{event_loop}'")
+
+    try:
+        import uvloop
+    except ImportError:
+        if event_loop == "uvloop":
+            raise
+        return "asyncio"
+
+    asyncio.set_event_loop_policy(uvloop.EventLoopPolicy())
+
+    return "uvloop"
+
+
+def get_run_app_kwargs(options: ServingOptions) -> Dict[str, Any]:
+    """ Возвращает именованные аргументы web.run_app для параметров
+        options. Параметры, которых нет в установленной версии aiohttp,
+        пропускаются (с предупреждением, если их значение отличается от
+        значения по умолчанию).
+    """
+    kwargs = {
+        "keepalive_timeout": options.keepalive_timeout,
+        "backlog": options.backlog,
+        "access_log": web.access_logger if options.access_log else None,
+        "handler_cancellation": options.handler_cancellation,
+    }
+
+    supported = signature(web.run_app).parameters
+    for name in list(kwargs):
+        if name not in supported:
+            if getattr(options, name) != getattr(ServingOptions, name):
+                logger.warning(
+                    "Option %s is not supported by aiohttp %s",
+                    name, aiohttp_version,
+                )
+            del kwargs[name]
+
+    return kwargs
+
+
+def run_app(
+    get_app: Callable[[], web.Application], host: str,
+    port: Union[int, str], options: ServingOptions, **kwargs: Any
+) -> None:
+    """ Запускает приложение в текущем процессе с параметрами options.
+    """
+    event_loop = set_event_loop_policy(options.event_loop)
+    logger.info("Event loop: %s", event_loop)
+
+    web.run_app(
+        get_app(), host=host, port=port, **get_run_app_kwargs(options),
+        **kwargs
+    )
+
+
+def run_worker(
+    get_app: Callable[[], web.Application], host: str,
+    port: Union[int, str], options: ServingOptions,
+) -> None:
+    """ Запускает приложение в процессе-воркере.
+    """
+    # Обработчики сигналов родителя в воркере не нужны (обработчики ставят
+    # aiohttp и само приложение). Пересылаемые сигналы игнорируются, пока
+    # приложение не установит для них обработчик: действие по умолчанию
+    # для них - завершение процесса.
+    for signum in (signal.SIGTERM, signal.SIGINT):
+        signal.signal(signum, signal.SIG_DFL)
+    for signum in FORWARDED_SIGNALS:
+        signal.signal(signum, signal.SIG_IGN)
+
+    run_app(get_app, host, port, options, reuse_port=True, print=None)
+
+
+class Supervisor:
+    """ Запускает процессы-воркеры и следит за ними.
+    """
+
+    def __init__(
+        self, get_app: Callable[[], web.Application], host: str,
+        port: Union[int, str], workers: int, shutdown_timeout: float = 10.0,
+        options: Optional[ServingOptions] = None,
+    ) -> None:
+
+        self.get_app = get_app
+        self.host = host
+        self.port = port
+        self.workers = workers
+        self.shutdown_timeout = shutdown_timeout
+        self.options = options or ServingOptions()
+
+        self.context = multiprocessing.get_context("fork")
+
+        # Номер воркера -> процесс
+        self.processes: Dict[int, BaseProcess] = {}
+        # Номер воркера -> время запуска
+        self.started_at: Dict[int, float] = {}
+        # Номер воркера -> количество падений подряд при запуске
+        self.failures: Dict[int, int] = {}
+        # Номер воркера -> время, когда его надо перезапустить
+        self.restart_at: Dict[int, float] = {}
+
+        self.stopping = False
+
+    def start_worker(self, number: int) -> None:
+        """ Запускает воркер с номером number.
+        """
+        process = self.context.Process(
+            target=run_worker,
+            args=(self.get_app, self.host, self.port, self.options),
+            name=f"worker-{number}",
+        )
+        process.start()
+
+        self.processes[number] = process
+        self.started_at[number] = time.monotonic()
+
+        logger.info("Worker %s started (pid %s)", number, process.pid)
+
+    def on_worker_exit(self, number: int) -> None:
+        """ Планирует перезапуск завершившегося воркера.
+        """
+        process = self.processes.pop(number)
+        now = time.monotonic()
+
+        if now - self.started_at[number] < MIN_UPTIME:
+            self.failures[number] = self.failures.get(number, 0) + 1
+        else:
+            self.failures[number] = 0
+
+        failures = self.failures[number]
+        delay = (
+            min(MAX_RESTART_DELAY, 0.1 * 2 ** failures) if failures else 0.0
+        )
+        self.restart_at[number] = now + delay
+
+        logger.warning(
+            "Worker %s (pid %s) exited with code %s, restart in %.1f s",
+            number, process.pid, process.exitcode, delay,
+        )
+
+    def on_stop_signal(self, signum: int, frame) -> None:
+        self.stopping = True
+
+    def on_forwarded_signal(self, signum: int, frame) -> None:
+        for process in self.processes.values():
+            try:
+                os.kill(process.pid, signum)
+            except ProcessLookupError:
+                # Воркер уже завершился (его перезапустит supervise)
+                pass
+
+    def supervise(self) -> None:
+        """ Перезапускает завершившиеся воркеры, пока не получен сигнал
+            остановки.
+        """
+        while not self.stopping:
+            now = time.monotonic()
+
+            for number, restart_at in list(self.restart_at.items()):
+                if restart_at <= now:
+                    del self.restart_at[number]
+                    self.start_worker(number)
+
+            timeout = 0.5
+            if self.restart_at:
+                timeout = max(
+                    0.0, min(timeout, min(self.restart_at.values()) - now)
+                )
+
+            wait(
+                [process.sentinel for process in self.processes.values()],
+                timeout,
+            )
+
+            for number, process in list(self.processes.items()):
+                if not process.is_alive() and not self.stopping:
+                    self.on_worker_exit(number)
+
+    def stop(self) -> None:
+        """ Штатно останавливает воркеры (и принудительно - те, кто не
+            завершился за shutdown_timeout секунд).
+        """
+        for process in self.processes.values():
+            process.terminate()
+
+        deadline = time.monotonic() + self.shutdown_timeout
+
+        for process in self.processes.values():
+            process.join(max(0.0, deadline - time.monotonic()))
+
+            if process.is_alive():
+                logger.warning("Worker pid %s killed", process.pid)
+                process.kill()
+                process.join()
+
+        self.processes.clear()
+
+    def run(self) -> None:
+        """ Запускает воркеры и следит за ними до сигнала остановки.
+        """
+        signal.signal(signal.SIGTERM, self.on_stop_signal)
+        signal.signal(signal.SIGINT, self.on_stop_signal)
+        for signum in FORWARDED_SIGNALS:
+            signal.signal(signum, self.on_forwarded_signal)
+
+        print(
+            f"======== Running {self.workers} workers on "
+            f"http://{self.host}:{self.port} ========"
+        )
+
+        for number in range(self.workers):
+            self.start_worker(number)
+
+        try:
+            self.supervise()
+        finally:
+            self.stop()
+
+
+def run(
+    get_app: Callable[[], web.Application], host: str,
+    port: Union[int, str], workers: int = 1,
+    options: Optional[ServingOptions] = None,
+) -> None:
+    """ Запускает сервис (приложение из get_app) в workers процессах с
+        параметрами запуска options (по умолчанию - режим "default").
+
+        При workers == 1 приложение запускается в текущем процессе, как
+        обычно.
+    """
+    options = options or ServingOptions()
+
+    if workers <= 1:
+        run_app(get_app, host, port, options)
+        return
+
+    Supervisor(get_app, host, port, workers, options=options).run()
@@ -0,0 +1,303 @@
+""" Ограничения тела запроса: размер, глубина вложенности и длина массивов.
+
+    Ограничения проверяются до разбора json (то есть до создания объектов
+    python):
+
+    - размер - по заголовку Content-Length (до чтения тела), а если его
+      нет - во время чтения тела;
+    - размер сжатого тела (Content-Encoding) - во время чтения (aiohttp
+      распаковывает тело по мере получения данных, и ограничение
+      применяется к распакованным данным), а отношение размеров
+      распакованного и сжатого тела - по Content-Length (защита от
+      "бомб" - небольших тел, которые распаковываются в гигабайты);
+    - глубина вложенности и длина массивов - по "скелету" json (см.
+      check_json_limits), а для двоичных форматов - при разборе тела и по
+      разобранному объекту (см. codecs.MsgpackCodec.loads и
+      check_object_limits).
+
+    Ограничения по умолчанию передаются в middleware (см. SimpleHandler), а
+    для отдельного обработчика их можно заменить декоратором
+    limit_request_body.
+"""
+import re
+from dataclasses import dataclass
+from typing import Any, Callable, List, Optional
+
+from aiohttp import hdrs, web
+
+from middlewares.exceptions import RequestBodyTooDeep, RequestBodyTooLarge
+
+# Байты, которые не нужны для проверки (все, кроме кавычек, скобок и
+# запятых)
+_NOT_STRUCTURAL = bytes(set(range(256)) - set(b'"[]{},'))
+# Экранированный символ в строке json
+_ESCAPED = re.compile(rb"\\.", re.DOTALL)
+# Строка json (без экранированных символов)
+_STRING = re.compile(rb'"[^"]*"')
+# Массив или объект без вложенных массивов и объектов
+_INNERMOST = re.compile(rb"\[[^\[\]{}]*\]|\{[^\[\]{}]*\}")
+# Содержимое массива без вложенных массивов и объектов
+_INNERMOST_ARRAY = re.compile(rb"\[([^\[\]{}]*)\]")
+# Скобка массива или объекта
+_BRACKET = re.compile(rb"[\[\]{}]")
+
+
+@dataclass(frozen=True)
+class BodyLimitsOptions:
+    """ Ограничения тела запроса (None - без ограничения).
+    """
+    # Максимальный размер тела запроса в байтах
+    max_body_size: Optional[int] = None
+    # Максимальная глубина вложенности массивов и объектов
+    max_depth: Optional[int] = None
+    # Максимальная длина массива (любого, на любом уровне вложенности)
+    max_array_length: Optional[int] = None
+    # Максимальное отношение размера распакованного тела к размеру сжатого
+    max_compression_ratio: Optional[float] = None
+
+
+def limit_request_body(**options: Any) -> Callable:
+    """ Декоратор обработчика, задает ограничения тела запроса (вместо
+        ограничений по умолчанию).
+
+        Параметры - см. BodyLimitsOptions.
+    """
+    body_limits_options = BodyLimitsOptions(**options)
+
+    def decorator(handler: Callable) -> Callable:
+        handler.body_limits_options = body_limits_options
+        return handler
+
+    return decorator
+
+
+def get_body_limits_options(handler: Callable) -> Optional[BodyLimitsOptions]:
+    """ Возвращает ограничения тела запроса, заданные для обработчика (или
+        None, если они не заданы).
+    """
+    return getattr(handler, "body_limits_options", None)
+
+
+def check_content_length(
+    request: web.Request, max_body_size: Optional[int]
+) -> None:
+    """ Проверяет размер тела запроса по заголовку Content-Length (если он
+        есть).
+    """
+    content_length = request.content_length
+
+    if (
+        max_body_size is not None and content_length is not None and
+        content_length > max_body_size
+    ):
+        raise RequestBodyTooLarge(
+            f"Request body is larger than {max_body_size} bytes"
+        )
+
+
+def is_compressed(request: web.Request) -> bool:
+    """ Проверяет, передано ли тело запроса сжатым (тогда Content-Length -
+        это размер сжатого тела).
+    """
+    encoding = request.headers.get(hdrs.CONTENT_ENCODING, "")
+
+    return encoding.strip().lower() not in ("", "identity")
+
+
+async def read_body(
+    request: web.Request, max_body_size: Optional[int],
+    max_compression_ratio: Optional[float] = None,
+) -> bytes:
+    """ Читает тело запроса, не больше max_body_size байт (для сжатого
+        тела - распакованных байт, и не больше, чем в max_compression_ratio
+        раз больше сжатого тела).
+    """
+    check_content_length(request, max_body_size)
+
+    content_length = request.content_length
+    compressed = is_compressed(request)
+
+    max_unpacked_size = None
+    if (
+        compressed and max_compression_ratio is not None and
+        content_length is not None
+    ):
+        max_unpacked_size = int(content_length * max_compression_ratio)
+
+    if max_unpacked_size is None and (
+        max_body_size is None or
+        (content_length is not None and not compressed)
+    ):
+        # Размер тела не ограничен или известен (и проверен)
+        return await request.read()
+
+    # Тело без Content-Length (chunked) или сжатое тело читается по частям,
+    # чтобы не дочитывать (не распаковывать) его, когда размер уже превышен
+    chunks = []
+    body_size = 0
+
+    while True:
+        chunk = await request.content.readany()
+        if not chunk:
+            break
+
+        body_size += len(chunk)
+        if max_body_size is not None and body_size > max_body_size:
+            raise RequestBodyTooLarge(
+                f"Request body is larger than {max_body_size} bytes"
+            )
+        if max_unpacked_size is not None and body_size > max_unpacked_size:
+            raise RequestBodyTooLarge(
+                f"Request body compression ratio is more than "
+                f"{max_compression_ratio}"
+            )
+        chunks.append(chunk)
+
+    return b"".join(chunks)
+
+
+def get_json_skeleton(body: bytes) -> bytes:
+    """ Возвращает "скелет" json из body: только скобки и запятые вне строк.
+    """
+    if b"\\" in body:
+        # Экранированные символы удаляются до всего остального (среди них
+        # могут быть кавычки)
+        body = _ESCAPED.sub(b"", body)
+
+    skeleton = body.translate(None, _NOT_STRUCTURAL)
+
+    # Большинство строк не содержат скобок и запятых, и от них остаются
+    # пустые пары кавычек
+    skeleton = skeleton.replace(b'""', b"")
+
+    if b'"' in skeleton:
+        skeleton = _STRING.sub(b"", skeleton)
+
+    return skeleton
+
+
+def check_json_limits(
+    body: bytes, max_depth: Optional[int] = None,
+    max_array_length: Optional[int] = None,
+) -> None:
+    """ Проверяет глубину вложенности и длину массивов json в body без его
+        разбора.
+
+        Из body удаляются строки и все, кроме скобок и запятых (см.
+        get_json_skeleton). Затем регулярными выражениями проверяются и
+        удаляются самые вложенные массивы и объекты (в обычном json это
+        большинство скобок), а оставшийся скелет проходится один раз, по
+        скобкам: глубина вложенности - размер стека открытых скобок (плюс
+        удаленный уровень), а длина массива определяется по количеству
+        запятых между скобками (они считаются методом bytes). Время проверки
+        линейно от размера тела при любых ограничениях.
+
+        Некорректный json (с непарными скобками) не проверяется (ошибку
+        найдет разбор).
+    """
+    if max_depth is None and max_array_length is None:
+        return
+
+    skeleton = get_json_skeleton(body)
+
+    opening = skeleton.count(b"[") + skeleton.count(b"{")
+    if opening != skeleton.count(b"]") + skeleton.count(b"}"):
+        return
+
+    if max_array_length is not None:
+        for items in _INNERMOST_ARRAY.findall(skeleton):
+            # Между n элементами массива n - 1 запятая
+            if items.count(b",") >= max_array_length:
+                raise RequestBodyTooLarge(
+                    f"Request body array has more than "
+                    f"{max_array_length} items"
+                )
+
+    if not opening:
+        return
+
+    # Самые вложенные массивы и объекты удаляются (запятые между ними
+    # остаются), у самых вложенных из оставшихся они точно были, поэтому
+    # глубина вложенности на единицу больше глубины оставшегося скелета
+    skeleton = _INNERMOST.sub(b"", skeleton)
+    if max_depth is not None and max_depth < 1:
+        raise RequestBodyTooDeep(
+            f"Request body is nested deeper than {max_depth} levels"
+        )
+
+    # Количество запятых в открытых массивах (None - для объектов)
+    stack: List[Optional[int]] = []
+    start = 0
+
+    for match in _BRACKET.finditer(skeleton):
+        position = match.start()
+
+        if max_array_length is not None and stack and stack[-1] is not None:
+            stack[-1] += skeleton.count(b",", start, position)
+            if stack[-1] >= max_array_length:
+                raise RequestBodyTooLarge(
+                    f"Request body array has more than "
+                    f"{max_array_length} items"
+                )
+
+        bracket = match.group()
+        if bracket == b"[":
+            stack.append(0)
+        elif bracket == b"{":
+            stack.append(None)
+        elif stack:
+            stack.pop()
+        else:
+            return
+
+        if max_depth is not None and len(stack) + 1 > max_depth:
+            raise RequestBodyTooDeep(
+                f"Request body is nested deeper than {max_depth} levels"
+            )
+
+        start = position + 1
+
+
+def check_object_limits(
+    obj: Any, max_depth: Optional[int] = None,
+    max_array_length: Optional[int] = None,
+) -> None:
+    """ Проверяет глубину вложенности и длину массивов (списков и словарей)
+        уже разобранного объекта python.
+
+        Для тел в двоичных форматах, у которых нет "скелета" json. Объект
+        обходится по уровням вложенности, без рекурсии.
+    """
+    if max_depth is None and max_array_length is None:
+        return
+
+    level = [obj] if isinstance(obj, (list, dict)) else []
+    depth = 0
+
+    while level:
+        depth += 1
+        if max_depth is not None and depth > max_depth:
+            raise RequestBodyTooDeep(
+                f"Request body is nested deeper than {max_depth} levels"
+            )
+
+        next_level = []
+        for container in level:
+            if (
+                max_array_length is not None and
+                len(container) > max_array_length
+            ):
+                raise RequestBodyTooLarge(
+                    f"Request body array has more than "
+                    f"{max_array_length} items"
+                )
+
+            items = (
+                container.values() if isinstance(container, dict) else
+                container
+            )
+            next_level.extend(
+                item for item in items if isinstance(item, (list, dict))
+            )
+
+        level = next_level
@@ -0,0 +1,276 @@
+""" Кодеки json (и двоичных форматов) для middlewares.
+
+    Кодек отвечает за разбор тела запроса (из bytes) и за дамп тела ответа.
+    Все кодеки дают одинаковый результат для UUID, datetime и экземпляров
+    классов данных pydantic (так же, как ServiceJSONEncoder), а объекты,
+    которые ServiceJSONEncoder не кодирует, не кодируют (расхождения
+    OrjsonCodec - см. его описание).
+
+    Двоичные кодеки (BINARY_CODECS) используются вместо json, если клиент
+    передает тело запроса с их типом содержимого (Content-Type) или
+    запрашивает ответ с ним (Accept), см. SimpleHandler.
+"""
+import json
+from dataclasses import is_dataclass
+from datetime import datetime
+from enum import Enum
+from typing import Any, Iterable, List, Optional, Union
+from uuid import UUID
+
+from pydantic import BaseModel
+
+from middlewares.exceptions import RequestBodyTooLarge
+from middlewares.utils import ServiceJSONEncoder, encode_model
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover
+    orjson = None
+
+try:
+    import msgpack
+except ImportError:  # pragma: no cover
+    msgpack = None
+
+# Таблица для bytes.translate: цифры -> "0", остальные байты -> пробел
+_DIGITS = bytes(
+    ord("0") if ord("0") <= byte <= ord("9") else ord(" ")
+    for byte in range(256)
+)
+# Целое число, которое может не поместиться в 64 бита (от 19 цифр)
+_LONG_NUMBER = b"0" * 19
+# Размер части данных, которая проверяется в has_long_numbers за раз (чтобы
+# не копировать все тело запроса)
+_LONG_NUMBERS_CHUNK = 64 * 1024
+
+
+class JSONCodec:
+    """ Кодек на стандартной библиотеке json.
+    """
+    name = "json"
+    content_type = "application/json"
+
+    def dumps(self, obj: Any) -> str:
+        """ Дамп объекта python в строку json.
+        """
+        return json.dumps(obj, cls=ServiceJSONEncoder)
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """ Дамп объекта python в bytes с json (utf-8).
+        """
+        return self.dumps(obj).encode()
+
+    def loads(self, data: bytes) -> Any:
+        """ Разбор json из bytes (или str).
+        """
+        return json.loads(data)
+
+
+def encode_default(obj: Any) -> Any:
+    """ Обработка типов, которые orjson и msgpack не кодируют сами (или
+        кодируют не так, как ServiceJSONEncoder).
+    """
+    if isinstance(obj, UUID):
+        return str(obj)
+    elif isinstance(obj, datetime):
+        return int(obj.timestamp())
+    elif isinstance(obj, BaseModel):
+        return encode_model(obj)
+    elif isinstance(obj, Enum) or is_dataclass(obj):
+        # json.dumps их не кодирует (кроме Enum - подклассов str и int,
+        # которые до default не доходят)
+        raise TypeError(
+            f"Object of type {obj.__class__.__name__} is not JSON "
+            f"serializable"
+        )
+
+    raise TypeError(
+        f"Object of type {obj.__class__.__name__} is not JSON serializable"
+    )
+
+
+def has_long_numbers(data: Union[bytes, str]) -> bool:
+    """ Проверяет, есть ли в data числа (или другие последовательности
+        цифр) длиной от 19 цифр.
+    """
+    if isinstance(data, str):
+        data = data.encode()
+
+    size = len(data)
+    if size <= _LONG_NUMBERS_CHUNK:
+        return _LONG_NUMBER in data.translate(_DIGITS)
+
+    # Части перекрываются, чтобы не пропустить число на их границе
+    overlap = len(_LONG_NUMBER) - 1
+    for start in range(0, size, _LONG_NUMBERS_CHUNK):
+        chunk = data[start:start + _LONG_NUMBERS_CHUNK + overlap]
+        if _LONG_NUMBER in chunk.translate(_DIGITS):
+            return True
+
+    return False
+
+
+class OrjsonCodec(JSONCodec):
+    """ Кодек на библиотеке orjson (работает с bytes напрямую).
+
+        Там, где orjson расходится со стандартной библиотекой, используется
+        она:
+
+        - целые числа вне 64 бит orjson разбирает во float (с потерей
+          точности), поэтому json, в котором есть последовательности от 19
+          цифр, разбирается json.loads;
+        - NaN, Infinity, одиночные суррогаты в строках и числа вне
+          диапазона float orjson не разбирает, и такой json разбирается
+          json.loads (некорректный json - тоже, ошибка будет от него);
+        - целые числа вне 64 бит, строки с одиночными суррогатами и
+          словари с ключами не str orjson не кодирует, и они кодируются
+          json.dumps (который ключи UUID и datetime тоже не кодирует);
+        - экземпляры dataclass и Enum (не подклассы str и int) json.dumps не
+          кодирует, dataclass передается в encode_default, а Enum
+          проверяется до orjson (он кодирует Enum сам, не вызывая default).
+
+        Расхождения остаются: NaN и Infinity orjson кодирует в null
+        (json.dumps - в NaN и Infinity, которые не являются корректным
+        json), а Enum, вложенные в списки, словари и экземпляры классов
+        данных, - в их значения.
+    """
+    name = "orjson"
+
+    def __init__(self) -> None:
+
+        if orjson is None:
+            raise RuntimeError("orjson is not installed")
+
+        # datetime и dataclass передаются в encode_default (orjson сам
+        # делает из них строку isoformat и словарь)
+        self.option = (
+            orjson.OPT_PASSTHROUGH_DATETIME |
+            orjson.OPT_PASSTHROUGH_DATACLASS
+        )
+
+    def dumps(self, obj: Any) -> str:
+
+        return self.dumps_bytes(obj).decode()
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+
+        if isinstance(obj, Enum):
+            return JSONCodec.dumps(self, obj).encode()
+
+        try:
+            return orjson.dumps(
+                obj, default=encode_default, option=self.option
+            )
+
+        except TypeError:
+            # В том числе объекты, которые не кодируются (json.dumps
+            # выдаст для них такую же ошибку)
+            return JSONCodec.dumps(self, obj).encode()
+
+    def loads(self, data: bytes) -> Any:
+
+        if not has_long_numbers(data):
+            try:
+                return orjson.loads(data)
+
+            except orjson.JSONDecodeError:
+                pass
+
+        return json.loads(data)
+
+
+class MsgpackCodec:
+    """ Кодек двоичного формата MessagePack (на библиотеке msgpack).
+    """
+    name = "msgpack"
+    content_type = "application/msgpack"
+    # Все типы содержимого, которые относятся к формату (первый - основной)
+    content_types = ("application/msgpack", "application/x-msgpack")
+
+    def __init__(self) -> None:
+
+        if msgpack is None:
+            raise RuntimeError("msgpack is not installed")
+
+    def dumps_bytes(self, obj: Any) -> bytes:
+        """ Дамп объекта python в bytes с MessagePack.
+        """
+        return msgpack.packb(obj, default=encode_default)
+
+    def loads(
+        self, data: bytes, max_array_length: Optional[int] = None
+    ) -> Any:
+        """ Разбор MessagePack из bytes.
+
+            max_array_length - максимальная длина массива и словаря
+            (проверяется библиотекой msgpack во время разбора, по заголовку
+            массива, до создания его элементов).
+        """
+        if max_array_length is None:
+            return msgpack.unpackb(data)
+
+        try:
+            return msgpack.unpackb(
+                data, max_array_len=max_array_length,
+                max_map_len=max_array_length,
+            )
+
+        except ValueError as error:
+            # msgpack не различает ошибки формата и превышения ограничений
+            if "exceeds max_" not in str(error):
+                raise
+            raise RequestBodyTooLarge(
+                f"Request body array has more than {max_array_length} items"
+            )
+
+
+CODECS = {
+    JSONCodec.name: JSONCodec,
+    OrjsonCodec.name: OrjsonCodec,
+}
+
+
+BINARY_CODECS = {
+    MsgpackCodec.name: MsgpackCodec,
+}
+
+
+def get_json_codec(name: str = "auto") -> JSONCodec:
+    """ Возвращает экземпляр кодека по его имени.
+
+        Для name="auto" отдается самый быстрый из установленных кодеков
+        (если orjson не установлен - кодек стандартной библиотеки).
+    """
+    if name == "auto":
+        name = OrjsonCodec.name if orjson is not None else JSONCodec.name
+
+    try:
+        codec_class = CODECS[name]
+
+    except KeyError:
+        raise ValueError(f"Unknown json codec: '{name}'")
+
+    return codec_class()
+
+
+def get_binary_codecs(
+    names: Optional[Iterable[str]] = None
+) -> List[MsgpackCodec]:
+    """ Возвращает экземпляры двоичных кодеков по их именам.
+
+        Для names=None отдаются все кодеки, библиотеки которых установлены.
+    """
+    if names is None:
+        names = [MsgpackCodec.name] if msgpack is not None else []
+
+    codecs = []
+    for name in names:
+        try:
+            codec_class = BINARY_CODECS[name]
+
+        except KeyError:
+            raise ValueError(f"Unknown binary codec: '{name}'")
+
+        codecs.append(codec_class())
+
+    return codecs
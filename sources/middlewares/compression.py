@@ -0,0 +1,272 @@
+""" Сжатие тел ответов.
+
+    Кодировка выбирается по заголовку запроса Accept-Encoding из доступных:
+    "zstd" (если установлена библиотека zstandard), "br" (если установлена
+    библиотека brotli), "gzip" и "deflate". Сжимаются только тела не меньше
+    порога (небольшие тела сжимать невыгодно), а тела не меньше
+    offload_threshold сжимаются в пуле потоков (библиотеки сжатия отпускают
+    GIL, и цикл событий не останавливается).
+
+    Тело ответа из кэша (см. response_cache) может состоять из постоянной
+    "головы" и небольшого "хвоста", который у каждого запроса свой
+    (например, id оболочки ответа). Для "gzip" и "deflate" голова сжимается
+    один раз (результат хранится в записи кэша), а для каждого ответа
+    отдельно сжимается только хвост: поток deflate головы завершается
+    блоком синхронизации, к нему дописывается отдельный поток deflate
+    хвоста, а контрольная сумма всего тела продолжается от суммы головы.
+"""
+import asyncio
+import struct
+import zlib
+from concurrent.futures import Executor
+from typing import Callable, Dict, Iterable, NamedTuple, Optional
+
+from aiohttp import hdrs, web
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:  # pragma: no cover
+    zstandard = None
+
+# Уровень сжатия zlib (для "gzip" и "deflate")
+ZLIB_LEVEL = 6
+# Качество сжатия brotli (0 - 11, высокие значения для ответов на лету
+# слишком медленные)
+BROTLI_QUALITY = 4
+# Уровень сжатия zstd
+ZSTD_LEVEL = 3
+
+# Заголовок gzip: сигнатура, метод deflate, без флагов и времени, ОС не
+# известна
+_GZIP_HEADER = b"\x1f\x8b\x08\x00\x00\x00\x00\x00\x00\xff"
+# Заголовок zlib: окно 32 Кб, уровень сжатия "по умолчанию"
+_ZLIB_HEADER = b"\x78\x9c"
+
+
+def compress_deflate_raw(data: bytes, final: bool = True) -> bytes:
+    """ Сжимает data в поток deflate (без заголовка и контрольной суммы).
+
+        Если final == False, то поток завершается блоком синхронизации (и к
+        нему можно дописать другой поток deflate).
+    """
+    if not data and final:
+        # Пустой последний блок (без создания компрессора)
+        return b"\x03\x00"
+
+    compressor = zlib.compressobj(ZLIB_LEVEL, zlib.DEFLATED, -zlib.MAX_WBITS)
+
+    return compressor.compress(data) + compressor.flush(
+        zlib.Z_FINISH if final else zlib.Z_SYNC_FLUSH
+    )
+
+
+class CompressedHead(NamedTuple):
+    """ Сжатая голова тела ответа (см. compress_head).
+    """
+    # Поток deflate головы, завершенный блоком синхронизации
+    deflate: bytes
+    # Контрольная сумма головы (crc32 для "gzip", adler32 для "deflate")
+    checksum: int
+    # Длина головы
+    length: int
+
+
+def compress_head(encoding: str, head: bytes) -> CompressedHead:
+    """ Сжимает голову тела ответа для кодировки "gzip" или "deflate".
+    """
+    checksum = zlib.crc32(head) if encoding == "gzip" else zlib.adler32(head)
+
+    return CompressedHead(
+        compress_deflate_raw(head, final=False), checksum, len(head)
+    )
+
+
+def compress_tail(encoding: str, head: CompressedHead, tail: bytes) -> bytes:
+    """ Возвращает сжатое тело ответа из сжатой головы и хвоста.
+    """
+    deflate = head.deflate + compress_deflate_raw(tail)
+
+    if encoding == "gzip":
+        crc = zlib.crc32(tail, head.checksum)
+        size = (head.length + len(tail)) & 0xFFFFFFFF
+        return _GZIP_HEADER + deflate + struct.pack("<II", crc, size)
+
+    adler = zlib.adler32(tail, head.checksum)
+    return _ZLIB_HEADER + deflate + struct.pack(">I", adler)
+
+
+def compress_gzip(data: bytes) -> bytes:
+
+    compressor = zlib.compressobj(
+        ZLIB_LEVEL, zlib.DEFLATED, 16 + zlib.MAX_WBITS
+    )
+
+    return compressor.compress(data) + compressor.flush()
+
+
+def compress_deflate(data: bytes) -> bytes:
+    return zlib.compress(data, ZLIB_LEVEL)
+
+
+def get_compressors() -> Dict[str, Callable[[bytes], bytes]]:
+    """ Возвращает словарь доступных кодировок и функций сжатия (в порядке
+        предпочтения).
+    """
+    compressors = {}
+
+    if zstandard is not None:
+        compressors["zstd"] = zstandard.ZstdCompressor(ZSTD_LEVEL).compress
+
+    if brotli is not None:
+        compressors["br"] = (
+            lambda data: brotli.compress(data, quality=BROTLI_QUALITY)
+        )
+
+    compressors["gzip"] = compress_gzip
+    compressors["deflate"] = compress_deflate
+
+    return compressors
+
+
+# Кодировки, для которых голову тела можно сжимать отдельно от хвоста
+SPLIT_ENCODINGS = frozenset(("gzip", "deflate"))
+
+
+def parse_accept_encoding(header: str) -> Dict[str, float]:
+    """ Возвращает словарь кодировок из заголовка Accept-Encoding и их
+        весов (q).
+    """
+    weights = {}
+
+    for part in header.split(","):
+        name, *params = part.split(";")
+        name = name.strip().lower()
+        if not name:
+            continue
+
+        weight = 1.0
+        for param in params:
+            key, _, value = param.partition("=")
+            if key.strip() == "q":
+                try:
+                    weight = float(value)
+                except ValueError:
+                    weight = 0.0
+
+        weights[name] = weight
+
+    return weights
+
+
+class ResponseCompressor:
+    """ Сжатие тел ответов.
+
+        threshold - минимальный размер тела (в байтах), которое сжимается.
+        encodings - разрешенные кодировки (по умолчанию - все доступные, в
+        порядке предпочтения).
+        Тела не меньше offload_threshold байт сжимаются в executor (None -
+        пул потоков цикла событий по умолчанию).
+    """
+
+    def __init__(
+        self, threshold: int = 1024,
+        encodings: Optional[Iterable[str]] = None,
+        offload_threshold: int = 64 * 1024,
+        executor: Optional[Executor] = None,
+    ) -> None:
+
+        self.threshold = threshold
+        self.offload_threshold = offload_threshold
+        self.executor = executor
+
+        compressors = get_compressors()
+        if encodings is not None:
+            encodings = set(encodings)
+            compressors = {
+                name: compress for name, compress in compressors.items()
+                if name in encodings
+            }
+        self.compressors = compressors
+
+        # Заголовок Accept-Encoding -> кодировка (вариантов заголовка у
+        # клиентов немного)
+        self.encodings_cache: Dict[str, Optional[str]] = {}
+
+    def choose_encoding(self, accept_encoding: str) -> Optional[str]:
+        """ Выбирает кодировку по заголовку Accept-Encoding (с наибольшим
+            весом, при равных весах - в порядке предпочтения).
+        """
+        encoding = self.encodings_cache.get(accept_encoding, "")
+        if encoding != "":
+            return encoding
+
+        weights = parse_accept_encoding(accept_encoding)
+        default_weight = weights.get("*", 0.0)
+
+        encoding = None
+        best_weight = 0.0
+        for name in self.compressors:
+            weight = weights.get(name, default_weight)
+            if weight > best_weight:
+                encoding, best_weight = name, weight
+
+        if len(self.encodings_cache) < 1000:
+            self.encodings_cache[accept_encoding] = encoding
+
+        return encoding
+
+    def get_encoding(
+        self, request: web.Request, body_size: int
+    ) -> Optional[str]:
+        """ Возвращает кодировку для тела ответа размером body_size (или
+            None, если тело не нужно сжимать).
+        """
+        if body_size < self.threshold:
+            return None
+
+        accept_encoding = request.headers.get("Accept-Encoding")
+        if not accept_encoding:
+            return None
+
+        return self.choose_encoding(accept_encoding)
+
+    async def run(self, body_size: int, func: Callable, *args) -> bytes:
+        """ Выполняет func(*args) - в пуле потоков для больших тел.
+        """
+        if body_size < self.offload_threshold:
+            return func(*args)
+
+        return await asyncio.get_running_loop().run_in_executor(
+            self.executor, func, *args
+        )
+
+    async def compress(self, encoding: str, body: bytes) -> bytes:
+        """ Сжимает тело ответа.
+        """
+        return await self.run(len(body), self.compressors[encoding], body)
+
+    async def compress_head(
+        self, encoding: str, head: bytes
+    ) -> CompressedHead:
+        """ Сжимает голову тела ответа (для кодировок из SPLIT_ENCODINGS).
+        """
+        return await self.run(len(head), compress_head, encoding, head)
+
+    def set_headers(
+        self, response: web.StreamResponse, encoding: Optional[str]
+    ) -> None:
+        """ Добавляет в ответ заголовки сжатого тела (encoding None - тело
+            не сжато).
+
+            Vary добавляется к каждому ответу, тело которого могло быть
+            сжато (и к ответу без сжатия - иначе общий кэш отдаст его всем
+            клиентам).
+        """
+        if encoding is not None:
+            response.headers[hdrs.CONTENT_ENCODING] = encoding
+        response.headers.add(hdrs.VARY, hdrs.ACCEPT_ENCODING)
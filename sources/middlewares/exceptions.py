@@ -12,3 +12,15 @@ class InvalidHandlerArgument(MiddlewaresError):
 
 class InputDataValidationError(MiddlewaresError):
     pass
+
+
+class InvalidRequestBody(InputDataValidationError):
+    pass
+
+
+class RequestBodyTooLarge(InputDataValidationError):
+    pass
+
+
+class RequestBodyTooDeep(InvalidRequestBody):
+    pass
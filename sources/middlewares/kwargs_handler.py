@@ -1,11 +1,18 @@
-from copy import copy
-from typing import Any, Callable
+from typing import Any, Callable, Dict
 
 from aiohttp import web
+from valdec.errors import ValidationArgumentsError
 
 from middlewares.exceptions import InvalidHandlerArgument
+from middlewares.routes import RouteOptions, get_handler_annotations
 from middlewares.simple_handler import SimpleHandler
-from middlewares.utils import ArgumentsManager, RawDataForArgument
+from middlewares.utils import ArgumentsManager, HandlerArgumentsPlan
+from middlewares.validation import (get_unvalidated, is_validated_argument,
+                                    validate, validate_arguments)
+
+
+def get_original_request(request: web.Request, request_body: Any):
+    return request
 
 
 class KwargsHandler(SimpleHandler):
@@ -22,12 +29,26 @@ class KwargsHandler(SimpleHandler):
         Аргумент, который должен принять в обработчик оригинальный request,
         не требует регистрации. Он может иметь в сигнатуре обработчика любое
         имя, но обязательно должен быть аннотирован типом: web.Request
+
+        Аннотации обработчиков разбираются один раз, в "план" аргументов
+        (см. build_handler_arguments_plan). Планы для всех обработчиков
+        приложения можно собрать при старте приложения (см. on_startup),
+        тогда ошибки в сигнатурах обработчиков обнаружатся сразу.
     """
 
-    def __init__(self, arguments_manager: ArgumentsManager) -> None:
+    def __init__(
+        self, arguments_manager: ArgumentsManager, **kwargs: Any
+    ) -> None:
+        """ Остальные именованные аргументы передаются в SimpleHandler.
+        """
+        super().__init__(**kwargs)
 
         self.arguments_manager = arguments_manager
 
+        self.handlers_arguments_plans: Dict[
+            Callable, HandlerArgumentsPlan
+        ] = {}
+
     def build_error_message_for_invalid_handler_argument(
         self, handler: Callable, arg_name: str, annotation: Any
     ) -> str:
@@ -39,35 +60,31 @@ class KwargsHandler(SimpleHandler):
 
         return message
 
-    def make_handler_kwargs(
-        self, request: web.Request, handler: Callable, request_body: Any
-    ) -> dict:
-        """ Собирает и возвращает kwargs для последующего его использования
-            при вызове обработчика.
+    def build_handler_arguments_plan(
+        self, handler: Callable
+    ) -> HandlerArgumentsPlan:
+        """ Разбирает аннотации обработчика и возвращает кортеж пар
+            (имя аргумента, функция получения значения аргумента).
 
             Внимание! Все аргументы у обработчиков должны иметь аннотации.
         """
-        kwargs = {}
+        plan = []
 
-        annotations = copy(handler.__annotations__)
-        annotations.pop("return", None)
+        for arg_name, annotation in get_handler_annotations(handler).items():
 
-        raw_data = RawDataForArgument(request, request_body)
-
-        for arg_name, annotation in annotations.items():
+            if arg_name == "return":
+                continue
 
             # Если обработчик имеет аргумент с аннотацией aiohttp.web.Request,
             # то передадим в него экземпляр оригинального request
             if annotation is web.Request:
-                kwargs[arg_name] = request
+                plan.append((arg_name, get_original_request))
                 continue
 
-            raw_data.arg_name = arg_name
-
             try:
                 # функция которая затем вернет нам значение для
                 # аргумента с arg_name
-                get_arg_value = self.arguments_manager.getters[arg_name]
+                getter = self.arguments_manager.build_getter(arg_name)
 
             except KeyError:
                 msg = self.build_error_message_for_invalid_handler_argument(
@@ -75,9 +92,110 @@ class KwargsHandler(SimpleHandler):
                 )
                 raise InvalidHandlerArgument(msg)
 
-            kwargs[arg_name] = get_arg_value(raw_data)
+            plan.append((arg_name, getter))
 
-        return kwargs
+        return tuple(plan)
+
+    def get_handler_arguments_plan(
+        self, handler: Callable
+    ) -> HandlerArgumentsPlan:
+        """ Отдает план аргументов обработчика (если плана еще нет, то он
+            будет собран и сохранен).
+        """
+        try:
+            return self.handlers_arguments_plans[handler]
+
+        except KeyError:
+            plan = self.build_handler_arguments_plan(handler)
+            self.handlers_arguments_plans[handler] = plan
+
+            return plan
+
+    def prepare_handler(
+        self, handler: Callable, options: RouteOptions
+    ) -> Callable:
+        """ Включает (options.validate == True) валидацию аргументов с
+            данными из тела запроса декоратором validate, или выключает
+            (options.validate == False) валидацию декоратора обработчика.
+        """
+        handler = super().prepare_handler(handler, options)
+
+        is_validated = getattr(handler, "validated_names", None) is not None
+
+        if options.validate is True and not is_validated:
+            names = [
+                name for name in get_handler_annotations(handler)
+                if name in self.arguments_manager.request_body_names
+            ]
+            if names:
+                handler = validate(*names)(handler)
+
+        elif options.validate is False and is_validated:
+            handler = get_unvalidated(handler)
+
+        return handler
+
+    def compile_app_handlers(self, app: web.Application) -> None:
+        """ Собирает также планы аргументов для всех обработчиков сервиса,
+            зарегистрированных в маршрутах приложения.
+        """
+        super().compile_app_handlers(app)
+
+        for handler in self.service_handlers.values():
+            if handler is not None:
+                self.get_handler_arguments_plan(handler)
+
+    def make_handler_kwargs(
+        self, request: web.Request, handler: Callable, request_body: Any
+    ) -> dict:
+        """ Собирает и возвращает kwargs для последующего его использования
+            при вызове обработчика.
+        """
+        return {
+            arg_name: getter(request, request_body)
+            for arg_name, getter in self.get_handler_arguments_plan(handler)
+        }
+
+    async def offload_validation(
+        self, handler: Callable, kwargs: Dict[str, Any]
+    ) -> Dict[str, Any]:
+        """ Проводит валидацию аргументов с данными из тела запроса в пуле
+            offload_executor (для аргументов, которые проверяет декоратор
+            validate обработчика).
+
+            Возвращает kwargs, в которых значения этих аргументов заменены
+            значениями после валидации (экземпляры классов данных декоратор
+            повторно не проверяет). Ошибка валидации - ValidationArgumentsError
+            (как у декоратора), а если пул не смог выполнить валидацию,
+            то возвращаются исходные kwargs (их проверит декоратор).
+        """
+        names = [
+            name for name in kwargs
+            if name in self.arguments_manager.request_body_names and
+            is_validated_argument(handler, name)
+        ]
+        if not names:
+            return kwargs
+
+        handler_annotations = get_handler_annotations(handler)
+        annotations = {name: handler_annotations[name] for name in names}
+        values = {name: kwargs[name] for name in names}
+
+        try:
+            values = await self.run_offload(
+                validate_arguments, annotations, values
+            )
+
+        except ValidationArgumentsError:
+            # Повторная валидация декоратором (в цикле событий) выдала бы
+            # такую же ошибку
+            raise
+
+        except Exception:
+            # Например, данные, которые не передаются в процесс
+            return kwargs
+
+        return {**kwargs, **values}
 
     async def run_handler(
         self, request: web.Request, handler: Callable, request_body: Any
@@ -89,4 +207,13 @@ class KwargsHandler(SimpleHandler):
         """
         kwargs = self.make_handler_kwargs(request, handler, request_body)
 
-        return await handler(**kwargs)
+        if self.offload_executor is not None and self.is_offload_request(
+            request
+        ):
+            kwargs = await self.offload_validation(handler, kwargs)
+
+        result = await handler(**kwargs)
+
+        self.invalidate_response_cache(handler, request_body, result)
+
+        return result
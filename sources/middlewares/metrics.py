@@ -0,0 +1,208 @@
+""" Метрики middleware (в формате Prometheus).
+
+    Для каждого запроса к обработчику сервиса измеряется длительность этапов
+    его обработки (разбор тела запроса, запуск обработчика, дамп ответа и
+    т.д.). Длительности собираются в гистограммы с разбивкой по этапу,
+    маршруту и коду статуса ответа, и отдаются обработчиком Metrics.handler
+    в текстовом формате Prometheus.
+
+    Кроме гистограмм, отдаются значения, которые берутся при выводе метрик
+    (например, счетчики кэша ответов, см. Metrics.add_value).
+"""
+from bisect import bisect_left
+from collections import defaultdict
+from time import perf_counter
+from typing import Callable, DefaultDict, Dict, List, Sequence, Tuple
+
+from aiohttp import web
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Границы корзин гистограмм по умолчанию (в секундах)
+DEFAULT_BUCKETS = (
+    0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+    0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+
+class Histogram:
+    """ Гистограмма с заранее выделенными корзинами.
+
+        counts[i] - количество значений, попавших в i-ю корзину (последняя -
+        для значений больше всех границ, "+Inf").
+    """
+    __slots__ = ("buckets", "counts", "sum")
+
+    def __init__(self, buckets: Sequence[float]) -> None:
+
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)
+        self.sum = 0.0
+
+    def observe(self, value: float) -> None:
+        """ Добавляет значение в гистограмму.
+        """
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+
+
+class RequestTimer:
+    """ Измеряет длительность этапов обработки одного запроса.
+
+        Отметки окончания этапов запоминаются, и длительности попадают в
+        гистограммы при вызове finish (когда известен код статуса ответа).
+    """
+    __slots__ = ("metrics", "route", "started", "marks")
+
+    def __init__(self, metrics: "Metrics", route: str) -> None:
+
+        self.metrics = metrics
+        self.route = route
+        self.started = perf_counter()
+        self.marks: List[Tuple[str, float]] = []
+
+    def mark(self, stage: str) -> None:
+        """ Отмечает окончание этапа stage (его длительность - время с
+            окончания предыдущего этапа).
+        """
+        self.marks.append((stage, perf_counter()))
+
+    def finish(self, status: int) -> None:
+        """ Отправляет длительности этапов и всего запроса ("total") в
+            гистограммы.
+        """
+        finished = perf_counter()
+        histograms = self.metrics.get_histograms(self.route, status)
+
+        last = self.started
+        for stage, moment in self.marks:
+            histograms[stage].observe(moment - last)
+            last = moment
+
+        histograms["total"].observe(finished - self.started)
+
+
+class NullTimer:
+    """ Таймер, который ничего не измеряет (если метрики выключены).
+    """
+    __slots__ = ()
+
+    def mark(self, stage: str) -> None:
+        pass
+
+    def finish(self, status: int) -> None:
+        pass
+
+
+NULL_TIMER = NullTimer()
+
+
+class Metrics:
+    """ Гистограммы длительностей этапов обработки запросов.
+    """
+
+    def __init__(
+        self, name: str = "service_request_stage_duration_seconds",
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+
+        self.name = name
+        self.buckets = tuple(buckets)
+
+        # (маршрут, код статуса) -> {этап: гистограмма}
+        self.histograms: Dict[Tuple[str, int], Dict[str, Histogram]] = {}
+        # Имя метрики -> (тип, описание, функция, которая возвращает
+        # значение)
+        self.values: Dict[str, Tuple[str, str, Callable[[], float]]] = {}
+
+    def get_timer(self, route: str) -> RequestTimer:
+        """ Возвращает таймер для запроса к маршруту route.
+        """
+        return RequestTimer(self, route)
+
+    def get_histograms(
+        self, route: str, status: int
+    ) -> DefaultDict[str, Histogram]:
+        """ Возвращает словарь гистограмм этапов для маршрута и кода статуса
+            (гистограмма для нового этапа создается при первом обращении).
+        """
+        key = (route, status)
+
+        histograms = self.histograms.get(key)
+        if histograms is None:
+            buckets = self.buckets
+            histograms = self.histograms[key] = defaultdict(
+                lambda: Histogram(buckets)
+            )
+
+        return histograms
+
+    def observe(
+        self, stage: str, route: str, status: int, value: float
+    ) -> None:
+        """ Добавляет длительность этапа в гистограмму.
+        """
+        self.get_histograms(route, status)[stage].observe(value)
+
+    def add_value(
+        self, name: str, kind: str, description: str,
+        getter: Callable[[], float],
+    ) -> None:
+        """ Добавляет метрику с одним значением (kind - "counter" или
+            "gauge"), которое берется из getter при выводе метрик.
+        """
+        self.values[name] = (kind, description, getter)
+
+    def render(self) -> str:
+        """ Возвращает гистограммы в текстовом формате Prometheus.
+        """
+        name = self.name
+        lines = [
+            f"# HELP {name} Duration of request processing stages.",
+            f"# TYPE {name} histogram",
+        ]
+        bounds = [repr(float(bound)) for bound in self.buckets] + ["+Inf"]
+
+        items = sorted(
+            ((stage, route, status), histogram)
+            for (route, status), histograms in self.histograms.items()
+            for stage, histogram in histograms.items()
+        )
+        for (stage, route, status), histogram in items:
+            labels = (
+                f'stage="{stage}",route="{escape_label(route)}",'
+                f'status="{status}"'
+            )
+
+            count = 0
+            for bound, bucket_count in zip(bounds, histogram.counts):
+                count += bucket_count
+                lines.append(f'{name}_bucket{{{labels},le="{bound}"}} {count}')
+
+            lines.append(f"{name}_sum{{{labels}}} {histogram.sum!r}")
+            lines.append(f"{name}_count{{{labels}}} {count}")
+
+        for value_name, (kind, description, getter) in sorted(
+            self.values.items()
+        ):
+            lines.append(f"# HELP {value_name} {description}")
+            lines.append(f"# TYPE {value_name} {kind}")
+            lines.append(f"{value_name} {getter()}")
+
+        return "\n".join(lines) + "\n"
+
+    async def handler(self, request: web.Request) -> web.Response:
+        """ Обработчик для маршрута метрик.
+        """
+        return web.Response(
+            body=self.render().encode(),
+            headers={"Content-Type": CONTENT_TYPE},
+        )
+
+
+def escape_label(value: str) -> str:
+    """ Экранирует значение метки для текстового формата Prometheus.
+    """
+    return (
+        value.replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+    )
@@ -0,0 +1,76 @@
+""" Вынос тяжелой работы с большими телами запросов из цикла событий.
+
+    Для запросов, тело которых не меньше порога (см.
+    SimpleHandler.offload_threshold), разбор json, валидация данных для
+    обработчика и дамп ответа выполняются в пуле (процессов или потоков),
+    чтобы цикл событий не останавливался на десятки миллисекунд, и
+    остальные запросы обслуживались без задержки. Небольшие запросы
+    обрабатываются как обычно.
+
+    Пул процессов обходит GIL, но данные передаются в него и обратно через
+    pickle. Экземпляры классов данных pydantic сериализуются pickle дольше,
+    чем json-кодеком, поэтому с пулом процессов дамп ответа выполняется в
+    цикле событий (см. can_offload_dumps). Пул потоков (для сборок python
+    без GIL) выполняет все три этапа.
+"""
+import multiprocessing
+import sys
+from concurrent.futures import (Executor, ProcessPoolExecutor,
+                                ThreadPoolExecutor)
+from typing import Optional
+
+from aiohttp import web
+
+
+def is_free_threaded() -> bool:
+    """ Проверяет, работает ли python без GIL.
+    """
+    is_gil_enabled = getattr(sys, "_is_gil_enabled", None)
+
+    return is_gil_enabled is not None and not is_gil_enabled()
+
+
+def get_offload_executor(
+    kind: str, workers: Optional[int] = None
+) -> Optional[Executor]:
+    """ Возвращает пул для выноса работы из цикла событий.
+
+        kind:
+        - "process" - пул процессов;
+        - "thread" - пул потоков;
+        - "auto" - пул потоков, если python работает без GIL, иначе пул
+          процессов;
+        - "" - None (вынос работы выключен).
+    """
+    if not kind:
+        return None
+
+    if kind == "auto":
+        kind = "thread" if is_free_threaded() else "process"
+
+    if kind == "thread":
+        return ThreadPoolExecutor(workers, thread_name_prefix="offload")
+
+    if kind == "process":
+        # Процессы запускаются "с нуля" (а не копией процесса сервиса с его
+        # циклом событий и потоками)
+        return ProcessPoolExecutor(
+            workers, mp_context=multiprocessing.get_context("spawn")
+        )
+
+    raise ValueError(f"Unknown offload executor: '{kind}'")
+
+
+def can_offload_dumps(executor: Executor) -> bool:
+    """ Проверяет, выгодно ли выполнять дамп ответа в пуле executor.
+    """
+    return not isinstance(executor, ProcessPoolExecutor)
+
+
+def shutdown_on_cleanup(app: web.Application, executor: Executor) -> None:
+    """ Останавливает пул executor при завершении работы приложения.
+    """
+    async def on_cleanup(app: web.Application) -> None:
+        executor.shutdown()
+
+    app.on_cleanup.append(on_cleanup)
@@ -0,0 +1,199 @@
+""" Семплирующий профилировщик для работающего сервиса.
+
+    Профилировщик включается на заданное время (по сигналу или запросу к
+    маршруту профилировщика) без перезапуска сервиса. Пока он выключен,
+    никакой работы не выполняется.
+
+    Во время работы отдельный поток с интервалом interval снимает стек
+    потока, в котором работает цикл событий, и считает одинаковые стеки.
+    Результат записывается в файл в формате "collapsed stacks" (одна строка
+    на стек: кадры через ";" и количество семплов), который понимают
+    flamegraph.pl, speedscope и аналоги.
+
+    Первым кадром каждого стека идет имя обработчика сервиса, который
+    выполнялся в этот момент (берется из аргумента handler метода
+    run_handler middleware), или "-", если обработчик не выполнялся.
+"""
+import asyncio
+import os
+import signal
+import sys
+import threading
+import time
+from collections import Counter
+from types import CodeType, FrameType
+from typing import Any, Collection, Dict, List, Optional
+
+from aiohttp import web
+
+from middlewares.kwargs_handler import KwargsHandler
+from middlewares.simple_handler import SimpleHandler
+
+# Максимальное время работы профилировщика, включенного запросом
+MAX_SECONDS = 600
+
+# Коды методов, в кадрах которых берется обработчик для стека
+RUN_HANDLER_CODES = frozenset((
+    SimpleHandler.run_handler.__code__, KwargsHandler.run_handler.__code__,
+))
+
+
+def get_frame_name(code: CodeType) -> str:
+    """ Возвращает имя кадра стека.
+    """
+    name = getattr(code, "co_qualname", code.co_name)
+
+    return f"{os.path.basename(code.co_filename)}:{name}"
+
+
+def get_handler_name(handler: Any) -> str:
+    """ Возвращает имя обработчика сервиса для стека.
+    """
+    module = getattr(handler, "__module__", None)
+    name = getattr(handler, "__qualname__", None) or repr(handler)
+
+    return f"handler:{module}.{name}" if module else f"handler:{name}"
+
+
+class SamplingProfiler:
+    """ Семплирующий профилировщик стека потока цикла событий.
+
+        Если передан signal_name (например "SIGUSR1"), то при получении
+        процессом этого сигнала профилировщик включается на signal_seconds
+        секунд (обработчик сигнала устанавливается при старте приложения,
+        см. on_startup).
+    """
+
+    def __init__(
+        self, output_dir: str, interval: float = 0.005,
+        signal_name: Optional[str] = None, signal_seconds: float = 30,
+        run_handler_codes: Collection[CodeType] = RUN_HANDLER_CODES,
+    ) -> None:
+
+        self.output_dir = output_dir
+        self.interval = interval
+        self.signal_name = signal_name
+        self.signal_seconds = signal_seconds
+        self.run_handler_codes = run_handler_codes
+
+        self.thread: Optional[threading.Thread] = None
+        # Файл с результатом последнего запуска
+        self.path: Optional[str] = None
+
+    @property
+    def is_running(self) -> bool:
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self, seconds: float) -> str:
+        """ Включает профилировщик на seconds секунд для текущего потока.
+            Возвращает путь файла, в который будет записан результат.
+
+            Если профилировщик уже работает - будет исключение RuntimeError.
+        """
+        if self.is_running:
+            raise RuntimeError("Profiler is already running")
+
+        timestamp = time.strftime("%Y%m%d-%H%M%S")
+        self.path = os.path.join(
+            self.output_dir, f"profile-{os.getpid()}-{timestamp}.collapsed"
+        )
+
+        self.thread = threading.Thread(
+            target=self.run,
+            args=(threading.get_ident(), seconds, self.path),
+            name="sampling-profiler", daemon=True,
+        )
+        self.thread.start()
+
+        return self.path
+
+    def get_stack(self, frame: Optional[FrameType]) -> str:
+        """ Возвращает стек (от внешнего кадра к внутреннему) в виде строки
+            с кадрами через ";".
+        """
+        frames: List[str] = []
+        handler_name = "-"
+
+        while frame is not None:
+            code = frame.f_code
+            frames.append(get_frame_name(code))
+
+            if handler_name == "-" and code in self.run_handler_codes:
+                handler_name = get_handler_name(frame.f_locals.get("handler"))
+
+            frame = frame.f_back
+
+        frames.append(handler_name)
+        frames.reverse()
+
+        return ";".join(frames)
+
+    def sample(self, thread_id: int, seconds: float) -> Dict[str, int]:
+        """ Снимает стеки потока thread_id в течение seconds секунд.
+        """
+        stacks: Dict[str, int] = Counter()
+
+        interval = self.interval
+        finish = time.monotonic() + seconds
+
+        while time.monotonic() < finish:
+            time.sleep(interval)
+
+            frame = sys._current_frames().get(thread_id)
+            if frame is None:
+                break
+
+            stacks[self.get_stack(frame)] += 1
+            # Ссылка на кадр не должна жить дольше, чем нужно
+            del frame
+
+        return stacks
+
+    def run(self, thread_id: int, seconds: float, path: str) -> None:
+        """ Снимает стеки и записывает результат в файл path (выполняется в
+            отдельном потоке).
+        """
+        stacks = self.sample(thread_id, seconds)
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        with open(path, "w") as file:
+            for stack, count in sorted(stacks.items()):
+                file.write(f"{stack} {count}\n")
+
+    # Включение профилировщика ----------------------------------------------
+
+    def on_signal(self) -> None:
+        """ Включает профилировщик по сигналу (если он еще не работает).
+        """
+        if not self.is_running:
+            self.start(self.signal_seconds)
+
+    async def on_startup(self, app: web.Application) -> None:
+        """ Устанавливает обработчик сигнала (в потоке цикла событий).
+        """
+        if self.signal_name:
+            asyncio.get_running_loop().add_signal_handler(
+                getattr(signal, self.signal_name), self.on_signal
+            )
+
+    async def handler(self, request: web.Request) -> web.Response:
+        """ Обработчик для маршрута профилировщика (seconds - в параметре
+            запроса, по умолчанию 10).
+        """
+        try:
+            seconds = float(request.query.get("seconds", "10"))
+            if not 0 < seconds <= MAX_SECONDS:
+                raise ValueError(
+                    f"seconds must be greater than 0 and not greater than "
+                    f"{MAX_SECONDS}"
+                )
+
+            path = self.start(seconds)
+
+        except ValueError as error:
+            return web.json_response({"error": str(error)}, status=400)
+
+        except RuntimeError as error:
+            return web.json_response({"error": str(error)}, status=409)
+
+        return web.json_response({"path": path, "seconds": seconds})
@@ -0,0 +1,261 @@
+""" Кэш ответов обработчиков.
+
+    Для обработчиков, которые только читают данные, ответ можно сохранять в
+    кэше (уже в виде bytes с json-дампом результата) и отдавать повторно без
+    запуска обработчика.
+
+    Кэширование включается для обработчика декоратором cache_response, а
+    сброс записей кэша после работы "пишущего" обработчика - декоратором
+    invalidate_cache. Сам кэш (экземпляр ResponseCache) передается в
+    middleware (см. SimpleHandler).
+"""
+from collections import OrderedDict
+from dataclasses import dataclass
+from time import monotonic
+from typing import (Any, Callable, Dict, Hashable, Iterable, Optional, Set,
+                    Tuple)
+
+from middlewares.metrics import Metrics
+
+# Функция, которая возвращает теги для записи кэша по данным обработчика
+CacheTagsGetter = Callable[[Any], Iterable]
+# Функция, которая возвращает теги для сброса записей кэша по данным и
+# результату "пишущего" обработчика
+InvalidateTagsGetter = Callable[[Any, Any], Iterable]
+# Запись кэша: (время окончания жизни или None, значение, теги, варианты
+# значения)
+CacheEntry = Tuple[Optional[float], bytes, Tuple[str, ...], Dict[str, Any]]
+
+
+@dataclass(frozen=True)
+class ResponseCacheOptions:
+    """ Параметры кэширования ответа обработчика.
+    """
+    # Время жизни записи в секундах (None - без ограничения)
+    ttl: Optional[float] = None
+    # Теги записи (по ним записи сбрасываются, см. invalidate_cache)
+    tags: Optional[CacheTagsGetter] = None
+
+
+@dataclass(frozen=True)
+class InvalidateCacheOptions:
+    """ Параметры сброса записей кэша после работы обработчика.
+    """
+    # Теги записей, которые надо сбросить (None - сбросить весь кэш)
+    tags: Optional[InvalidateTagsGetter] = None
+
+
+def cache_response(**options: Any) -> Callable:
+    """ Декоратор обработчика, включает кэширование его ответа.
+
+        Ключ записи кэша - обработчик, параметры из url и данные для
+        обработчика (то есть ответ обработчика должен зависеть только от
+        них). Кэшируются только успешные ответы.
+
+        Параметры - см. ResponseCacheOptions.
+    """
+    response_cache_options = ResponseCacheOptions(**options)
+
+    def decorator(handler: Callable) -> Callable:
+        handler.response_cache_options = response_cache_options
+        return handler
+
+    return decorator
+
+
+def invalidate_cache(**options: Any) -> Callable:
+    """ Декоратор обработчика, после успешной работы которого сбрасываются
+        записи кэша.
+
+        Параметры - см. InvalidateCacheOptions.
+    """
+    invalidate_cache_options = InvalidateCacheOptions(**options)
+
+    def decorator(handler: Callable) -> Callable:
+        handler.invalidate_cache_options = invalidate_cache_options
+        return handler
+
+    return decorator
+
+
+def get_response_cache_options(
+    handler: Callable
+) -> Optional[ResponseCacheOptions]:
+    """ Возвращает параметры кэширования ответа обработчика (или None, если
+        для обработчика кэширование не включено).
+    """
+    return getattr(handler, "response_cache_options", None)
+
+
+def get_invalidate_cache_options(
+    handler: Callable
+) -> Optional[InvalidateCacheOptions]:
+    """ Возвращает параметры сброса записей кэша для обработчика (или None,
+        если обработчик записи кэша не сбрасывает).
+    """
+    return getattr(handler, "invalidate_cache_options", None)
+
+
+def freeze(value: Any) -> Hashable:
+    """ Возвращает хешируемое представление данных из json (для ключа
+        записи кэша).
+
+        Для значений, которых не может быть в json, будет исключение
+        TypeError.
+    """
+    if isinstance(value, dict):
+        return frozenset((key, freeze(item)) for key, item in value.items())
+
+    if isinstance(value, list):
+        return tuple(freeze(item) for item in value)
+
+    # True == 1 и 1.0 == 1, поэтому для bool и float добавляется тип
+    if isinstance(value, (bool, float)):
+        return (type(value), value)
+
+    if value is None or isinstance(value, (str, int)):
+        return value
+
+    raise TypeError(f"Object of type {type(value).__name__} is not cacheable")
+
+
+class ResponseCache:
+    """ Кэш ответов с ограничением количества записей (вытесняются записи,
+        которые дольше всего не использовались) и временем жизни записей.
+
+        hits и misses - счетчики попаданий и промахов.
+    """
+
+    def __init__(self, max_size: int = 10000) -> None:
+
+        self.max_size = max_size
+
+        self.entries: "OrderedDict[Hashable, CacheEntry]" = OrderedDict()
+        # Тег -> ключи записей
+        self.tags_keys: Dict[str, Set[Hashable]] = {}
+
+        # Увеличивается при каждом сбросе записей. Значение, полученное до
+        # сброса, в кэш уже не сохраняется (оно могло устареть).
+        self.generation = 0
+
+        self.hits = 0
+        self.misses = 0
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+    def get(self, key: Hashable) -> Optional[bytes]:
+        """ Возвращает значение из кэша (или None, если его нет).
+        """
+        entry = self.entries.get(key)
+
+        if entry is not None:
+            expires = entry[0]
+            if expires is None or expires > monotonic():
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[1]
+
+            self.delete(key)
+
+        self.misses += 1
+
+        return None
+
+    def set(
+        self, key: Hashable, value: bytes, ttl: Optional[float] = None,
+        tags: Iterable = (), generation: Optional[int] = None,
+    ) -> None:
+        """ Сохраняет значение в кэше.
+
+            Если передан generation и с тех пор записи сбрасывались, то
+            значение не сохраняется.
+        """
+        if generation is not None and generation != self.generation:
+            return
+
+        if key in self.entries:
+            self.delete(key)
+
+        expires = None if ttl is None else monotonic() + ttl
+        tags = tuple(str(tag) for tag in tags)
+
+        self.entries[key] = (expires, value, tags, {})
+        for tag in tags:
+            self.tags_keys.setdefault(tag, set()).add(key)
+
+        while len(self.entries) > self.max_size:
+            self.delete(next(iter(self.entries)))
+
+    def get_variant(self, key: Hashable, name: str) -> Any:
+        """ Возвращает вариант значения записи (например, сжатое значение)
+            или None, если его нет.
+
+            (Время жизни записи не проверяется - вариант запрашивается сразу
+            после get)
+        """
+        entry = self.entries.get(key)
+
+        return None if entry is None else entry[3].get(name)
+
+    def set_variant(
+        self, key: Hashable, value: bytes, name: str, variant: Any
+    ) -> None:
+        """ Сохраняет вариант значения value записи (если запись с этим
+            значением еще есть в кэше). Варианты удаляются вместе с записью.
+        """
+        entry = self.entries.get(key)
+
+        if entry is not None and entry[1] is value:
+            entry[3][name] = variant
+
+    def delete(self, key: Hashable) -> None:
+        """ Удаляет запись из кэша.
+        """
+        _, _, tags, _ = self.entries.pop(key)
+
+        for tag in tags:
+            keys = self.tags_keys[tag]
+            keys.discard(key)
+            if not keys:
+                del self.tags_keys[tag]
+
+    def invalidate(self, tags: Iterable) -> None:
+        """ Сбрасывает записи, которые имеют хотя бы один из тегов.
+        """
+        self.generation += 1
+
+        for tag in tags:
+            for key in tuple(self.tags_keys.get(str(tag), ())):
+                self.delete(key)
+
+    def clear(self) -> None:
+        """ Сбрасывает все записи.
+        """
+        self.generation += 1
+
+        self.entries.clear()
+        self.tags_keys.clear()
+
+    def stats(self) -> Dict[str, int]:
+        """ Возвращает словарь со счетчиками кэша.
+        """
+        return dict(hits=self.hits, misses=self.misses, size=len(self))
+
+    def add_metrics(
+        self, metrics: Metrics, prefix: str = "service_response_cache"
+    ) -> None:
+        """ Добавляет счетчики кэша (см. stats) в метрики middleware.
+        """
+        metrics.add_value(
+            f"{prefix}_hits_total", "counter", "Response cache hits.",
+            lambda: self.hits,
+        )
+        metrics.add_value(
+            f"{prefix}_misses_total", "counter", "Response cache misses.",
+            lambda: self.misses,
+        )
+        metrics.add_value(
+            f"{prefix}_size", "gauge", "Response cache entries.",
+            lambda: len(self),
+        )
@@ -0,0 +1,212 @@
+""" Регистрация маршрутов с обработчиками сервиса.
+
+    Обработчик сервиса (который получает разобранное тело запроса и
+    возвращает объект для ответа) отмечается при регистрации маршрута:
+    декоратором mark_service_handler или функциями service_route,
+    service_post и service_get (вместо web.route, web.post и web.get).
+
+    Отметка позволяет регистрировать обработчиками сервиса не только
+    функции, но и functools.partial, методы и экземпляры классов с
+    асинхронным __call__. Обработчики без отметки определяются по типу
+    (обработчик сервиса - функция, см. SimpleHandler.is_json_service_handler).
+
+    Функциям service_route, service_post и service_get можно передать
+    параметры обработки запросов маршрута (см. RouteOptions): валидацию,
+    кэширование ответов, потоковый разбор тела запроса, ограничения тела
+    запроса и двоичные форматы. Они заменяют параметры, заданные
+    декораторами обработчика, только для этого маршрута.
+
+    Middleware проверяет отметку и собирает параметры один раз для каждого
+    маршрута (см. SimpleHandler.get_route_pipeline), и для запроса выбор
+    обработчика и его параметров - это поиск в словаре по маршруту.
+"""
+import functools
+import inspect
+import weakref
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Union
+
+from aiohttp import web
+
+from middlewares.body_limits import BodyLimitsOptions
+from middlewares.response_cache import ResponseCacheOptions
+from middlewares.stream_body import StreamBodyOptions
+
+
+@dataclass(frozen=True)
+class RouteOptions:
+    """ Параметры обработки запросов маршрута (None - как задано
+        декораторами обработчика и параметрами middleware).
+    """
+    # Валидация декоратором validate (см. KwargsHandler.prepare_handler):
+    # True - проверяются аргументы с данными из тела запроса (если
+    # обработчик не декорирован), False - без валидации (если декорирован)
+    validate: Optional[bool] = None
+    # Кэширование ответов (True - без ограничения времени жизни записи,
+    # False - без кэширования)
+    cache: Union[ResponseCacheOptions, bool, None] = None
+    # Потоковый разбор тела запроса (True - с параметрами по умолчанию,
+    # False - без него)
+    stream: Union[StreamBodyOptions, bool, None] = None
+    # Ограничения тела запроса
+    limits: Optional[BodyLimitsOptions] = None
+    # Двоичные форматы тел запросов и ответов (False - только json)
+    binary_formats: Optional[bool] = None
+
+
+# Маршрут -> параметры обработки его запросов
+_routes_options: weakref.WeakKeyDictionary = weakref.WeakKeyDictionary()
+
+
+@dataclass(frozen=True)
+class ServiceRouteDef(web.AbstractRouteDef):
+    """ Определение маршрута с обработчиком сервиса (и параметрами
+        обработки его запросов) для app.add_routes.
+    """
+    method: str
+    path: str
+    handler: Callable
+    options: Optional[RouteOptions] = None
+    kwargs: Dict[str, Any] = field(default_factory=dict)
+
+    def register(self, router: web.UrlDispatcher) -> List[web.AbstractRoute]:
+
+        route = router.add_route(
+            self.method, self.path, get_coroutine_handler(self.handler),
+            **self.kwargs
+        )
+        if self.options is not None:
+            _routes_options[route] = self.options
+
+        return [route]
+
+
+def get_route_options(route: web.AbstractRoute) -> Optional[RouteOptions]:
+    """ Возвращает параметры обработки запросов маршрута (или None, если
+        они не заданы).
+    """
+    return _routes_options.get(route)
+
+
+def mark_service_handler(handler: Callable, is_service: bool = True) -> Any:
+    """ Декоратор обработчика, отмечает его как обработчик сервиса (или,
+        если is_service == False, как обычный обработчик aiohttp).
+    """
+    # Атрибут метода устанавливается для его функции
+    target = getattr(handler, "__func__", handler)
+    target.json_service_handler = is_service
+
+    return handler
+
+
+def get_service_handler_mark(handler: Callable) -> Optional[bool]:
+    """ Возвращает отметку обработчика (или None, если он не отмечен).
+    """
+    return getattr(handler, "json_service_handler", None)
+
+
+def service_route(
+    method: str, path: str, handler: Callable,
+    options: Optional[RouteOptions] = None, **kwargs: Any
+) -> ServiceRouteDef:
+    """ Маршрут с обработчиком сервиса (см. web.route).
+
+        Именованные аргументы - поля RouteOptions (если не передан options)
+        и аргументы router.add_route (name, expect_handler).
+    """
+    options_kwargs = {
+        name: kwargs.pop(name) for name in RouteOptions.__dataclass_fields__
+        if name in kwargs
+    }
+    if options_kwargs:
+        if options is not None:
+            raise TypeError("Route options are passed twice")
+        options = RouteOptions(**options_kwargs)
+
+    return ServiceRouteDef(
+        method, path, mark_service_handler(handler), options, kwargs
+    )
+
+
+def service_post(
+    path: str, handler: Callable, **kwargs: Any
+) -> ServiceRouteDef:
+
+    return service_route("POST", path, handler, **kwargs)
+
+
+def service_get(
+    path: str, handler: Callable, **kwargs: Any
+) -> ServiceRouteDef:
+
+    return service_route("GET", path, handler, **kwargs)
+
+
+def get_coroutine_handler(handler: Callable) -> Callable:
+    """ Возвращает обработчик для регистрации в маршруте: сам handler, если
+        это корутин-функция, или корутин-функцию, которая его вызывает
+        (например, для экземпляра класса с асинхронным __call__).
+
+        Такие обработчики aiohttp оборачивает и сам, но это устарело.
+        Оригинальный обработчик сохраняется в __wrapped__ (см.
+        get_route_handler).
+    """
+    if inspect.iscoroutinefunction(handler):
+        return handler
+
+    async def coroutine_handler(request: web.Request) -> Any:
+
+        result = handler(request)
+        if inspect.isawaitable(result):
+            result = await result
+
+        return result
+
+    coroutine_handler.__wrapped__ = handler
+
+    return coroutine_handler
+
+
+def get_route_handler(route: web.AbstractRoute) -> Callable:
+    """ Возвращает обработчик маршрута.
+
+        Обработчики, которые не являются корутин-функциями (например,
+        экземпляры классов с асинхронным __call__), оборачиваются в
+        функцию, которая передает в них только request (см.
+        get_coroutine_handler, а без service_route - это делает aiohttp).
+        Для таких обработчиков возвращается оригинальный обработчик.
+    """
+    handler = route.handler
+    wrapped = getattr(handler, "__wrapped__", None)
+
+    if wrapped is not None and not inspect.iscoroutinefunction(wrapped):
+        return wrapped
+
+    return handler
+
+
+def get_handler_annotations(handler: Callable) -> Dict[str, Any]:
+    """ Возвращает аннотации аргументов обработчика, которые передаются при
+        его вызове.
+
+        Для functools.partial - аннотации функции без аргументов, значения
+        которых уже заданы, для экземпляра класса - аннотации его метода
+        __call__.
+    """
+    if isinstance(handler, functools.partial):
+        annotations = dict(get_handler_annotations(handler.func))
+
+        parameters = list(inspect.signature(handler.func).parameters)
+        for name in parameters[:len(handler.args)]:
+            annotations.pop(name, None)
+        for name in handler.keywords:
+            annotations.pop(name, None)
+
+        return annotations
+
+    if not inspect.isfunction(handler) and not inspect.ismethod(handler):
+        call = getattr(type(handler), "__call__", None)
+        if inspect.isfunction(call):
+            return call.__annotations__
+
+    return handler.__annotations__
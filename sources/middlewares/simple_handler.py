@@ -1,10 +1,38 @@
+import asyncio
+import functools
 import types
-from typing import Any, Callable, Tuple
+from concurrent.futures import Executor
+from typing import (Any, Awaitable, Callable, Dict, Hashable, Iterable,
+                    Optional, Tuple, Union)
 
-from aiohttp import web
+from aiohttp import hdrs, web
 
-from middlewares.exceptions import InputDataValidationError
-from middlewares.utils import json_dumps
+from middlewares.body_limits import (BodyLimitsOptions, check_content_length,
+                                     check_json_limits, check_object_limits,
+                                     get_body_limits_options, read_body)
+from middlewares.codecs import JSONCodec
+from middlewares.compression import (SPLIT_ENCODINGS, ResponseCompressor,
+                                     compress_tail, parse_accept_encoding)
+from middlewares.exceptions import (InputDataValidationError,
+                                    InvalidRequestBody, RequestBodyTooLarge)
+from middlewares.metrics import NULL_TIMER, Metrics, NullTimer, RequestTimer
+from middlewares.offload import can_offload_dumps
+from middlewares.response_cache import (ResponseCache, ResponseCacheOptions,
+                                        freeze, get_invalidate_cache_options,
+                                        get_response_cache_options)
+from middlewares.routes import (RouteOptions, get_route_handler,
+                                get_route_options, get_service_handler_mark)
+from middlewares.stream_body import (JSONArrayStream, StreamBodyOptions,
+                                     get_stream_body_options)
+
+KEY_NAME_FOR_OFFLOAD = "_offload_request"
+KEY_NAME_FOR_CODEC = "_response_codec"
+
+# Функция обработки запросов маршрута: (request, timer) -> ответ
+RoutePipeline = Callable[
+    [web.Request, Union[RequestTimer, NullTimer]],
+    Awaitable[web.StreamResponse],
+]
 
 
 class SimpleHandler:
@@ -14,8 +42,108 @@ class SimpleHandler:
         именами:
 
         1. В первый будет отправлен оригинальный request.
-        2. Во второй - результат request.json().
+        2. Во второй - результат разбора json-тела запроса.
+
+        Разбор тела запроса и дамп ответа выполняет кодек json_codec (по
+        умолчанию - кодек стандартной библиотеки json).
+
+        Если обработчик вернул асинхронный итератор (или список, длина
+        которого не меньше stream_list_threshold), то ответ отдается
+        потоком (chunked), по stream_chunk_size элементов за одну запись.
+
+        Если передан response_cache, то ответы обработчиков, для которых
+        включено кэширование (см. response_cache.cache_response), берутся из
+        него.
+
+        Если передан metrics, то для каждого запроса к обработчику сервиса
+        измеряется длительность этапов его обработки (см. metrics.Metrics).
+
+        Если передан offload_executor, то для запросов с телом не меньше
+        offload_threshold байт тяжелая работа выполняется в этом пуле (см.
+        offload).
+
+        Если передан response_compressor, то тела ответов сжимаются (см.
+        compression) в кодировке, которую принимает клиент. Сжатое тело
+        ответа из кэша сохраняется в записи кэша (и сжимается один раз).
+
+        body_limits - ограничения тела запроса по умолчанию (размер,
+        глубина вложенности и длина массивов, см. body_limits). Тело,
+        которое им не соответствует, отклоняется до разбора json (ответ со
+        статусом 413 или 400).
+
+        binary_codecs - двоичные кодеки (см. codecs.BINARY_CODECS), которые
+        используются вместо json_codec по типу содержимого: тело запроса
+        разбирается по заголовку Content-Type, а формат ответа выбирается
+        по заголовку Accept (если в нем нет явного выбора - в формате тела
+        запроса). Оболочки запроса и ответа, а также кодирование UUID,
+        datetime и классов данных - те же, что и в json. Ответ в двоичном
+        формате не отдается потоком и не берется из кэша ответов.
     """
+    def __init__(
+        self, json_codec: Optional[JSONCodec] = None,
+        stream_list_threshold: Optional[int] = None,
+        stream_chunk_size: int = 100,
+        response_cache: Optional[ResponseCache] = None,
+        metrics: Optional[Metrics] = None,
+        offload_executor: Optional[Executor] = None,
+        offload_threshold: int = 1024 * 1024,
+        body_limits: Optional[BodyLimitsOptions] = None,
+        response_compressor: Optional[ResponseCompressor] = None,
+        binary_codecs: Iterable = (),
+    ) -> None:
+
+        self.json_codec = JSONCodec() if json_codec is None else json_codec
+
+        # Маршрут -> обработчик сервиса (None - маршрут не сервиса)
+        self.service_handlers: Dict[Any, Optional[Callable]] = {}
+        # Маршрут -> функция обработки запросов (None - маршрут не сервиса)
+        self.route_pipelines: Dict[Any, Optional[RoutePipeline]] = {}
+        # Маршрут -> параметры обработки запросов (только маршруты сервиса)
+        self.routes_options: Dict[Any, RouteOptions] = {}
+
+        # Тип содержимого -> двоичный кодек
+        self.binary_codecs: Dict[str, Any] = {
+            content_type: codec
+            for codec in binary_codecs for content_type in codec.content_types
+        }
+        # Заголовок Accept -> кодек ответа (None - в формате тела запроса)
+        self.accept_codecs_cache: Dict[str, Any] = {}
+        self.body_limits = (
+            BodyLimitsOptions() if body_limits is None else body_limits
+        )
+        self.response_cache = response_cache
+        self.response_compressor = response_compressor
+        self.metrics = metrics
+        if metrics is not None and response_cache is not None:
+            response_cache.add_metrics(metrics)
+
+        self.offload_executor = offload_executor
+        self.offload_threshold = offload_threshold
+        self.offload_dumps = (
+            offload_executor is not None and
+            can_offload_dumps(offload_executor)
+        )
+
+        self.stream_list_threshold = stream_list_threshold
+        self.stream_chunk_size = stream_chunk_size
+
+        # Если в наследнике переопределены "текстовые" методы дампа, то ответ
+        # будет собираться через них (иначе - сразу в bytes, без
+        # промежуточной строки)
+        cls = type(self)
+        self.text_hooks_overridden = (
+            cls.get_json_dumps is not SimpleHandler.get_json_dumps or
+            cls.get_response_text_and_status is not
+            SimpleHandler.get_response_text_and_status
+        )
+        # Если в наследнике переопределен is_json_service_handler, то он
+        # вызывается на каждый запрос (с запросом), а не один раз для
+        # маршрута
+        self.service_check_overridden = (
+            cls.is_json_service_handler is not
+            SimpleHandler.is_json_service_handler
+        )
+
     def get_error_body(self, request: web.Request, error: Exception) -> dict:
         """ Отдает словарь с телом ответа с ошибкой.
 
@@ -23,14 +151,202 @@ class SimpleHandler:
         """
         return {"error_type": str(type(error)), "error_message": str(error)}
 
+    def get_input_error_status(self, error: InputDataValidationError) -> int:
+        """ Отдает код статуса ответа для ошибки во входных данных.
+        """
+        return 413 if isinstance(error, RequestBodyTooLarge) else 400
+
     def is_json_service_handler(
         self, request: web.Request, handler: Callable
     ) -> bool:
         """ Проверяет, является ли handler обработчиком сервиса.
+
+            Отмеченный обработчик (см. routes.mark_service_handler) -
+            обработчик сервиса, если это указано в отметке, а не отмеченный
+            - если это функция.
+
+            Этот метод проверяет только обработчик, и вызывается один раз
+            для маршрута, с request None. Если он переопределен в наследнике,
+            то вызывается на каждый запрос к приложению (и на каждый запрос
+            из пакета, см. WrapsKwargsHandler), с этим запросом.
         """
-        # TODO Возможно, есть решение получше
+        mark = get_service_handler_mark(handler)
+        if mark is not None:
+            return mark
+
         return isinstance(handler, types.FunctionType)
 
+    # Маршруты -------------------------------------------------------------
+
+    def prepare_handler(
+        self, handler: Callable, options: RouteOptions
+    ) -> Callable:
+        """ Возвращает обработчик сервиса для маршрута с параметрами
+            options (обработчик, который будет вызываться вместо исходного).
+        """
+        return handler
+
+    def get_service_handler(
+        self, route: web.AbstractRoute
+    ) -> Optional[Callable]:
+        """ Возвращает обработчик сервиса маршрута (см. prepare_handler), или
+            None, если обработчик маршрута - не обработчик сервиса.
+
+            Проверка выполняется один раз для каждого маршрута (результат
+            сохраняется в service_handlers). Если is_json_service_handler
+            переопределен в наследнике, то здесь он не вызывается (маршрут
+            проверяется им на каждый запрос, см. middleware).
+        """
+        try:
+            return self.service_handlers[route]
+
+        except KeyError:
+            pass
+
+        handler = get_route_handler(route)
+        if (
+            self.service_check_overridden or
+            self.is_json_service_handler(None, handler)
+        ):
+            handler = self.prepare_handler(
+                handler, get_route_options(route) or RouteOptions()
+            )
+        else:
+            handler = None
+
+        # Системные маршруты (например, для ответа 404) создаются на каждый
+        # запрос, и не сохраняются
+        if route.resource is not None:
+            self.service_handlers[route] = handler
+
+        return handler
+
+    def resolve_route_options(
+        self, route: web.AbstractRoute, handler: Callable
+    ) -> RouteOptions:
+        """ Собирает параметры обработки запросов маршрута: параметры,
+            заданные для маршрута, а вместо не заданных - параметры из
+            декораторов обработчика и параметры middleware.
+
+            В результате cache и stream - параметры или None (если режим
+            выключен), limits - ограничения тела запроса, а binary_formats -
+            признак выбора двоичного формата тел запроса и ответа.
+        """
+        options = get_route_options(route) or RouteOptions()
+
+        cache = options.cache
+        if cache is None:
+            cache = get_response_cache_options(handler)
+        elif cache is True:
+            cache = ResponseCacheOptions()
+        if cache is False or self.response_cache is None:
+            cache = None
+
+        stream = options.stream
+        if stream is None:
+            stream = get_stream_body_options(handler)
+        elif stream is True:
+            stream = StreamBodyOptions()
+        if stream is False:
+            stream = None
+
+        limits = options.limits
+        if limits is None:
+            limits = self.get_body_limits(handler)
+
+        binary_formats = (
+            bool(self.binary_codecs) and options.binary_formats is not False
+        )
+
+        return RouteOptions(
+            validate=options.validate, cache=cache, stream=stream,
+            limits=limits, binary_formats=binary_formats,
+        )
+
+    def get_request_options(
+        self, request: web.Request, handler: Callable
+    ) -> RouteOptions:
+        """ Возвращает параметры обработки запроса, собранные для его
+            маршрута (см. resolve_route_options).
+        """
+        route = request.match_info.route
+
+        try:
+            return self.routes_options[route]
+
+        except KeyError:
+            return self.resolve_route_options(route, handler)
+
+    def build_route_pipeline(
+        self, route: web.AbstractRoute, handler: Callable
+    ) -> RoutePipeline:
+        """ Возвращает функцию обработки запросов маршрута.
+
+            Это не отдельная реализация этапов для маршрута, а вызов общего
+            get_service_response с обработчиком и параметрами, собранными
+            заранее (и сохраненными в routes_options): для запроса не
+            проверяются декораторы обработчика и атрибуты маршрута, а
+            выбор режимов (кэш, потоковый разбор, двоичные форматы) - это
+            проверка полей собранных параметров.
+        """
+        options = self.resolve_route_options(route, handler)
+        if route.resource is not None:
+            self.routes_options[route] = options
+
+        get_service_response = self.get_service_response
+
+        async def pipeline(
+            request: web.Request, timer: Union[RequestTimer, NullTimer]
+        ) -> web.StreamResponse:
+            return await get_service_response(request, handler, timer, options)
+
+        return pipeline
+
+    def get_route_pipeline(
+        self, route: web.AbstractRoute
+    ) -> Optional[RoutePipeline]:
+        """ Возвращает функцию обработки запросов маршрута (или None, если
+            обработчик маршрута - не обработчик сервиса).
+
+            Функция собирается один раз для каждого маршрута (и сохраняется в
+            route_pipelines).
+        """
+        try:
+            return self.route_pipelines[route]
+
+        except KeyError:
+            pass
+
+        handler = self.get_service_handler(route)
+        pipeline = (
+            None if handler is None else
+            self.build_route_pipeline(route, handler)
+        )
+
+        if route.resource is not None:
+            self.route_pipelines[route] = pipeline
+
+        return pipeline
+
+    def compile_app_handlers(self, app: web.Application) -> None:
+        """ Собирает функции обработки запросов для всех маршрутов приложения
+            (иначе они собираются по мере поступления запросов).
+
+            Если is_json_service_handler переопределен в наследнике, то
+            маршруты сервиса известны только по запросам, и функции
+            собираются по мере их поступления.
+        """
+        if self.service_check_overridden:
+            return
+
+        for route in app.router.routes():
+            self.get_route_pipeline(route)
+
+    async def on_startup(self, app: web.Application) -> None:
+        """ Обработчик сигнала app.on_startup.
+        """
+        self.compile_app_handlers(app)
+
     async def run_handler(
         self, request: web.Request, handler: Callable, request_body: Any
     ) -> Any:
@@ -39,7 +355,11 @@ class SimpleHandler:
             (Этот метод надо переопределять, если необходима дополнительная
             обработка запроса/ответа/исключений)
         """
-        return await handler(request, request_body)
+        result = await handler(request, request_body)
+
+        self.invalidate_response_cache(handler, request_body, result)
+
+        return result
 
     async def get_response_body_and_status(
         self, request: web.Request, handler: Callable, request_body: Any
@@ -52,11 +372,17 @@ class SimpleHandler:
             response_body = await self.run_handler(
                 request, handler, request_body
             )
+            if (
+                KEY_NAME_FOR_CODEC in request and
+                hasattr(response_body, "__aiter__")
+            ):
+                # Ответ в двоичном формате потоком не отдается
+                response_body = [item async for item in response_body]
             status = 200
 
         except InputDataValidationError as error:
             response_body = self.get_error_body(request, error)
-            status = 400
+            status = self.get_input_error_status(error)
 
         except Exception as error:
             response_body = self.get_error_body(request, error)
@@ -69,7 +395,10 @@ class SimpleHandler:
     ) -> str:
         """ Возвращает json-строку с дампом response_body.
         """
-        return json_dumps(response_body)
+        if self.offload_dumps and self.is_offload_request(request):
+            return await self.run_offload(self.json_codec.dumps, response_body)
+
+        return self.json_codec.dumps(response_body)
 
     async def get_response_text_and_status(
         self, request: web.Request, response_body: Any, status: int
@@ -87,39 +416,681 @@ class SimpleHandler:
 
         return text, status
 
+    async def get_json_dumps_bytes(
+        self, request: web.Request, response_body: Any
+    ) -> bytes:
+        """ Возвращает bytes с дампом response_body (в json или в двоичном
+            формате ответа, см. get_response_codec).
+        """
+        dumps_bytes = self.get_response_codec(request).dumps_bytes
+
+        if self.offload_dumps and self.is_offload_request(request):
+            return await self.run_offload(dumps_bytes, response_body)
+
+        return dumps_bytes(response_body)
+
+    async def get_response_bytes_and_status(
+        self, request: web.Request, response_body: Any, status: int
+    ) -> Tuple[bytes, int]:
+        """ Обрабатывает ошибку дампа объекта python в bytes.
+            Возвращает bytes с json для ответа и код статуса ответа.
+        """
+        try:
+            body = await self.get_json_dumps_bytes(request, response_body)
+
+        except Exception as error:
+            error_body = self.get_error_body(request, error)
+            body = await self.get_json_dumps_bytes(request, error_body)
+            status = 500
+
+        return body, status
+
+    async def get_response(
+        self, request: web.Request, response_body: Any, status: int
+    ) -> web.StreamResponse:
+        """ Делает дамп объекта python (который находится в response_body) в
+            json, и возвращает ответ.
+        """
+        if self.text_hooks_overridden and KEY_NAME_FOR_CODEC not in request:
+            text, status = await self.get_response_text_and_status(
+                request, response_body, status
+            )
+            if self.response_compressor is None:
+                return web.Response(
+                    text=text, status=status, content_type="application/json",
+                )
+            body = text.encode()
+
+        else:
+            body, status = await self.get_response_bytes_and_status(
+                request, response_body, status
+            )
+
+        return await self.get_json_response(request, body, status)
+
+    async def get_json_response(
+        self, request: web.Request, body: bytes, status: int
+    ) -> web.Response:
+        """ Возвращает ответ с json (или двоичным форматом ответа) в body
+            (сжатым, если клиент это принимает).
+        """
+        compressor = self.response_compressor
+        encoding = (
+            None if compressor is None else
+            compressor.get_encoding(request, len(body))
+        )
+
+        if encoding is not None:
+            body = await compressor.compress(encoding, body)
+
+        codec = request.get(KEY_NAME_FOR_CODEC)
+
+        # bytes передаются в ответ как есть (без копирования)
+        if codec is None:
+            response = web.Response(
+                body=body, status=status, content_type="application/json",
+                charset="utf-8",
+            )
+        else:
+            response = web.Response(
+                body=body, status=status, content_type=codec.content_type,
+            )
+
+        if compressor is not None:
+            compressor.set_headers(response, encoding)
+
+        if self.binary_codecs:
+            response.headers.add(hdrs.VARY, hdrs.ACCEPT)
+
+        return response
+
+    # Потоковый ответ -------------------------------------------------------
+
+    def is_stream_response_body(
+        self, request: web.Request, response_body: Any
+    ) -> bool:
+        """ Проверяет, нужно ли отдавать response_body потоком.
+        """
+        if KEY_NAME_FOR_CODEC in request:
+            return False
+
+        if hasattr(response_body, "__aiter__"):
+            return True
+
+        threshold = self.stream_list_threshold
+
+        return (
+            threshold is not None and isinstance(response_body, list) and
+            len(response_body) >= threshold
+        )
+
+    def get_stream_prefix(self, request: web.Request) -> bytes:
+        """ Возвращает начало json потокового ответа (до первого элемента).
+        """
+        return b"["
+
+    def get_stream_suffix(self, request: web.Request) -> bytes:
+        """ Возвращает окончание json потокового ответа.
+        """
+        return b"]"
+
+    def get_stream_error_suffix(
+        self, request: web.Request, error: Exception
+    ) -> Optional[bytes]:
+        """ Возвращает окончание json потокового ответа, если во время
+            отправки элементов произошла ошибка.
+
+            Если возвращается None, то ошибка пробрасывается дальше, и
+            aiohttp разрывает соединение (клиент получит незавершенный
+            ответ, а не "правильный" json без части элементов).
+        """
+        return None
+
+    def prepare_stream_item(self, request: web.Request, item: Any) -> Any:
+        """ Подготовка элемента потокового ответа к дампу.
+        """
+        return item
+
+    def dump_stream_items(
+        self, request: web.Request, items: Iterable, is_first_chunk: bool
+    ) -> bytes:
+        """ Возвращает bytes с дампом порции элементов потокового ответа.
+        """
+        dumps_bytes = self.json_codec.dumps_bytes
+        prepare_stream_item = self.prepare_stream_item
+
+        chunk = b",".join(
+            dumps_bytes(prepare_stream_item(request, item)) for item in items
+        )
+
+        return chunk if is_first_chunk else b"," + chunk
+
+    async def iter_stream_chunks(self, response_body: Any):
+        """ Асинхронный генератор порций (списков) элементов ответа.
+        """
+        chunk_size = self.stream_chunk_size
+
+        if isinstance(response_body, list):
+            for index in range(0, len(response_body), chunk_size):
+                yield response_body[index:index + chunk_size]
+            return
+
+        chunk = []
+        async for item in response_body:
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield chunk
+                chunk = []
+
+        if chunk:
+            yield chunk
+
+    async def get_stream_response(
+        self, request: web.Request, response_body: Any
+    ) -> web.StreamResponse:
+        """ Отдает элементы response_body потоком в виде json-массива.
+
+            В памяти одновременно находится только одна порция элементов.
+        """
+        response = web.StreamResponse(status=200)
+        response.content_type = "application/json"
+        response.charset = "utf-8"
+        response.enable_chunked_encoding()
+
+        await response.prepare(request)
+        await response.write(self.get_stream_prefix(request))
+
+        is_first_chunk = True
+        try:
+            async for items in self.iter_stream_chunks(response_body):
+                await response.write(
+                    self.dump_stream_items(request, items, is_first_chunk)
+                )
+                is_first_chunk = False
+
+        except Exception as error:
+            suffix = self.get_stream_error_suffix(request, error)
+            if suffix is None:
+                raise
+
+        else:
+            suffix = self.get_stream_suffix(request)
+
+        await response.write(suffix)
+        await response.write_eof()
+
+        return response
+
+    # Вынос работы из цикла событий -----------------------------------------
+
+    def is_offload_request(self, request: web.Request) -> bool:
+        """ Проверяет, выносится ли работа для запроса из цикла событий
+            (тело запроса не меньше offload_threshold).
+        """
+        return request.get(KEY_NAME_FOR_OFFLOAD, False)
+
+    async def run_offload(self, func: Callable, *args: Any) -> Any:
+        """ Выполняет func(*args) в пуле offload_executor.
+        """
+        return await asyncio.get_running_loop().run_in_executor(
+            self.offload_executor, func, *args
+        )
+
+    # Кэш ответов -----------------------------------------------------------
+
+    def invalidate_response_cache(
+        self, handler: Callable, data: Any, result: Any
+    ) -> None:
+        """ Сбрасывает записи кэша после успешной работы обработчика (если
+            для обработчика это включено, см.
+            response_cache.invalidate_cache).
+        """
+        if self.response_cache is None:
+            return
+
+        options = get_invalidate_cache_options(handler)
+        if options is None:
+            return
+
+        if options.tags is None:
+            self.response_cache.clear()
+        else:
+            self.response_cache.invalidate(options.tags(data, result))
+
+    def get_response_cache_data(
+        self, request: web.Request, request_body: Any
+    ) -> Any:
+        """ Возвращает данные для обработчика, от которых зависит его ответ
+            (вместе с параметрами из url они составляют ключ записи кэша).
+        """
+        return request_body
+
+    async def get_response_cache_value(
+        self, request: web.Request, response_body: Any
+    ) -> bytes:
+        """ Возвращает значение для записи кэша из тела успешного ответа.
+        """
+        return await self.get_json_dumps_bytes(request, response_body)
+
+    def split_response_body_from_cache(
+        self, request: web.Request, value: bytes
+    ) -> Tuple[bytes, bytes]:
+        """ Возвращает тело ответа из значения записи кэша в виде двух
+            частей: головы, которая зависит только от value, и хвоста,
+            который может быть свой у каждого запроса.
+        """
+        return value, b""
+
+    def get_response_body_from_cache(
+        self, request: web.Request, value: bytes
+    ) -> bytes:
+        """ Возвращает тело ответа из значения записи кэша.
+        """
+        head, tail = self.split_response_body_from_cache(request, value)
+
+        return head + tail if tail else head
+
+    async def get_compressed_body_from_cache(
+        self, key: Hashable, value: bytes, encoding: str,
+        head: bytes, tail: bytes,
+    ) -> bytes:
+        """ Возвращает сжатое тело ответа из кэша.
+
+            Сжатая голова тела (или все тело, если хвоста нет) сохраняется в
+            записи кэша как вариант значения.
+        """
+        cache = self.response_cache
+        compressor = self.response_compressor
+
+        if encoding in SPLIT_ENCODINGS:
+            compressed_head = cache.get_variant(key, encoding)
+            if compressed_head is None:
+                compressed_head = await compressor.compress_head(
+                    encoding, head
+                )
+                cache.set_variant(key, value, encoding, compressed_head)
+
+            return compress_tail(encoding, compressed_head, tail)
+
+        if tail:
+            return await compressor.compress(encoding, head + tail)
+
+        body = cache.get_variant(key, encoding)
+        if body is None:
+            body = await compressor.compress(encoding, head)
+            cache.set_variant(key, value, encoding, body)
+
+        return body
+
+    async def get_cached_response(
+        self, request: web.Request, handler: Callable, request_body: Any,
+        options: ResponseCacheOptions,
+    ) -> Optional[web.StreamResponse]:
+        """ Возвращает ответ из кэша, или запускает обработчик и сохраняет
+            в кэше его успешный ответ.
+
+            Если для запроса ключ записи кэша собрать нельзя, то возвращается
+            None (ответ надо получить без кэша).
+        """
+        try:
+            data = self.get_response_cache_data(request, request_body)
+            key = (handler, freeze(dict(request.match_info)), freeze(data))
+
+        except Exception:
+            return None
+
+        cache = self.response_cache
+        value = cache.get(key)
+
+        if value is None:
+            generation = cache.generation
+
+            response_body, status = await self.get_response_body_and_status(
+                request, handler, request_body
+            )
+
+            if status != 200:
+                return await self.get_response(request, response_body, status)
+
+            if self.is_stream_response_body(request, response_body):
+                return await self.get_stream_response(request, response_body)
+
+            try:
+                value = await self.get_response_cache_value(
+                    request, response_body
+                )
+
+            except Exception as error:
+                error_body = self.get_error_body(request, error)
+                return await self.get_response(request, error_body, 500)
+
+            tags = () if options.tags is None else options.tags(data)
+            cache.set(key, value, options.ttl, tags, generation)
+
+        compressor = self.response_compressor
+        if compressor is None:
+            return web.Response(
+                body=self.get_response_body_from_cache(request, value),
+                status=200, content_type="application/json", charset="utf-8",
+            )
+
+        head, tail = self.split_response_body_from_cache(request, value)
+        encoding = compressor.get_encoding(request, len(head) + len(tail))
+
+        if encoding is None:
+            body = head + tail if tail else head
+        else:
+            body = await self.get_compressed_body_from_cache(
+                key, value, encoding, head, tail
+            )
+
+        response = web.Response(
+            body=body, status=200, content_type="application/json",
+            charset="utf-8",
+        )
+
+        compressor.set_headers(response, encoding)
+
+        return response
+
+    # Формат тела запроса и ответа ------------------------------------------
+
+    def get_request_codec(self, request: web.Request) -> Any:
+        """ Возвращает кодек для тела запроса (по заголовку Content-Type, с
+            неизвестным типом содержимого тело разбирается как json).
+        """
+        if not self.binary_codecs:
+            return self.json_codec
+
+        return self.binary_codecs.get(request.content_type, self.json_codec)
+
+    def choose_accept_codec(self, accept: str) -> Any:
+        """ Выбирает кодек ответа по заголовку Accept: с наибольшим весом
+            среди явно указанных типов содержимого (при равных весах - json).
+
+            Возвращает None, если явного выбора нет (например, "*/*").
+        """
+        if accept in self.accept_codecs_cache:
+            return self.accept_codecs_cache[accept]
+
+        # Формат заголовка (список значений с весами q) тот же, что и у
+        # Accept-Encoding
+        weights = parse_accept_encoding(accept)
+
+        codec = None
+        best_weight = weights.get(self.json_codec.content_type, 0.0)
+        if best_weight > 0.0:
+            codec = self.json_codec
+
+        for content_type, binary_codec in self.binary_codecs.items():
+            weight = weights.get(content_type, 0.0)
+            if weight > best_weight:
+                codec, best_weight = binary_codec, weight
+
+        if len(self.accept_codecs_cache) < 1000:
+            self.accept_codecs_cache[accept] = codec
+
+        return codec
+
+    def set_response_codec(self, request: web.Request) -> None:
+        """ Выбирает кодек ответа (см. choose_accept_codec) и, если это
+            двоичный кодек, сохраняет его в request.
+        """
+        codec = None
+        accept = request.headers.get(hdrs.ACCEPT)
+        if accept:
+            codec = self.choose_accept_codec(accept)
+
+        if codec is None:
+            codec = self.get_request_codec(request)
+
+        if codec is not self.json_codec:
+            request[KEY_NAME_FOR_CODEC] = codec
+
+    def get_response_codec(self, request: web.Request) -> Any:
+        """ Возвращает кодек ответа.
+        """
+        return request.get(KEY_NAME_FOR_CODEC, self.json_codec)
+
+    # Тело запроса ----------------------------------------------------------
+
+    def get_body_limits(self, handler: Callable) -> BodyLimitsOptions:
+        """ Возвращает ограничения тела запроса для обработчика.
+        """
+        options = get_body_limits_options(handler)
+
+        return self.body_limits if options is None else options
+
     async def get_request_body(
         self, request: web.Request, handler: Callable
     ) -> Any:
+        """ Возвращает объект python из json-тела запроса (или тела в
+            двоичном формате, см. get_request_codec).
 
-        return await request.json()
+            Параметры обработки запроса (формат, ограничения тела, потоковый
+            разбор) берутся для маршрута запроса (см. get_request_options).
 
-    @web.middleware
-    async def middleware(self, request: web.Request, handler: Callable):
-        """ middleware для json-сервиса.
+            Если для маршрута включен потоковый разбор тела запроса (см.
+            stream_body.stream_request_body), то возвращается асинхронный
+            итератор элементов json-массива.
+
+            Тело запроса проверяется на соответствие ограничениям до разбора
+            json.
         """
-        if not self.is_json_service_handler(request, handler):
-            return await handler(request)
+        options = self.get_request_options(request, handler)
+
+        codec = (
+            self.get_request_codec(request) if options.binary_formats else
+            self.json_codec
+        )
+
+        if options.stream is not None:
+            if codec is not self.json_codec:
+                raise InvalidRequestBody(
+                    "Streaming request body must be json"
+                )
+            return self.get_request_body_stream(request, options.stream)
+
+        body_limits = options.limits
+
+        body = await read_body(
+            request, body_limits.max_body_size,
+            body_limits.max_compression_ratio,
+        )
+        if codec is self.json_codec:
+            check_json_limits(
+                body, body_limits.max_depth, body_limits.max_array_length
+            )
+            loads = codec.loads
+        else:
+            # Длина массивов проверяется при разборе, глубина - после него
+            loads = functools.partial(
+                codec.loads, max_array_length=body_limits.max_array_length
+            )
+
+        if (
+            self.offload_executor is not None and
+            len(body) >= self.offload_threshold
+        ):
+            request[KEY_NAME_FOR_OFFLOAD] = True
+            obj = await self.run_offload(loads, body)
+        else:
+            obj = loads(body)
+
+        if codec is not self.json_codec:
+            check_object_limits(obj, body_limits.max_depth)
+
+        return obj
+
+    def get_request_body_stream(
+        self, request: web.Request, options: StreamBodyOptions
+    ) -> JSONArrayStream:
+        """ Возвращает асинхронный итератор элементов json-массива из тела
+            запроса.
+
+            Если размер тела запроса известен заранее (Content-Length) и он
+            больше допустимого - сразу будет исключение.
+        """
+        check_content_length(request, options.max_body_size)
+
+        return JSONArrayStream(request.content, options)
+
+    # Метрики ---------------------------------------------------------------
+
+    def get_metrics_route(self, request: web.Request) -> str:
+        """ Возвращает значение метки маршрута для метрик запроса.
+        """
+        resource = request.match_info.route.resource
+
+        return "" if resource is None else resource.canonical
+
+    async def get_service_response(
+        self, request: web.Request, handler: Callable,
+        timer: Union[RequestTimer, NullTimer],
+        options: Optional[RouteOptions] = None,
+    ) -> web.StreamResponse:
+        """ Разбирает тело запроса, запускает обработчик и возвращает ответ.
+
+            Окончание каждого этапа отмечается в timer. options - параметры
+            обработки запроса, собранные для маршрута (см.
+            build_route_pipeline; если не переданы - см.
+            get_request_options).
+        """
+        if options is None:
+            options = self.get_request_options(request, handler)
+
+        if options.binary_formats:
+            self.set_response_codec(request)
 
         try:
             request_body = await self.get_request_body(request, handler)
 
+        except InputDataValidationError as error:
+            timer.mark("request_body")
+            response_body = self.get_error_body(request, error)
+            status = self.get_input_error_status(error)
+
         except Exception as error:
+            timer.mark("request_body")
             response_body = self.get_error_body(request, error)
             status = 400
 
         else:
+            timer.mark("request_body")
+
+            if (
+                options.cache is not None and
+                KEY_NAME_FOR_CODEC not in request
+            ):
+                response = await self.get_cached_response(
+                    request, handler, request_body, options.cache
+                )
+                if response is not None:
+                    timer.mark("cached_response")
+                    return response
+
             # Запуск обработчика
             response_body, status = await self.get_response_body_and_status(
                 request, handler, request_body
             )
+            timer.mark("handler")
 
-        finally:
-            # Самостоятельно делаем дамп объекта python (который находится в
-            # response_body) в строку json.
-            text, status = await self.get_response_text_and_status(
-                request, response_body, status
+            if status == 200 and self.is_stream_response_body(
+                request, response_body
+            ):
+                response = await self.get_stream_response(
+                    request, response_body
+                )
+                timer.mark("stream_response")
+                return response
+
+        response = await self.get_response(request, response_body, status)
+        timer.mark("response")
+
+        return response
+
+    async def run_route_pipeline(
+        self, request: web.Request, pipeline: RoutePipeline
+    ) -> web.StreamResponse:
+        """ Возвращает ответ функции обработки запросов маршрута (с
+            метриками запроса, если они включены).
+        """
+        if self.metrics is None:
+            return await pipeline(request, NULL_TIMER)
+
+        timer = self.metrics.get_timer(self.get_metrics_route(request))
+
+        response = await pipeline(request, timer)
+        timer.finish(response.status)
+
+        return response
+
+    def get_inner_handler(
+        self, handler: Callable, route_handler: Callable,
+        pipeline: RoutePipeline,
+    ) -> Optional[Callable]:
+        """ Возвращает цепочку middlewares, которые в приложении идут после
+            этого middleware (handler, как его передает aiohttp), в которой
+            обработчик маршрута заменен функцией обработки его запросов.
+
+            Цепочка разбирается по functools.partial, в которые aiohttp
+            оборачивает middlewares нового стиля. Если в ней есть другие
+            обертки (middlewares старого стиля), возвращается None.
+        """
+        if handler is route_handler:
+            return functools.partial(
+                self.run_route_pipeline, pipeline=pipeline
             )
 
-        return web.Response(
-            text=text, status=status,  content_type="application/json",
+        if (
+            not isinstance(handler, functools.partial) or
+            "handler" not in handler.keywords
+        ):
+            return None
+
+        inner = self.get_inner_handler(
+            handler.keywords["handler"], route_handler, pipeline
         )
+        if inner is None:
+            return None
+
+        keywords = dict(handler.keywords, handler=inner)
+
+        return functools.partial(handler.func, *handler.args, **keywords)
+
+    @web.middleware
+    async def middleware(self, request: web.Request, handler: Callable):
+        """ middleware для json-сервиса.
+
+            Функция обработки запросов маршрута (см. get_route_pipeline)
+            берется по маршруту запроса. Если после этого middleware в
+            приложении есть другие middlewares, то запрос проходит через
+            них, а вместо обработчика маршрута вызывается эта функция (см.
+            get_inner_handler).
+        """
+        route = request.match_info.route
+
+        if (
+            self.service_check_overridden and
+            not self.is_json_service_handler(request, get_route_handler(route))
+        ):
+            return await handler(request)
+
+        try:
+            pipeline = self.route_pipelines[route]
+
+        except KeyError:
+            pipeline = self.get_route_pipeline(route)
+
+        if pipeline is None:
+            return await handler(request)
+
+        if handler is not route.handler:
+            inner_handler = self.get_inner_handler(
+                handler, route.handler, pipeline
+            )
+            # Цепочку, которую не удалось разобрать, aiohttp вызывает как
+            # обычно (обработчик сервиса получит только request)
+            return await (inner_handler or handler)(request)
+
+        return await self.run_route_pipeline(request, pipeline)
@@ -0,0 +1,296 @@
+""" Потоковый разбор json-тела запроса.
+
+    Тело запроса должно быть json-массивом. Его элементы разбираются по мере
+    поступления данных из request.content (без чтения всего тела в память),
+    и передаются в обработчик через асинхронный итератор JSONArrayStream.
+
+    Режим включается для обработчика декоратором stream_request_body.
+"""
+import asyncio
+import codecs
+import json
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Callable, List, Optional
+
+from aiohttp import StreamReader
+from pydantic import ValidationError, parse_obj_as
+
+from middlewares.body_limits import check_json_limits
+from middlewares.exceptions import (InputDataValidationError,
+                                    InvalidRequestBody, RequestBodyTooDeep,
+                                    RequestBodyTooLarge)
+
+_WHITESPACE = " \t\n\r"
+_NUMBER_CHARS = "0123456789.eE+-"
+# Первый символ элемента -> символ, которым элемент заканчивается
+_CLOSING_CHARS = {"[": "]", "{": "}", '"': '"'}
+
+
+@dataclass(frozen=True)
+class StreamBodyOptions:
+    """ Параметры потокового разбора тела запроса.
+    """
+    # Максимальный размер тела запроса в байтах (None - без ограничения)
+    max_body_size: Optional[int] = None
+    # Максимальное количество элементов массива (None - без ограничения)
+    max_items: Optional[int] = None
+    # Максимальная глубина вложенности массивов и объектов в элементе
+    # массива (None - без ограничения)
+    max_item_depth: Optional[int] = None
+    # Максимальный размер элемента массива в символах json (None - без
+    # ограничения)
+    max_item_size: Optional[int] = None
+    # Класс данных для валидации элементов (None - без валидации)
+    item_model: Optional[type] = None
+    # Количество элементов в одной порции (валидация выполняется порциями)
+    chunk_size: int = 100
+    # Размер блока данных, который читается из request.content за один раз
+    read_size: int = 64 * 1024
+
+
+def stream_request_body(**options: Any) -> Callable:
+    """ Декоратор обработчика, включает потоковый разбор тела запроса.
+
+        Параметры - см. StreamBodyOptions.
+    """
+    stream_body_options = StreamBodyOptions(**options)
+
+    def decorator(handler: Callable) -> Callable:
+        handler.stream_body_options = stream_body_options
+        return handler
+
+    return decorator
+
+
+def get_stream_body_options(handler: Callable) -> Optional[StreamBodyOptions]:
+    """ Возвращает параметры потокового разбора тела запроса для обработчика
+        (или None, если для обработчика этот режим не включен).
+    """
+    return getattr(handler, "stream_body_options", None)
+
+
+class JSONArrayStream:
+    """ Асинхронный итератор элементов json-массива из тела запроса.
+
+        Элементы можно получать по одному (async for item in stream), или
+        порциями (async for items in stream.chunks()).
+    """
+
+    def __init__(
+        self, content: StreamReader, options: StreamBodyOptions
+    ) -> None:
+
+        self.content = content
+        self.options = options
+
+        self.decoder = json.JSONDecoder()
+        self.text_decoder = codecs.getincrementaldecoder("utf-8")()
+
+        self.buffer = ""
+        self.position = 0
+        self.body_size = 0
+        self.items_count = 0
+        self.eof = False
+
+    async def read(self) -> None:
+        """ Читает очередной блок данных из тела запроса в буфер.
+        """
+        data = await self.content.read(self.options.read_size)
+
+        if data:
+            self.body_size += len(data)
+            max_body_size = self.options.max_body_size
+            if max_body_size is not None and self.body_size > max_body_size:
+                raise RequestBodyTooLarge(
+                    f"Request body is larger than {max_body_size} bytes"
+                )
+        else:
+            self.eof = True
+
+        text = self.text_decoder.decode(data, final=self.eof)
+        self.buffer = self.buffer[self.position:] + text
+        self.position = 0
+
+        # Даем поработать другим задачам (данные могли уже быть в буфере
+        # StreamReader, и тогда read() не переключает задачи)
+        await asyncio.sleep(0)
+
+    async def next_char(self) -> Optional[str]:
+        """ Пропускает пробельные символы, и возвращает следующий символ
+            (не сдвигая позицию), или None если данные закончились.
+        """
+        while True:
+            buffer = self.buffer
+            position = self.position
+            while position < len(buffer) and buffer[position] in _WHITESPACE:
+                position += 1
+            self.position = position
+
+            if position < len(buffer):
+                return buffer[position]
+
+            if self.eof:
+                return None
+
+            await self.read()
+
+    async def expect(self, chars: str) -> str:
+        """ Возвращает следующий символ, если он есть в chars (и сдвигает
+            позицию), иначе - исключение.
+        """
+        char = await self.next_char()
+
+        if char is None or char not in chars:
+            raise InvalidRequestBody(
+                f"Expected one of {list(chars)} in request body, "
+                f"got {char!r}"
+            )
+
+        self.position += 1
+
+        return char
+
+    async def decode_item(self) -> Any:
+        """ Разбирает очередной элемент массива.
+
+            Элемент, который пришел не целиком, разбирается заново только
+            когда в новых данных может быть его конец (закрывающая скобка
+            или кавычка), и данных после начала элемента стало хотя бы вдвое
+            больше, чем при прошлой попытке. Поэтому работа по разбору
+            большого элемента растет линейно с его размером (а не
+            квадратично).
+        """
+        # raw_decode не пропускает пробельные символы перед значением
+        closing_char = _CLOSING_CHARS.get(await self.next_char())
+
+        max_item_size = self.options.max_item_size
+        max_item_depth = self.options.max_item_depth
+
+        # Размер данных после начала элемента при прошлой попытке разбора
+        tried_size = 0
+
+        while True:
+            size = len(self.buffer) - self.position
+            too_large = max_item_size is not None and size > max_item_size
+
+            if not self.eof and not too_large and (
+                size < 2 * tried_size or (
+                    closing_char is not None and self.buffer.find(
+                        closing_char, self.position + max(tried_size, 1)
+                    ) == -1
+                )
+            ):
+                await self.read()
+                continue
+
+            tried_size = size
+
+            try:
+                item, end = self.decoder.raw_decode(self.buffer, self.position)
+
+            except json.JSONDecodeError as error:
+                if too_large:
+                    raise RequestBodyTooLarge(
+                        f"Request body array item is larger than "
+                        f"{max_item_size} characters"
+                    )
+                if self.eof:
+                    raise InvalidRequestBody(f"JSONDecodeError - {error}")
+                await self.read()
+                continue
+
+            except RecursionError:
+                raise RequestBodyTooDeep(
+                    "Request body array item is nested too deeply"
+                )
+
+            # Число в самом конце буфера может быть не полным (например,
+            # "12" из "123", или "1" из "1.5"), поэтому дочитаем данные и
+            # разберем его заново
+            if not self.eof and type(item) in (int, float) and (
+                end == len(self.buffer) or self.buffer[end] in _NUMBER_CHARS
+            ):
+                await self.read()
+                continue
+
+            if (
+                max_item_size is not None and
+                end - self.position > max_item_size
+            ):
+                raise RequestBodyTooLarge(
+                    f"Request body array item is larger than "
+                    f"{max_item_size} characters"
+                )
+
+            if max_item_depth is not None:
+                # Элемент уже разобран, но до валидации и передачи в
+                # обработчик не дойдет
+                check_json_limits(
+                    self.buffer[self.position:end].encode(), max_item_depth
+                )
+
+            self.position = end
+
+            return item
+
+    async def iter_raw_items(self) -> AsyncIterator[Any]:
+        """ Асинхронный генератор элементов массива (без валидации).
+        """
+        max_items = self.options.max_items
+
+        await self.expect("[")
+
+        if await self.next_char() == "]":
+            self.position += 1
+
+        else:
+            while True:
+                self.items_count += 1
+                if max_items is not None and self.items_count > max_items:
+                    raise RequestBodyTooLarge(
+                        f"Request body array has more than {max_items} items"
+                    )
+
+                yield await self.decode_item()
+
+                if await self.expect(",]") == "]":
+                    break
+
+        if await self.next_char() is not None:
+            raise InvalidRequestBody("Extra data after json array")
+
+    def validate_chunk(self, items: List[Any]) -> List[Any]:
+        """ Валидация порции элементов.
+        """
+        item_model = self.options.item_model
+
+        if item_model is None:
+            return items
+
+        try:
+            return parse_obj_as(List[item_model], items)
+
+        except ValidationError as error:
+            message = f"{type(error).__name__} - {error}"
+            raise InputDataValidationError(message)
+
+    async def chunks(self) -> AsyncIterator[List[Any]]:
+        """ Асинхронный генератор порций (списков) элементов массива.
+        """
+        chunk_size = self.options.chunk_size
+
+        chunk = []
+        async for item in self.iter_raw_items():
+            chunk.append(item)
+            if len(chunk) >= chunk_size:
+                yield self.validate_chunk(chunk)
+                chunk = []
+
+        if chunk:
+            yield self.validate_chunk(chunk)
+
+    async def __aiter__(self) -> AsyncIterator[Any]:
+
+        async for chunk in self.chunks():
+            for item in chunk:
+                yield item
@@ -3,18 +3,43 @@
 import json
 from dataclasses import dataclass
 from datetime import datetime
-from typing import Any, Callable, Dict, Optional
+from typing import Any, Callable, Dict, Optional, Set, Tuple
 from uuid import UUID
 
 from aiohttp import web
+from pydantic import BaseModel
 
 
 # json -----------------------------------------------------------------------
 
+# Для каждого класса данных pydantic: можно ли брать значения полей
+# экземпляра прямо из __dict__ (если .dict() в классе не переопределен)
+_models_direct_encoding: Dict[type, bool] = {}
+
+
+def encode_model(obj: BaseModel) -> dict:
+    """ Возвращает словарь с полями экземпляра класса данных pydantic для
+        кодирования в json.
+
+        Экземпляр уже прошел валидацию при создании, поэтому значения полей
+        берутся из его __dict__ (там они лежат в порядке объявления полей)
+        без повторной валидации и без копирования. Вложенные значения
+        кодирует сам json-кодировщик.
+    """
+    cls = type(obj)
+
+    direct = _models_direct_encoding.get(cls)
+    if direct is None:
+        direct = _models_direct_encoding[cls] = cls.dict is BaseModel.dict
+
+    return obj.__dict__ if direct else obj.dict()
+
+
 class ServiceJSONEncoder(json.JSONEncoder):
     """ Кодирование данных сервиса в json.
 
-        (пример подключения обработки UUID и datetime)
+        (пример подключения обработки UUID, datetime и экземпляров классов
+        данных pydantic)
     """
     def default(self, obj):
 
@@ -22,6 +47,8 @@ class ServiceJSONEncoder(json.JSONEncoder):
             return str(obj)
         elif isinstance(obj, datetime):
             return int(obj.timestamp())
+        elif isinstance(obj, BaseModel):
+            return encode_model(obj)
 
         return json.JSONEncoder.default(self, obj)
 
@@ -42,6 +69,14 @@ class RawDataForArgument:
     arg_name: Optional[str] = None
 
 
+# Функция, которая по оригинальному request и телу запроса отдает значение
+# для аргумента обработчика
+ArgumentGetter = Callable[[web.Request, Any], Any]
+
+# План аргументов обработчика - неизменяемый кортеж пар (имя, функция)
+HandlerArgumentsPlan = Tuple[Tuple[str, ArgumentGetter], ...]
+
+
 class ArgumentsManager:
     """ Менеджер для аргументов обработчика.
 
@@ -59,44 +94,89 @@ class ArgumentsManager:
 
         self.getters: Dict[str, Callable] = {}
 
+        # Фабрики "быстрых" функций получения значения аргумента (функции
+        # принимают request и тело запроса, и не требуют создания экземпляра
+        # RawDataForArgument на каждый запрос)
+        self.getter_builders: Dict[str, Callable[[str], ArgumentGetter]] = {}
+
+        # Имена аргументов, в которые передается тело запроса
+        self.request_body_names: Set[str] = set()
+
+    def build_getter(self, arg_name: str) -> ArgumentGetter:
+        """ Возвращает функцию получения значения для аргумента arg_name.
+
+            Если имя аргумента не зарегистрировано - будет KeyError.
+        """
+        builder = self.getter_builders.get(arg_name)
+        if builder is not None:
+            return builder(arg_name)
+
+        # Для геттеров, зарегистрированных напрямую в self.getters, делаем
+        # обертку (она работает через RawDataForArgument, как и раньше)
+        get_arg_value = self.getters[arg_name]
+
+        def getter(request: web.Request, request_body: Any) -> Any:
+            return get_arg_value(
+                RawDataForArgument(request, request_body, arg_name)
+            )
+
+        return getter
+
     # Тело json запроса ------------------------------------------------------
 
     def reg_request_body(self, arg_name) -> None:
         """ Регистрация имени аргумента для тела запроса.
         """
         self.getters[arg_name] = self.get_request_body
+        self.getter_builders[arg_name] = self.build_request_body_getter
+        self.request_body_names.add(arg_name)
 
     def get_request_body(self, raw_data: RawDataForArgument):
         return raw_data.request_body
 
+    def build_request_body_getter(self, arg_name: str) -> ArgumentGetter:
+        return lambda request, request_body: request_body
+
     # Ключи в request --------------------------------------------------------
 
     def reg_request_key(self, arg_name) -> None:
         """ Регистрация имени аргумента который хранится в request.
         """
         self.getters[arg_name] = self.get_request_key
+        self.getter_builders[arg_name] = self.build_request_key_getter
 
     def get_request_key(self, raw_data: RawDataForArgument):
         return raw_data.request[raw_data.arg_name]
 
+    def build_request_key_getter(self, arg_name: str) -> ArgumentGetter:
+        return lambda request, request_body: request[arg_name]
+
     # Ключи в request.app ----------------------------------------------------
 
     def reg_app_key(self, arg_name) -> None:
         """ Регистрация имени аргумента который хранится в app.
         """
         self.getters[arg_name] = self.get_app_key
+        self.getter_builders[arg_name] = self.build_app_key_getter
 
     def get_app_key(self, raw_data: RawDataForArgument):
         return raw_data.request.app[raw_data.arg_name]
 
+    def build_app_key_getter(self, arg_name: str) -> ArgumentGetter:
+        return lambda request, request_body: request.app[arg_name]
+
     # Параметры запроса ------------------------------------------------------
 
     def reg_match_info_key(self, arg_name) -> None:
         """ Регистрация имени аргумента который приходит в параметрах запроса.
         """
         self.getters[arg_name] = self.get_match_info_key
+        self.getter_builders[arg_name] = self.build_match_info_key_getter
 
     def get_match_info_key(self, raw_data: RawDataForArgument):
         return raw_data.request.match_info[raw_data.arg_name]
 
+    def build_match_info_key_getter(self, arg_name: str) -> ArgumentGetter:
+        return lambda request, request_body: request.match_info[arg_name]
+
     # Можно добавить и другие регистраторы...
@@ -0,0 +1,200 @@
+""" Быстрая валидация данных для middlewares и обработчиков.
+"""
+import functools
+from typing import (Any, Callable, Dict, Optional, Type, Union, get_args,
+                    get_origin)
+
+from pydantic import BaseModel, Extra, ValidationError
+from pydantic.error_wrappers import ErrorWrapper
+from pydantic.errors import ExtraError, MissingError
+from valdec.data_classes import Settings
+from valdec.decorators import async_validate
+from valdec.errors import ValidationArgumentsError
+from valdec.validator_pydantic import validator as pydantic_validator
+
+
+class ModelValidator:
+    """ Валидатор словаря по классу данных pydantic, без создания экземпляра
+        класса.
+
+        Поля класса данных разбираются один раз (при создании валидатора),
+        для каждого значения используется уже собранный валидатор поля
+        pydantic. Ошибки - такие же, как при создании экземпляра класса.
+
+        Валидаторы уровня класса (root_validator) не поддерживаются.
+    """
+
+    def __init__(self, model: Type[BaseModel]) -> None:
+
+        if model.__pre_root_validators__ or model.__post_root_validators__:
+            raise ValueError(f"Root validators are not supported: {model}")
+
+        self.model = model
+        self.fields = tuple(model.__fields__.values())
+        self.field_names = frozenset(field.alias for field in self.fields)
+        self.extra_forbid = model.__config__.extra == Extra.forbid
+
+    def validate(self, values: Any) -> dict:
+        """ Проводит валидацию словаря values, и возвращает словарь с
+            проверенными значениями полей.
+        """
+        if not isinstance(values, dict):
+            raise TypeError(
+                f"{self.model.__name__} argument must be a mapping, "
+                f"not {type(values).__name__}"
+            )
+
+        result = {}
+        errors = []
+
+        for field in self.fields:
+            name = field.alias
+
+            if name in values:
+                value, error = field.validate(
+                    values[name], result, loc=name, cls=self.model
+                )
+                if error:
+                    errors.append(error)
+                else:
+                    result[field.name] = value
+
+            elif field.required:
+                errors.append(ErrorWrapper(MissingError(), loc=name))
+
+            else:
+                result[field.name] = field.get_default()
+
+        if self.extra_forbid and not self.field_names.issuperset(values):
+            for name in values.keys() - self.field_names:
+                errors.append(ErrorWrapper(ExtraError(), loc=name))
+
+        if errors:
+            raise ValidationError(errors, self.model)
+
+        return result
+
+
+# valdec ---------------------------------------------------------------------
+
+def is_validated_value(annotation: Any, value: Any) -> bool:
+    """ Проверяет, является ли value уже проверенным значением для annotation:
+        экземпляром класса данных pydantic из аннотации (или списком таких
+        экземпляров).
+
+        Экземпляр класса данных проходит валидацию при создании, поэтому
+        повторно его проверять не нужно.
+    """
+    if get_origin(annotation) is Union:
+        return any(
+            is_validated_value(arg, value) for arg in get_args(annotation)
+        )
+
+    if isinstance(value, BaseModel):
+        return annotation is type(value)
+
+    if type(value) is list and get_origin(annotation) is list:
+        item_annotation = get_args(annotation)[0]
+        return (
+            isinstance(item_annotation, type) and
+            issubclass(item_annotation, BaseModel) and
+            all(type(item) is item_annotation for item in value)
+        )
+
+    return False
+
+
+def validator(
+    annotations: Dict[str, Any], values: Dict[str, Any],
+    is_replace: bool, extra: dict
+) -> Optional[Dict[str, Any]]:
+    """ Функция валидатор для valdec.
+
+        Если все значения уже являются проверенными экземплярами классов
+        данных (см. is_validated_value), то валидация не выполняется.
+        Иначе - вызывается валидатор valdec на pydantic.
+    """
+    for name, value in values.items():
+        if not is_validated_value(annotations[name], value):
+            return pydantic_validator(annotations, values, is_replace, extra)
+
+    return None
+
+
+valdec_settings = Settings(validator=validator)
+
+
+def validate(*names_or_func: Any, exclude: bool = False) -> Callable:
+    """ Декоратор valdec.decorators.async_validate с валидатором, который
+        не проверяет повторно экземпляры классов данных.
+
+        Декорированная функция получает атрибут validated_names (см.
+        is_validated_argument).
+    """
+    if names_or_func and callable(names_or_func[0]):
+        # Декоратор без параметров - проверяются все аргументы
+        return validate()(names_or_func[0])
+
+    decorator = async_validate(
+        *names_or_func, exclude=exclude, settings=valdec_settings
+    )
+
+    def set_validated_names(func: Callable) -> Callable:
+        wrapper = decorator(func)
+        wrapper.validated_names = (frozenset(names_or_func), exclude)
+        return wrapper
+
+    return set_validated_names
+
+
+def is_validated_argument(func: Callable, name: str) -> bool:
+    """ Проверяет, проверяет ли декоратор validate аргумент name функции.
+    """
+    validated_names = getattr(func, "validated_names", None)
+    if validated_names is None:
+        return False
+
+    names, exclude = validated_names
+    if not names:
+        return True
+
+    return (name in names) is not exclude
+
+
+def validate_arguments(
+    annotations: Dict[str, Any], values: Dict[str, Any]
+) -> Dict[str, Any]:
+    """ Проводит валидацию значений, и возвращает словарь со значениями
+        после валидации (словари заменяются экземплярами классов данных).
+
+        Нужна для валидации в другом процессе или потоке заранее (декоратор
+        validate экземпляры классов данных повторно не проверяет). Ошибка
+        валидации - такая же, как у декоратора validate (ValidationError
+        pydantic не всегда передается из процесса, а эта ошибка - только
+        строка).
+    """
+    try:
+        return pydantic_validator(annotations, values, True, {})
+
+    except Exception as error:
+        raise ValidationArgumentsError(
+            f"Validation error {type(error)}: {str(error)}."
+        )
+
+
+def get_unvalidated(func: Callable) -> Callable:
+    """ Возвращает функцию, декорированную validate, без валидации
+        аргументов и результата.
+
+        Атрибуты декорированной функции (например, параметры кэширования
+        ответа) сохраняются, кроме validated_names.
+    """
+    original = func.__wrapped__
+
+    async def wrapper(*args: Any, **kwargs: Any) -> Any:
+        return await original(*args, **kwargs)
+
+    functools.update_wrapper(wrapper, func)
+    del wrapper.validated_names
+
+    return wrapper
@@ -1,60 +1,368 @@
-from typing import Any, Callable
+import asyncio
+from typing import Any, Callable, Dict, List, Optional, Tuple, Type
 
 from aiohttp import web
-from data_classes.wraps import WrapRequest, WrapResponse
+from data_classes.base import BaseApi
+from data_classes.wraps import WrapBatchRequest, WrapRequest, WrapResponse
 from valdec.errors import ValidationArgumentsError
 
 from middlewares.exceptions import InputDataValidationError
 from middlewares.kwargs_handler import KwargsHandler
+from middlewares.routes import get_route_handler
+from middlewares.stream_body import JSONArrayStream
+from middlewares.utils import ArgumentsManager
+from middlewares.validation import ModelValidator
 
 KEY_NAME_FOR_ID = "_wrap_request_value_id"
+KEY_NAME_FOR_BATCH = "_wrap_request_is_batch"
 
 
 class WrapsKwargsHandler(KwargsHandler):
     """ Пример класса для middleware json-обработчиков api-методов которые
         имеют оболочки для запроса и ответа и валидацию.
+
+        По умолчанию оболочка запроса проверяется заранее собранным
+        валидатором (без создания экземпляра WrapRequest), а словарь оболочки
+        ответа собирается напрямую (поля success и id формирует сам
+        middleware, а результат уже проверен обработчиком).
+        Если strict_envelope_validation=True, то создаются экземпляры
+        WrapRequest и WrapResponse.
+
+        Если тело запроса - json-массив, то это пакет запросов (оболочек
+        WrapBatchRequest). Запросы пакета выполняются одновременно (не более
+        batch_concurrency сразу), ответ - массив оболочек ответов в том же
+        порядке. Ошибка в одном запросе пакета не влияет на остальные.
     """
 
-    def get_error_body(self, request: web.Request, error: Exception) -> dict:
+    def __init__(
+        self, arguments_manager: ArgumentsManager,
+        strict_envelope_validation: bool = False,
+        batch_concurrency: int = 10, batch_max_size: Optional[int] = 100,
+        **kwargs: Any
+    ) -> None:
+
+        super().__init__(arguments_manager, **kwargs)
+
+        self.strict_envelope_validation = strict_envelope_validation
+        self.wrap_request_validators = {
+            WrapRequest: ModelValidator(WrapRequest),
+            WrapBatchRequest: ModelValidator(WrapBatchRequest),
+        }
+
+        self.batch_concurrency = batch_concurrency
+        self.batch_max_size = batch_max_size
+        # Обработчики сервиса по именам апи-методов (для пакетов запросов)
+        self.batch_methods: Optional[Dict[str, Callable]] = None
+
+    def get_error_result(self, request: web.Request, error: Exception) -> dict:
+        """ Формирует и отдает словарь с описанием ошибки (поле result в
+            оболочке ответа).
+        """
+        return dict(error_type=str(type(error)), error_message=str(error))
+
+    def get_error_body(
+        self, request: web.Request, error: Exception,
+        id_: Optional[int] = None,
+    ) -> dict:
         """ Формирует и отдает словарь с телом ответа с ошибкой.
         """
-        result = dict(error_type=str(type(error)), error_message=str(error))
+        result = self.get_error_result(request, error)
         # Так как мы знаем какая у нас оболочка ответа, сразу сделаем словарь
         # с аналогичной "схемой"
         response = dict(
-            # Для поля id используется сохраненное в request значение.
-            success=False, result=result, id=request.get(KEY_NAME_FOR_ID)
+            # Для поля id используется сохраненное в request значение (если
+            # id не передан явно).
+            success=False, result=result,
+            id=request.get(KEY_NAME_FOR_ID) if id_ is None else id_
         )
         return response
 
-    async def run_handler(
-        self, request: web.Request, handler: Callable, request_body: Any
+    def get_wrap_request(
+        self, request_body: Any, model: Type[BaseApi] = WrapRequest
     ) -> dict:
+        """ Проводит валидацию оболочки запроса и возвращает словарь с её
+            полями.
+        """
+        try:
+            if self.strict_envelope_validation:
+                wrap_request = model(**request_body)
+                return {
+                    name: getattr(wrap_request, name)
+                    for name in model.__fields__
+                }
 
-        id_ = None
+            return self.wrap_request_validators[model].validate(request_body)
+
+        except Exception as error:
+            message = f"{type(error).__name__} - {error}"
+            raise InputDataValidationError(message)
+
+    def get_wrap_response(self, result: Any, id_: Optional[int]) -> dict:
+        """ Возвращает словарь оболочки успешного ответа.
+        """
+        if self.strict_envelope_validation:
+            # Проведем валидацию оболочки ответа
+            wrap_response = WrapResponse(success=True, result=result, id=id_)
+            return wrap_response.dict()
 
+        # Экземпляры классов данных в результате не преобразуются в словари
+        # здесь, их сразу кодирует json-кодек (см. utils.encode_model)
+        return dict(success=True, result=result, id=id_)
+
+    async def run_wrapped_handler(
+        self, request: web.Request, handler: Callable, data: Any
+    ) -> Any:
+        """ Запускает обработчик с данными из оболочки запроса.
+        """
         try:
-            # Проведем валидацию оболочки запроса
-            wrap_request = WrapRequest(**request_body)
+            return await super().run_handler(request, handler, data)
 
-        except Exception as error:
+        except ValidationArgumentsError as error:
             message = f"{type(error).__name__} - {error}"
             raise InputDataValidationError(message)
 
+    async def run_handler(
+        self, request: web.Request, handler: Callable, request_body: Any
+    ) -> Any:
+
+        if isinstance(request_body, list):
+            return await self.run_batch(request, handler, request_body)
+
+        # Для потокового тела запроса оболочка не используется (тело запроса
+        # - это json-массив с данными для обработчика)
+        if isinstance(request_body, JSONArrayStream):
+            wrap_request = dict(data=request_body, id=None)
+        else:
+            # Проведем валидацию оболочки запроса
+            wrap_request = self.get_wrap_request(request_body)
+
         # Запомним поле id для ответов (сохранение id в словаре request
         # необходимо для использования значения id в ответе с ошибкой)
-        id_ = wrap_request.id
+        id_ = wrap_request["id"]
         request[KEY_NAME_FOR_ID] = id_
 
+        result = await self.run_wrapped_handler(
+            request, handler, wrap_request["data"]
+        )
+
+        # Оболочка потокового ответа пишется при отправке элементов
+        # (см. get_stream_prefix и get_stream_suffix)
+        if self.is_stream_response_body(request, result):
+            return result
+
+        # Ответ в двоичном формате потоком не отдается
+        if hasattr(result, "__aiter__"):
+            result = [item async for item in result]
+
+        return self.get_wrap_response(result, id_)
+
+    # Пакет запросов --------------------------------------------------------
+
+    def build_batch_methods(
+        self, app: web.Application, request: Optional[web.Request] = None
+    ) -> Dict[str, Callable]:
+        """ Собирает словарь обработчиков сервиса по именам апи-методов (имя -
+            путь POST-маршрута без начального "/").
+
+            Если is_json_service_handler переопределен в наследнике, то
+            маршруты проверяются им с запросом пакета request.
+        """
+        methods = {}
+
+        for route in app.router.routes():
+            path = route.resource.canonical if route.resource else ""
+            if route.method != "POST" or "{" in path:
+                continue
+
+            if self.service_check_overridden and not (
+                self.is_json_service_handler(request, get_route_handler(route))
+            ):
+                continue
+
+            handler = self.get_service_handler(route)
+            if handler is not None:
+                methods[path.lstrip("/")] = handler
+
+        return methods
+
+    def compile_app_handlers(self, app: web.Application) -> None:
+
+        super().compile_app_handlers(app)
+
+        if not self.service_check_overridden:
+            self.batch_methods = self.build_batch_methods(app)
+
+    def get_batch_handler(
+        self, request: web.Request, handler: Callable, method: Optional[str]
+    ) -> Callable:
+        """ Возвращает обработчик для запроса из пакета.
+        """
+        if method is None:
+            return handler
+
+        if self.service_check_overridden:
+            # Маршруты сервиса зависят от запроса
+            batch_methods = self.build_batch_methods(request.app, request)
+        elif self.batch_methods is None:
+            batch_methods = self.batch_methods = self.build_batch_methods(
+                request.app
+            )
+        else:
+            batch_methods = self.batch_methods
+
+        try:
+            return batch_methods[method]
+
+        except KeyError:
+            raise InputDataValidationError(f"Unknown method: '{method}'")
+
+    async def run_batch_item(
+        self, request: web.Request, handler: Callable, envelope: Any
+    ) -> dict:
+        """ Выполняет один запрос из пакета, и возвращает оболочку ответа
+            (успешного или с ошибкой).
+        """
+        id_ = None
+
         try:
-            result = await super().run_handler(
-                request, handler, wrap_request.data
+            wrap_request = self.get_wrap_request(envelope, WrapBatchRequest)
+            id_ = wrap_request["id"]
+
+            item_handler = self.get_batch_handler(
+                request, handler, wrap_request["method"]
             )
-        except ValidationArgumentsError as error:
-            message = f"{type(error).__name__} - {error}"
-            raise InputDataValidationError(message)
+            result = await self.run_wrapped_handler(
+                request, item_handler, wrap_request["data"]
+            )
+
+            # В пакете результаты потоком не отдаются
+            if hasattr(result, "__aiter__"):
+                result = [item async for item in result]
+
+            return self.get_wrap_response(result, id_)
+
+        except Exception as error:
+            return self.get_error_body(request, error, id_)
+
+    def check_batch_ids(self, envelopes: list) -> None:
+        """ Проверяет, что непустые id запросов пакета не повторяются.
+
+            Некорректные id не проверяются (ошибка будет в ответе на
+            запрос).
+        """
+        ids = set()
+
+        for envelope in envelopes:
+            id_ = envelope.get("id") if isinstance(envelope, dict) else None
+            if not isinstance(id_, int) or isinstance(id_, bool):
+                continue
+
+            if id_ in ids:
+                raise InputDataValidationError(
+                    f"Batch has more than one request with id {id_}"
+                )
+            ids.add(id_)
+
+    async def run_batch(
+        self, request: web.Request, handler: Callable, envelopes: list
+    ) -> List[dict]:
+        """ Выполняет пакет запросов, и возвращает список оболочек ответов
+            (в том же порядке, что и запросы).
+
+            Пакет, в котором повторяются непустые id запросов, отклоняется
+            целиком (ответы по ним нельзя было бы сопоставить с запросами).
+        """
+        max_size = self.batch_max_size
+        if max_size is not None and len(envelopes) > max_size:
+            raise InputDataValidationError(
+                f"Batch has more than {max_size} requests"
+            )
+
+        self.check_batch_ids(envelopes)
+
+        request[KEY_NAME_FOR_BATCH] = True
 
-        # Проведем валидацию оболочки ответа
-        wrap_response = WrapResponse(success=True, result=result, id=id_)
+        semaphore = asyncio.Semaphore(self.batch_concurrency)
+
+        async def run_item(envelope: Any) -> dict:
+            async with semaphore:
+                return await self.run_batch_item(request, handler, envelope)
+
+        return list(await asyncio.gather(
+            *(run_item(envelope) for envelope in envelopes)
+        ))
+
+    # Кэш ответов -----------------------------------------------------------
+
+    def get_response_cache_data(
+        self, request: web.Request, request_body: Any
+    ) -> Any:
+
+        # Пакеты запросов (и потоковые тела запросов) не кэшируются
+        if not isinstance(request_body, dict):
+            raise TypeError("Request body is not a wrap request")
+
+        wrap_request = self.get_wrap_request(request_body)
+        request[KEY_NAME_FOR_ID] = wrap_request["id"]
+
+        # id оболочки в ключ записи кэша не входит
+        return wrap_request["data"]
+
+    async def get_response_cache_value(
+        self, request: web.Request, response_body: Any
+    ) -> bytes:
+
+        # В кэше хранится только результат, оболочка ответа собирается для
+        # каждого запроса (со своим id)
+        return await self.get_json_dumps_bytes(
+            request, response_body["result"]
+        )
+
+    def split_response_body_from_cache(
+        self, request: web.Request, value: bytes
+    ) -> Tuple[bytes, bytes]:
+
+        # Голова оболочки ответа постоянная, а хвост содержит id запроса
+        id_ = self.json_codec.dumps_bytes(request.get(KEY_NAME_FOR_ID))
+
+        return (
+            b'{"success": true, "result": ' + value,
+            b', "id": ' + id_ + b"}",
+        )
+
+    # Потоковый ответ -------------------------------------------------------
+    #
+    # Оболочка потокового ответа: {"id": ..., "result": [...], "success": ...}
+    # Поле success пишется последним, поэтому при ошибке во время отправки
+    # элементов массив result закрывается, success будет false, а описание
+    # ошибки попадет в дополнительное поле error.
+
+    def is_stream_response_body(
+        self, request: web.Request, response_body: Any
+    ) -> bool:
+
+        # Ответ на пакет запросов - всегда обычный json-массив
+        if request.get(KEY_NAME_FOR_BATCH):
+            return False
+
+        return super().is_stream_response_body(request, response_body)
+
+    def get_stream_prefix(self, request: web.Request) -> bytes:
+
+        id_ = self.json_codec.dumps_bytes(request.get(KEY_NAME_FOR_ID))
+
+        return b'{"id": ' + id_ + b', "result": ['
+
+    def get_stream_suffix(self, request: web.Request) -> bytes:
+
+        return b'], "success": true}'
+
+    def get_stream_error_suffix(
+        self, request: web.Request, error: Exception
+    ) -> Optional[bytes]:
+
+        error_result = self.json_codec.dumps_bytes(
+            self.get_error_result(request, error)
+        )
 
-        return wrap_response.dict()
+        return b'], "success": false, "error": ' + error_result + b"}"
@@ -2,15 +2,40 @@
 """
 from aiohttp import web
 
-from handlers.kwargs import create, info, read
+from handlers.kwargs import create, create_stream, info, read, read_many
+from launcher import get_serving_options, run
+from middlewares.body_limits import BodyLimitsOptions
+from middlewares.codecs import get_binary_codecs, get_json_codec
+from middlewares.compression import ResponseCompressor
+from middlewares.metrics import Metrics
+from middlewares.offload import get_offload_executor, shutdown_on_cleanup
+from middlewares.profiler import SamplingProfiler
 from middlewares.kwargs_handler import KwargsHandler
+from middlewares.response_cache import ResponseCache
+from middlewares.routes import service_get, service_post
 from middlewares.utils import ArgumentsManager
-from settings import SERVICE_HOST, SERVICE_PORT
+from settings import (BINARY_CODECS, JSON_CODEC, METRICS_PATH,
+                      OFFLOAD_EXECUTOR, OFFLOAD_THRESHOLD, OFFLOAD_WORKERS,
+                      PROFILER_DIR, PROFILER_INTERVAL, PROFILER_PATH,
+                      PROFILER_SECONDS, PROFILER_SIGNAL,
+                      REQUEST_MAX_ARRAY_LENGTH, REQUEST_MAX_BODY_SIZE,
+                      REQUEST_MAX_COMPRESSION_RATIO, REQUEST_MAX_DEPTH,
+                      RESPONSE_CACHE_SIZE, RESPONSE_COMPRESSION_ENCODINGS,
+                      RESPONSE_COMPRESSION_OFFLOAD_THRESHOLD,
+                      RESPONSE_COMPRESSION_THRESHOLD, SERVICE_ACCESS_LOG,
+                      SERVICE_BACKLOG, SERVICE_EVENT_LOOP,
+                      SERVICE_HANDLER_CANCELLATION, SERVICE_HOST,
+                      SERVICE_KEEPALIVE_TIMEOUT, SERVICE_PORT, SERVICE_WORKERS,
+                      SERVING_MODE, STORAGE, STORAGE_PATH, STORAGE_SHARDS,
+                      STREAM_LIST_THRESHOLD)
+from storages.factory import get_storage
 
 routes = [
-    web.post("/create", create),
-    web.get("/info/{info_id}", info),
-    web.post("/read", read),
+    service_post("/create", create),
+    service_post("/create_stream", create_stream),
+    service_get("/info/{info_id}", info),
+    service_post("/read", read),
+    service_post("/read_many", read_many),
 ]
 
 
@@ -26,9 +51,11 @@ def get_app() -> web.Application:
     # данные полученные из json-тела запроса
     arguments_manager.reg_request_body("data")
 
-    # В приложении будем использовать хранилище (это может, например, быть БД).
-    # В текущем примере это просто словарь.
-    app["storage"] = {}
+    # В приложении будем использовать хранилище (см. storages). Какое именно
+    # - задается в настройках, обработчики от этого не зависят.
+    storage = get_storage(STORAGE, STORAGE_PATH, STORAGE_SHARDS)
+    app["storage"] = storage
+    app.on_cleanup.append(storage.on_cleanup)
     # Регистрация имени аргумента обработчика, в который будет передаваться
     # экземпляр хранилища
     arguments_manager.reg_app_key("storage")
@@ -37,15 +64,87 @@ def get_app() -> web.Application:
     # параметр запроса из словаря request.match_info
     arguments_manager.reg_match_info_key("info_id")
 
-    service_handler = KwargsHandler(arguments_manager=arguments_manager)
+    # Пул для тяжелой работы с большими запросами (вне цикла событий)
+    offload_executor = get_offload_executor(OFFLOAD_EXECUTOR, OFFLOAD_WORKERS)
+    if offload_executor is not None:
+        shutdown_on_cleanup(app, offload_executor)
+
+    # Метрики этапов обработки запросов
+    metrics = Metrics() if METRICS_PATH else None
+
+    # Сжатие тел ответов (по заголовку запроса Accept-Encoding)
+    response_compressor = None
+    if RESPONSE_COMPRESSION_THRESHOLD:
+        response_compressor = ResponseCompressor(
+            threshold=RESPONSE_COMPRESSION_THRESHOLD,
+            encodings=RESPONSE_COMPRESSION_ENCODINGS,
+            offload_threshold=RESPONSE_COMPRESSION_OFFLOAD_THRESHOLD,
+        )
+
+    service_handler = KwargsHandler(
+        arguments_manager=arguments_manager,
+        json_codec=get_json_codec(JSON_CODEC),
+        binary_codecs=get_binary_codecs(BINARY_CODECS),
+        body_limits=BodyLimitsOptions(
+            max_body_size=REQUEST_MAX_BODY_SIZE,
+            max_depth=REQUEST_MAX_DEPTH,
+            max_array_length=REQUEST_MAX_ARRAY_LENGTH,
+            max_compression_ratio=REQUEST_MAX_COMPRESSION_RATIO,
+        ),
+        stream_list_threshold=STREAM_LIST_THRESHOLD,
+        metrics=metrics,
+        response_compressor=response_compressor,
+        offload_executor=offload_executor,
+        offload_threshold=OFFLOAD_THRESHOLD,
+        # Кэш ответов для обработчиков с декоратором cache_response
+        response_cache=(
+            ResponseCache(RESPONSE_CACHE_SIZE) if RESPONSE_CACHE_SIZE else None
+        ),
+    )
 
     app.middlewares.append(service_handler.middleware)
 
+    if metrics is not None:
+        # Обработчики метрик и профилировщика (см. ниже) - методы, а не
+        # функции, поэтому middleware не считает их обработчиками сервиса
+        # (см. SimpleHandler.is_json_service_handler) и пропускает запросы к
+        # ним как есть (без json-обработки и метрик)
+        app.router.add_get(METRICS_PATH, metrics.handler)
+
+    if PROFILER_SIGNAL or PROFILER_PATH:
+        # Профилировщик включается во время работы сервиса (по сигналу или
+        # запросу к маршруту), пока он выключен - никакой работы нет
+        profiler = SamplingProfiler(
+            PROFILER_DIR, PROFILER_INTERVAL,
+            signal_name=PROFILER_SIGNAL or None,
+            signal_seconds=PROFILER_SECONDS,
+        )
+        app.on_startup.append(profiler.on_startup)
+
+        if PROFILER_PATH:
+            app.router.add_post(PROFILER_PATH, profiler.handler)
+
+    # Сборка словаря обработчиков сервиса по маршрутам и планов аргументов
+    # обработчиков при старте приложения (ошибки в сигнатурах обработчиков
+    # будут обнаружены сразу, а не при первом запросе)
+    app.on_startup.append(service_handler.on_startup)
+
     return app
 
 
 if __name__ == "__main__":
 
-    app = get_app()
-
-    web.run_app(app, host=SERVICE_HOST, port=SERVICE_PORT)
+    serving_options = get_serving_options(
+        SERVING_MODE,
+        event_loop=SERVICE_EVENT_LOOP,
+        keepalive_timeout=SERVICE_KEEPALIVE_TIMEOUT,
+        backlog=SERVICE_BACKLOG,
+        access_log=SERVICE_ACCESS_LOG,
+        handler_cancellation=SERVICE_HANDLER_CANCELLATION,
+    )
+
+    # Приложение создается в каждом процессе-воркере (см. launcher)
+    run(
+        get_app, host=SERVICE_HOST, port=SERVICE_PORT,
+        workers=SERVICE_WORKERS, options=serving_options,
+    )
@@ -3,12 +3,27 @@
 from aiohttp import web
 
 from handlers.simple import handler500, some_handler
+from launcher import get_serving_options, run
+from middlewares.body_limits import BodyLimitsOptions
+from middlewares.codecs import get_binary_codecs, get_json_codec
+from middlewares.compression import ResponseCompressor
+from middlewares.metrics import Metrics
+from middlewares.routes import service_post
 from middlewares.simple_handler import SimpleHandler
-from settings import SERVICE_HOST, SERVICE_PORT
+from settings import (BINARY_CODECS, JSON_CODEC, METRICS_PATH,
+                      REQUEST_MAX_ARRAY_LENGTH, REQUEST_MAX_BODY_SIZE,
+                      REQUEST_MAX_COMPRESSION_RATIO, REQUEST_MAX_DEPTH,
+                      RESPONSE_COMPRESSION_ENCODINGS,
+                      RESPONSE_COMPRESSION_OFFLOAD_THRESHOLD,
+                      RESPONSE_COMPRESSION_THRESHOLD, SERVICE_ACCESS_LOG,
+                      SERVICE_BACKLOG, SERVICE_EVENT_LOOP,
+                      SERVICE_HANDLER_CANCELLATION, SERVICE_HOST,
+                      SERVICE_KEEPALIVE_TIMEOUT, SERVICE_PORT, SERVICE_WORKERS,
+                      SERVING_MODE, STREAM_LIST_THRESHOLD)
 
 routes = [
-    web.post("/some_handler", some_handler),
-    web.post("/handler500", handler500),
+    service_post("/some_handler", some_handler),
+    service_post("/handler500", handler500),
 ]
 
 
@@ -18,15 +33,61 @@ def get_app() -> web.Application:
 
     app.add_routes(routes)
 
-    service_handler = SimpleHandler()
+    # Метрики этапов обработки запросов
+    metrics = Metrics() if METRICS_PATH else None
+
+    # Сжатие тел ответов (по заголовку запроса Accept-Encoding)
+    response_compressor = None
+    if RESPONSE_COMPRESSION_THRESHOLD:
+        response_compressor = ResponseCompressor(
+            threshold=RESPONSE_COMPRESSION_THRESHOLD,
+            encodings=RESPONSE_COMPRESSION_ENCODINGS,
+            offload_threshold=RESPONSE_COMPRESSION_OFFLOAD_THRESHOLD,
+        )
+
+    service_handler = SimpleHandler(
+        json_codec=get_json_codec(JSON_CODEC),
+        binary_codecs=get_binary_codecs(BINARY_CODECS),
+        body_limits=BodyLimitsOptions(
+            max_body_size=REQUEST_MAX_BODY_SIZE,
+            max_depth=REQUEST_MAX_DEPTH,
+            max_array_length=REQUEST_MAX_ARRAY_LENGTH,
+            max_compression_ratio=REQUEST_MAX_COMPRESSION_RATIO,
+        ),
+        stream_list_threshold=STREAM_LIST_THRESHOLD,
+        metrics=metrics,
+        response_compressor=response_compressor,
+    )
 
     app.middlewares.append(service_handler.middleware)
 
+    if metrics is not None:
+        # Обработчик метрик - метод, а не функция, поэтому middleware не
+        # считает его обработчиком сервиса (см.
+        # SimpleHandler.is_json_service_handler) и пропускает запросы к нему
+        # как есть (без json-обработки и метрик)
+        app.router.add_get(METRICS_PATH, metrics.handler)
+
+    # Словарь обработчиков сервиса по маршрутам собирается при старте
+    # приложения
+    app.on_startup.append(service_handler.on_startup)
+
     return app
 
 
 if __name__ == "__main__":
 
-    app = get_app()
+    serving_options = get_serving_options(
+        SERVING_MODE,
+        event_loop=SERVICE_EVENT_LOOP,
+        keepalive_timeout=SERVICE_KEEPALIVE_TIMEOUT,
+        backlog=SERVICE_BACKLOG,
+        access_log=SERVICE_ACCESS_LOG,
+        handler_cancellation=SERVICE_HANDLER_CANCELLATION,
+    )
 
-    web.run_app(app, host=SERVICE_HOST, port=SERVICE_PORT)
+    # Приложение создается в каждом процессе-воркере (см. launcher)
+    run(
+        get_app, host=SERVICE_HOST, port=SERVICE_PORT,
+        workers=SERVICE_WORKERS, options=serving_options,
+    )
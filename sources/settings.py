@@ -1,9 +1,148 @@
 """ Настройки сервиса.
 """
-from os import getenv
+from os import cpu_count, getenv
+from tempfile import gettempdir
 
 
 # Константы для app ----------------------------------------------------------
 
 SERVICE_HOST = getenv("SERVICE_HOST", "0.0.0.0")
 SERVICE_PORT = getenv("SERVICE_PORT", "5000")
+# Количество процессов-воркеров (0 - по количеству ядер процессора), см.
+# launcher. При значении больше 1 хранилище должно быть общим для процессов.
+SERVICE_WORKERS = int(getenv("SERVICE_WORKERS", "1")) or cpu_count() or 1
+
+# Режим запуска (см. launcher): "default" (цикл событий asyncio и настройки
+# aiohttp по умолчанию) или "tuned" (uvloop, если установлен, и настройки
+# для высокой нагрузки)
+SERVING_MODE = getenv("SERVING_MODE", "default")
+# Параметры запуска, которые заменяют значения режима (пустое значение -
+# значение режима): цикл событий ("asyncio", "uvloop" или "auto"), время
+# ожидания следующего запроса в открытом соединении в секундах, размер
+# очереди входящих соединений, журнал запросов и отмена обработчика при
+# разрыве соединения клиентом ("1" или "0")
+SERVICE_EVENT_LOOP = getenv("SERVICE_EVENT_LOOP", "") or None
+_keepalive_timeout = getenv("SERVICE_KEEPALIVE_TIMEOUT", "")
+SERVICE_KEEPALIVE_TIMEOUT = (
+    float(_keepalive_timeout) if _keepalive_timeout else None
+)
+_backlog = getenv("SERVICE_BACKLOG", "")
+SERVICE_BACKLOG = int(_backlog) if _backlog else None
+_access_log = getenv("SERVICE_ACCESS_LOG", "")
+SERVICE_ACCESS_LOG = _access_log == "1" if _access_log else None
+_handler_cancellation = getenv("SERVICE_HANDLER_CANCELLATION", "")
+SERVICE_HANDLER_CANCELLATION = (
+    _handler_cancellation == "1" if _handler_cancellation else None
+)
+
+# Хранилище: "persons" (компактное хранилище записей о персонах в памяти),
+# "memory" или "sqlite"
+STORAGE = getenv("STORAGE", "persons")
+# Путь к файлу базы для хранилища "sqlite"
+STORAGE_PATH = getenv("STORAGE_PATH", "storage.sqlite3")
+# Количество шардов хранилища
+STORAGE_SHARDS = int(getenv("STORAGE_SHARDS", "1"))
+
+# Константы для middleware ---------------------------------------------------
+
+# Кодек json: "auto" (самый быстрый из установленных), "orjson" или "json"
+JSON_CODEC = getenv("JSON_CODEC", "auto")
+
+# Двоичные форматы тел запросов и ответов (кроме json), через запятую:
+# "auto" (все, библиотеки которых установлены), "msgpack" или пустое
+# значение (только json)
+_binary_codecs = getenv("BINARY_CODECS", "auto")
+BINARY_CODECS = (
+    None if _binary_codecs == "auto" else
+    [name for name in _binary_codecs.split(",") if name]
+)
+
+# Минимальная длина списка-результата обработчика, при которой ответ
+# отдается потоком (пустое значение, по умолчанию - списки потоком не
+# отдаются). Потоковый ответ передается частями (chunked), а в оболочке
+# ответа поле success идет последним.
+_stream_list_threshold = getenv("STREAM_LIST_THRESHOLD", "")
+STREAM_LIST_THRESHOLD = (
+    int(_stream_list_threshold) if _stream_list_threshold else None
+)
+
+# Строгая валидация оболочек запроса и ответа в WrapsKwargsHandler (создание
+# экземпляров WrapRequest и WrapResponse на каждый запрос)
+WRAPS_STRICT_VALIDATION = getenv("WRAPS_STRICT_VALIDATION", "0") == "1"
+
+# Пакеты запросов в WrapsKwargsHandler: сколько запросов пакета выполняются
+# одновременно, и максимальный размер пакета
+BATCH_CONCURRENCY = int(getenv("BATCH_CONCURRENCY", "10"))
+BATCH_MAX_SIZE = int(getenv("BATCH_MAX_SIZE", "100"))
+
+# Кэш ответов обработчиков чтения: максимальное количество записей (0, по
+# умолчанию - кэш выключен) и время жизни записи в секундах
+RESPONSE_CACHE_SIZE = int(getenv("RESPONSE_CACHE_SIZE", "0"))
+RESPONSE_CACHE_TTL = float(getenv("RESPONSE_CACHE_TTL", "60"))
+
+# Вынос разбора json, валидации и дампа ответа для больших запросов из цикла
+# событий (см. middlewares.offload): пул ("auto", "process", "thread" или
+# пустое значение, по умолчанию - выключено), количество его воркеров (0 -
+# по количеству ядер) и минимальный размер тела запроса в байтах. Пул
+# процессов запускается в каждом приложении (и в каждом воркере), поэтому
+# он включается явно.
+OFFLOAD_EXECUTOR = getenv("OFFLOAD_EXECUTOR", "")
+OFFLOAD_WORKERS = int(getenv("OFFLOAD_WORKERS", "2")) or None
+OFFLOAD_THRESHOLD = int(getenv("OFFLOAD_THRESHOLD", str(256 * 1024)))
+
+# Ограничения тела запроса по умолчанию (см. middlewares.body_limits):
+# размер в байтах, глубина вложенности массивов и объектов и длина массивов
+# (0 - без ограничения). Тело, которое им не соответствует, отклоняется до
+# разбора json.
+REQUEST_MAX_BODY_SIZE = (
+    int(getenv("REQUEST_MAX_BODY_SIZE", str(1024 * 1024))) or None
+)
+REQUEST_MAX_DEPTH = int(getenv("REQUEST_MAX_DEPTH", "32")) or None
+REQUEST_MAX_ARRAY_LENGTH = (
+    int(getenv("REQUEST_MAX_ARRAY_LENGTH", "10000")) or None
+)
+# Максимальное отношение размеров распакованного и сжатого (gzip, deflate,
+# а также br и zstd, если aiohttp их поддерживает) тела запроса (0 - без
+# ограничения). Сжатые тела aiohttp распаковывает по мере получения данных,
+# ограничение размера применяется к распакованному телу.
+REQUEST_MAX_COMPRESSION_RATIO = (
+    float(getenv("REQUEST_MAX_COMPRESSION_RATIO", "100")) or None
+)
+
+# Сжатие тел ответов (см. middlewares.compression): минимальный размер тела
+# в байтах (0 - сжатие выключено), разрешенные кодировки через запятую
+# (пустое значение - все доступные) и минимальный размер тела, которое
+# сжимается в пуле потоков
+RESPONSE_COMPRESSION_THRESHOLD = int(
+    getenv("RESPONSE_COMPRESSION_THRESHOLD", "1024")
+)
+RESPONSE_COMPRESSION_ENCODINGS = [
+    encoding.strip()
+    for encoding in getenv("RESPONSE_COMPRESSION_ENCODINGS", "").split(",")
+    if encoding.strip()
+] or None
+RESPONSE_COMPRESSION_OFFLOAD_THRESHOLD = int(
+    getenv("RESPONSE_COMPRESSION_OFFLOAD_THRESHOLD", str(64 * 1024))
+)
+
+# Путь маршрута с метриками middleware (пустое значение - метрики выключены)
+METRICS_PATH = getenv("METRICS_PATH", "/metrics")
+
+# Семплирующий профилировщик (см. middlewares.profiler): сигнал, по которому
+# он включается на PROFILER_SECONDS секунд (например, "SIGUSR1"), и путь
+# маршрута для его включения (пустые значения, по умолчанию - выключено),
+# интервал семплирования в секундах и каталог для файлов с результатами
+PROFILER_SIGNAL = getenv("PROFILER_SIGNAL", "")
+PROFILER_PATH = getenv("PROFILER_PATH", "")
+PROFILER_SECONDS = float(getenv("PROFILER_SECONDS", "30"))
+PROFILER_INTERVAL = float(getenv("PROFILER_INTERVAL", "0.005"))
+PROFILER_DIR = getenv("PROFILER_DIR", gettempdir())
+
+# Ограничения для потокового разбора тела запроса в обработчиках create_stream
+CREATE_STREAM_MAX_BODY_SIZE = int(
+    getenv("CREATE_STREAM_MAX_BODY_SIZE", str(64 * 1024 * 1024))
+)
+CREATE_STREAM_MAX_ITEMS = int(getenv("CREATE_STREAM_MAX_ITEMS", "100000"))
+CREATE_STREAM_MAX_ITEM_SIZE = int(
+    getenv("CREATE_STREAM_MAX_ITEM_SIZE", str(1024 * 1024))
+)
@@ -0,0 +1,53 @@
+""" Базовый класс асинхронного хранилища.
+"""
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional
+
+
+class BaseStorage:
+    """ Асинхронное хранилище записей по ключу.
+
+        Обработчики работают с хранилищем только через эти методы, поэтому
+        реализацию хранилища можно менять без изменения обработчиков.
+    """
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+        """ Возвращает запись по ключу (или None, если записи нет).
+        """
+        raise NotImplementedError
+
+    async def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """ Возвращает словарь найденных записей по ключам (ключей, для
+            которых нет записей, в словаре не будет).
+        """
+        result = {}
+        for key in keys:
+            value = await self.get(key)
+            if value is not None:
+                result[key] = value
+
+        return result
+
+    async def put(self, key: Hashable, value: Any) -> None:
+        """ Сохраняет запись по ключу.
+        """
+        raise NotImplementedError
+
+    async def put_many(self, items: Mapping[Hashable, Any]) -> None:
+        """ Сохраняет несколько записей.
+        """
+        for key, value in items.items():
+            await self.put(key, value)
+
+    async def delete(self, key: Hashable) -> bool:
+        """ Удаляет запись по ключу. Возвращает True, если запись была.
+        """
+        raise NotImplementedError
+
+    async def close(self) -> None:
+        """ Освобождает ресурсы хранилища.
+        """
+
+    async def on_cleanup(self, app: Any) -> None:
+        """ Обработчик сигнала app.on_cleanup.
+        """
+        await self.close()
@@ -0,0 +1,45 @@
+""" Создание хранилища по настройкам.
+"""
+import os
+
+from storages.base import BaseStorage
+from storages.memory import MemoryStorage
+from storages.persons import PersonStorage
+from storages.sharded import ShardedStorage
+from storages.sqlite import SQLiteStorage
+
+
+def get_storage(name: str, path: str = "", shards: int = 1) -> BaseStorage:
+    """ Возвращает экземпляр хранилища.
+
+        :name:   "memory", "persons" или "sqlite".
+        :path:   Путь к файлу базы (для "sqlite"). Если shards > 1, то это
+                 префикс путей к файлам шардов.
+        :shards: Количество шардов (если больше 1, то возвращается
+                 ShardedStorage).
+    """
+    if name == "memory":
+        def make_storage(index: int) -> BaseStorage:
+            return MemoryStorage()
+
+    elif name == "persons":
+        def make_storage(index: int) -> BaseStorage:
+            return PersonStorage()
+
+    elif name == "sqlite":
+        if not path:
+            raise ValueError("Path is required for sqlite storage")
+
+        def make_storage(index: int) -> BaseStorage:
+            if shards == 1:
+                return SQLiteStorage(path)
+            root, ext = os.path.splitext(path)
+            return SQLiteStorage(f"{root}_{index}{ext}")
+
+    else:
+        raise ValueError(f"Unknown storage: '{name}'")
+
+    if shards == 1:
+        return make_storage(0)
+
+    return ShardedStorage([make_storage(index) for index in range(shards)])
@@ -0,0 +1,90 @@
+""" Хранилище в памяти.
+"""
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional, Tuple
+
+from storages.base import BaseStorage
+
+# Запись в хранилище: (номер "формы" записи, кортеж значений полей), для
+# значений, которые не являются словарями: (None, значение)
+Record = Tuple[Optional[int], Any]
+
+
+class MemoryStorage(BaseStorage):
+    """ Хранилище в памяти процесса.
+
+        Записи-словари хранятся компактно: значения полей - в кортеже, а
+        кортеж имен полей ("форма" записи) хранится один раз для всех
+        записей с одинаковым набором полей.
+        Значения, которые не являются словарями, хранятся как есть.
+    """
+
+    def __init__(self) -> None:
+
+        self.records: Dict[Hashable, Record] = {}
+
+        self.shapes: Dict[tuple, int] = {}
+        self.shapes_fields: list = []
+
+    def pack(self, value: Any) -> Record:
+        """ Упаковывает запись для хранения.
+        """
+        if type(value) is not dict:
+            return None, value
+
+        fields = tuple(value)
+
+        shape = self.shapes.get(fields)
+        if shape is None:
+            shape = self.shapes[fields] = len(self.shapes_fields)
+            self.shapes_fields.append(fields)
+
+        return shape, tuple(value.values())
+
+    def unpack(self, record: Record) -> Any:
+        """ Распаковывает хранимую запись (для словарей - всегда новый
+            словарь).
+        """
+        shape, values = record
+
+        if shape is None:
+            return values
+
+        return dict(zip(self.shapes_fields[shape], values))
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+
+        record = self.records.get(key)
+
+        return None if record is None else self.unpack(record)
+
+    async def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+
+        records = self.records
+        unpack = self.unpack
+
+        result = {}
+        for key in keys:
+            record = records.get(key)
+            if record is not None:
+                result[key] = unpack(record)
+
+        return result
+
+    async def put(self, key: Hashable, value: Any) -> None:
+
+        self.records[key] = self.pack(value)
+
+    async def put_many(self, items: Mapping[Hashable, Any]) -> None:
+
+        pack = self.pack
+        self.records.update(
+            (key, pack(value)) for key, value in items.items()
+        )
+
+    async def delete(self, key: Hashable) -> bool:
+
+        return self.records.pop(key, None) is not None
+
+    def __len__(self) -> int:
+
+        return len(self.records)
@@ -0,0 +1,88 @@
+""" Компактное хранилище записей о персонах в памяти.
+"""
+from typing import Any, Dict, Hashable, Iterable, Mapping, Optional
+from uuid import UUID
+
+from storages.base import BaseStorage
+
+# Отсутствующее имя (имя записи может быть None)
+_MISSING = object()
+
+
+def get_key_bytes(key: Hashable) -> Optional[bytes]:
+    """ Возвращает 16 байт UUID из ключа (UUID или строка с UUID), или None,
+        если ключ не является UUID.
+    """
+    if isinstance(key, UUID):
+        return key.bytes
+
+    try:
+        return UUID(key).bytes
+
+    except (TypeError, ValueError, AttributeError):
+        return None
+
+
+class PersonStorage(BaseStorage):
+    """ Хранилище записей о персонах ({"id": ..., "name": ...}) в памяти.
+
+        Хранится только индекс: 16 байт UUID -> имя. Ни словарь записи, ни
+        UUID (или строка с ним) не хранятся.
+
+        Поле id записи всегда равно ключу, поэтому get возвращает id того же
+        типа, что и ключ, по которому запрашивается запись (UUID или str).
+    """
+
+    def __init__(self) -> None:
+
+        self.names: Dict[bytes, Any] = {}
+
+    def put_record(self, key: Hashable, value: dict) -> None:
+
+        if value["id"] != key:
+            raise ValueError(f"Record id must be equal to key: {key}")
+
+        key_bytes = get_key_bytes(key)
+        if key_bytes is None:
+            raise ValueError(f"Key must be UUID: {key}")
+
+        self.names[key_bytes] = value["name"]
+
+    async def get(self, key: Hashable) -> Optional[dict]:
+
+        name = self.names.get(get_key_bytes(key), _MISSING)
+
+        if name is _MISSING:
+            return None
+
+        return {"id": key, "name": name}
+
+    async def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, dict]:
+
+        names = self.names
+
+        result = {}
+        for key in keys:
+            name = names.get(get_key_bytes(key), _MISSING)
+            if name is not _MISSING:
+                result[key] = {"id": key, "name": name}
+
+        return result
+
+    async def put(self, key: Hashable, value: dict) -> None:
+
+        self.put_record(key, value)
+
+    async def put_many(self, items: Mapping[Hashable, dict]) -> None:
+
+        put_record = self.put_record
+        for key, value in items.items():
+            put_record(key, value)
+
+    async def delete(self, key: Hashable) -> bool:
+
+        return self.names.pop(get_key_bytes(key), _MISSING) is not _MISSING
+
+    def __len__(self) -> int:
+
+        return len(self.names)
@@ -0,0 +1,76 @@
+""" Хранилище, разделенное на части (шарды).
+"""
+import asyncio
+from typing import Any, Dict, Hashable, Iterable, List, Mapping, Optional
+from zlib import crc32
+
+from storages.base import BaseStorage
+
+
+class ShardedStorage(BaseStorage):
+    """ Хранилище, которое распределяет записи по нескольким хранилищам.
+
+        Номер шарда для ключа вычисляется по crc32 от str(key), поэтому он
+        не меняется при перезапуске процесса (в отличие от hash()).
+        Пакетные операции группируются по шардам и выполняются в шардах
+        одновременно.
+    """
+
+    def __init__(self, shards: List[BaseStorage]) -> None:
+
+        if not shards:
+            raise ValueError("ShardedStorage requires at least one shard")
+
+        self.shards = shards
+
+    def get_shard_index(self, key: Hashable) -> int:
+
+        return crc32(str(key).encode()) % len(self.shards)
+
+    def get_shard(self, key: Hashable) -> BaseStorage:
+
+        return self.shards[self.get_shard_index(key)]
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+
+        return await self.get_shard(key).get(key)
+
+    async def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+
+        shards_keys: Dict[int, list] = {}
+        for key in keys:
+            shards_keys.setdefault(self.get_shard_index(key), []).append(key)
+
+        results = await asyncio.gather(*(
+            self.shards[index].get_many(shard_keys)
+            for index, shard_keys in shards_keys.items()
+        ))
+
+        result = {}
+        for shard_result in results:
+            result.update(shard_result)
+
+        return result
+
+    async def put(self, key: Hashable, value: Any) -> None:
+
+        await self.get_shard(key).put(key, value)
+
+    async def put_many(self, items: Mapping[Hashable, Any]) -> None:
+
+        shards_items: Dict[int, dict] = {}
+        for key, value in items.items():
+            shards_items.setdefault(self.get_shard_index(key), {})[key] = value
+
+        await asyncio.gather(*(
+            self.shards[index].put_many(shard_items)
+            for index, shard_items in shards_items.items()
+        ))
+
+    async def delete(self, key: Hashable) -> bool:
+
+        return await self.get_shard(key).delete(key)
+
+    async def close(self) -> None:
+
+        await asyncio.gather(*(shard.close() for shard in self.shards))
@@ -0,0 +1,153 @@
+""" Хранилище на диске (SQLite).
+"""
+import asyncio
+import pickle
+import sqlite3
+from concurrent.futures import ThreadPoolExecutor
+from typing import (Any, Callable, Dict, Hashable, Iterable, List, Mapping,
+                    Optional)
+
+from storages.base import BaseStorage
+
+# Максимальное количество параметров в одном запросе SQLite
+_MAX_VARIABLES = 500
+
+
+class SQLiteStorage(BaseStorage):
+    """ Хранилище во встроенной базе данных SQLite.
+
+        Ключи приводятся к строке (str(key)), записи сохраняются через
+        pickle, поэтому get отдает записи с теми же типами значений, с
+        которыми они были сохранены.
+
+        Все обращения к базе выполняются в отдельном потоке, чтобы не
+        блокировать цикл событий.
+    """
+
+    def __init__(self, path: str) -> None:
+
+        self.path = path
+        self.executor = ThreadPoolExecutor(
+            max_workers=1, thread_name_prefix="sqlite_storage"
+        )
+        self.connection: Optional[sqlite3.Connection] = None
+
+    def connect(self) -> sqlite3.Connection:
+        """ Открывает соединение с базой (в потоке хранилища).
+        """
+        if self.connection is None:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute("PRAGMA synchronous=NORMAL")
+            connection.execute(
+                "CREATE TABLE IF NOT EXISTS storage "
+                "(key TEXT PRIMARY KEY, value BLOB NOT NULL)"
+            )
+            self.connection = connection
+
+        return self.connection
+
+    async def run(self, func: Callable, *args: Any) -> Any:
+        """ Выполняет func(connection, *args) в потоке хранилища.
+        """
+        def run_func():
+            return func(self.connect(), *args)
+
+        loop = asyncio.get_running_loop()
+
+        return await loop.run_in_executor(self.executor, run_func)
+
+    # Функции, которые выполняются в потоке хранилища ------------------------
+
+    @staticmethod
+    def _get(connection: sqlite3.Connection, key: str) -> Optional[bytes]:
+
+        row = connection.execute(
+            "SELECT value FROM storage WHERE key = ?", (key, )
+        ).fetchone()
+
+        return None if row is None else row[0]
+
+    @staticmethod
+    def _get_many(
+        connection: sqlite3.Connection, keys: List[str]
+    ) -> Dict[str, bytes]:
+
+        result = {}
+        for index in range(0, len(keys), _MAX_VARIABLES):
+            chunk = keys[index:index + _MAX_VARIABLES]
+            placeholders = ", ".join("?" * len(chunk))
+            result.update(connection.execute(
+                "SELECT key, value FROM storage "
+                f"WHERE key IN ({placeholders})",
+                chunk,
+            ))
+
+        return result
+
+    @staticmethod
+    def _put_many(connection: sqlite3.Connection, rows: List[tuple]) -> None:
+
+        with connection:
+            connection.executemany(
+                "INSERT OR REPLACE INTO storage (key, value) VALUES (?, ?)",
+                rows,
+            )
+
+    @staticmethod
+    def _delete(connection: sqlite3.Connection, key: str) -> bool:
+
+        with connection:
+            cursor = connection.execute(
+                "DELETE FROM storage WHERE key = ?", (key, )
+            )
+
+        return cursor.rowcount > 0
+
+    # Методы хранилища -------------------------------------------------------
+
+    async def get(self, key: Hashable) -> Optional[Any]:
+
+        value = await self.run(self._get, str(key))
+
+        return None if value is None else pickle.loads(value)
+
+    async def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+
+        keys_by_str = {str(key): key for key in keys}
+
+        values = await self.run(self._get_many, list(keys_by_str))
+
+        return {
+            keys_by_str[key]: pickle.loads(value)
+            for key, value in values.items()
+        }
+
+    async def put(self, key: Hashable, value: Any) -> None:
+
+        await self.put_many({key: value})
+
+    async def put_many(self, items: Mapping[Hashable, Any]) -> None:
+
+        rows = [
+            (str(key), pickle.dumps(value, pickle.HIGHEST_PROTOCOL))
+            for key, value in items.items()
+        ]
+
+        await self.run(self._put_many, rows)
+
+    async def delete(self, key: Hashable) -> bool:
+
+        return await self.run(self._delete, str(key))
+
+    async def close(self) -> None:
+
+        def close_connection():
+            if self.connection is not None:
+                self.connection.close()
+                self.connection = None
+
+        loop = asyncio.get_running_loop()
+        await loop.run_in_executor(self.executor, close_connection)
+
+        self.executor.shutdown(wait=True)
@@ -1,6 +1,7 @@
 import pytest
 from aiohttp import web
-from handlers.kwargs import PersonNotFound, create, info, read
+from handlers.kwargs import PersonNotFound, create, info, read, read_many
+from storages.memory import MemoryStorage
 
 
 @pytest.mark.asyncio
@@ -8,14 +9,14 @@ async def test_create():
     """ Создание записи о персоне
     """
     data = {"name": "Ivan"}
-    storage = {}
+    storage = MemoryStorage()
 
     result = await create(data=data, storage=storage)
 
     assert isinstance(result["id"], str)
     assert result["name"] == data["name"]
 
-    assert result["id"] in storage
+    assert await storage.get(result["id"]) == result
 
 
 @pytest.mark.asyncio
@@ -23,7 +24,7 @@ async def test_read_successful():
     """ Успешное чтение записи о персоне
     """
     data = {"name": "Ivan"}
-    storage = {}
+    storage = MemoryStorage()
 
     create_result = await create(data=data, storage=storage)
 
@@ -40,7 +41,7 @@ async def test_read_not_found_exception():
     """ Запись о персоне не найдена
     """
     with pytest.raises(PersonNotFound):
-        await read(data="some wrong id", storage={})
+        await read(data="some wrong id", storage=MemoryStorage())
 
 
 @pytest.mark.asyncio
@@ -50,3 +51,21 @@ async def test_info():
     annotations = list(info.__annotations__.values())
 
     assert web.Request in annotations
+
+
+@pytest.mark.asyncio
+async def test_read_many():
+    """ Чтение нескольких записей о персонах
+    """
+    storage = MemoryStorage()
+
+    created = await create(
+        data=[{"name": "Ivan"}, {"name": "Oleg"}], storage=storage
+    )
+    ids = [created[1]["id"], "some wrong id", created[0]["id"]]
+
+    result = await read_many(data=ids + ids, storage=storage)
+
+    assert result == {
+        "found": [created[1], created[0]], "missing": ["some wrong id"]
+    }
@@ -2,8 +2,9 @@ from uuid import UUID, uuid4
 
 import pytest
 from aiohttp import web
-from data_classes.person import PersonInfo
-from handlers.wraps import PersonNotFound, create, info, read
+from data_classes.person import PersonInfo, PersonsReadResult
+from handlers.wraps import PersonNotFound, create, info, read, read_many
+from storages.memory import MemoryStorage
 from valdec.errors import ValidationArgumentsError
 
 
@@ -11,7 +12,8 @@ one_dict_for_create = {"name": "Ivan"}
 create_params_names = "data, storage, result_type"
 create_params_values = [
     # Если пришел словарь - на выходе PersonInfo, если список - то список
-    (one_dict_for_create, {}, PersonInfo), ([one_dict_for_create, ], {}, list)
+    (one_dict_for_create, MemoryStorage(), PersonInfo),
+    ([one_dict_for_create, ], MemoryStorage(), list),
 ]
 
 
@@ -29,14 +31,14 @@ async def test_create_result_type(data, storage, result_type):
 async def test_create():
     """ Создание записи о персоне
     """
-    storage = {}
+    storage = MemoryStorage()
 
     result = await create(data=one_dict_for_create, storage=storage)
 
     assert isinstance(result.id, UUID)
     assert result.name == one_dict_for_create["name"]
 
-    assert result.id in storage
+    assert await storage.get(result.id) == result.dict()
 
 
 @pytest.mark.asyncio
@@ -44,20 +46,23 @@ async def test_create_args_validation_errors():
     """ Ошибки валидации аргументов
     """
     with pytest.raises(ValidationArgumentsError):
-        await create(data={"wrong_arg_name": "foo"}, storage={})
+        await create(data={"wrong_arg_name": "foo"}, storage=MemoryStorage())
 
     with pytest.raises(ValidationArgumentsError):
-        await create(data={"name": 1111111}, storage={})
+        await create(data={"name": 1111111}, storage=MemoryStorage())
 
     with pytest.raises(ValidationArgumentsError):
-        await create(data=[{"name": 1111111}, {"name": 2222222}], storage={})
+        await create(
+            data=[{"name": 1111111}, {"name": 2222222}],
+            storage=MemoryStorage(),
+        )
 
 
 @pytest.mark.asyncio
 async def test_read_successful():
     """ Успешное чтение записи о персоне
     """
-    storage = {}
+    storage = MemoryStorage()
 
     create_result = await create(data=one_dict_for_create, storage=storage)
 
@@ -74,7 +79,7 @@ async def test_read_args_validation_errors():
     """ Ошибки валидации аргумента
     """
     with pytest.raises(ValidationArgumentsError):
-        await read(data="wrong_uuid", storage={}, req={})
+        await read(data="wrong_uuid", storage=MemoryStorage(), req={})
 
 
 @pytest.mark.asyncio
@@ -83,7 +88,7 @@ async def test_read_not_found_exception():
     """
     some_wrong_id = uuid4()
     with pytest.raises(PersonNotFound):
-        await read(data=some_wrong_id, storage={}, req={})
+        await read(data=some_wrong_id, storage=MemoryStorage(), req={})
 
 
 @pytest.mark.asyncio
@@ -101,3 +106,28 @@ async def test_info_args_validation_errors():
     """
     with pytest.raises(ValidationArgumentsError):
         await info(info_id="wrong_int", request={})
+
+
+@pytest.mark.asyncio
+async def test_read_many():
+    """ Чтение нескольких записей о персонах
+    """
+    storage = MemoryStorage()
+
+    created = await create(data=[one_dict_for_create] * 2, storage=storage)
+    missing_id = uuid4()
+    ids = [str(created[1].id), missing_id, created[0].id]
+
+    result = await read_many(data=ids + ids, storage=storage)
+
+    assert result == PersonsReadResult(
+        found=[created[1], created[0]], missing=[missing_id]
+    )
+
+
+@pytest.mark.asyncio
+async def test_read_many_args_validation_errors():
+    """ Ошибки валидации аргумента
+    """
+    with pytest.raises(ValidationArgumentsError):
+        await read_many(data=[uuid4(), "wrong_uuid"], storage=MemoryStorage())
@@ -0,0 +1,179 @@
+""" Тесты запуска сервиса в нескольких процессах.
+"""
+import asyncio
+import json
+import multiprocessing
+import os
+import signal
+import socket
+import time
+from urllib.request import urlopen
+
+import pytest
+from aiohttp import web
+from launcher import (ServingOptions, Supervisor, get_run_app_kwargs,
+                      get_serving_options, set_event_loop_policy)
+
+WORKERS = 2
+
+
+async def pid_handler(request: web.Request) -> web.Response:
+    return web.json_response(os.getpid())
+
+
+def get_app() -> web.Application:
+
+    app = web.Application()
+    app.router.add_get("/pid", pid_handler)
+
+    return app
+
+
+def get_free_port() -> int:
+
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+def get_pids(port: int, timeout: float = 10.0) -> set:
+    """ Возвращает pid воркеров, которые ответили на запросы (ждет, пока
+        ответят все WORKERS воркеров).
+    """
+    pids = set()
+    deadline = time.monotonic() + timeout
+
+    while len(pids) < WORKERS and time.monotonic() < deadline:
+        try:
+            with urlopen(f"http://127.0.0.1:{port}/pid", timeout=1) as resp:
+                pids.add(json.loads(resp.read()))
+        except OSError:
+            time.sleep(0.05)
+
+    return pids
+
+
+@pytest.fixture
+def supervisor_process():
+
+    port = get_free_port()
+    supervisor = Supervisor(get_app, "127.0.0.1", port, WORKERS, 5.0)
+
+    process = multiprocessing.get_context("fork").Process(
+        target=supervisor.run
+    )
+    process.start()
+
+    yield process, port
+
+    if process.is_alive():
+        # Штатная остановка (с воркерами), если тест ее не выполнил
+        os.kill(process.pid, signal.SIGTERM)
+        process.join(10)
+
+    if process.is_alive():
+        process.kill()
+        process.join()
+
+
+def test_workers_restart_and_stop(supervisor_process):
+    """ Воркеры слушают один порт, упавший воркер перезапускается, по
+        SIGTERM все процессы завершаются
+    """
+    process, port = supervisor_process
+
+    pids = get_pids(port)
+    assert len(pids) == WORKERS
+    assert process.pid not in pids
+
+    # "Падение" воркера
+    killed = pids.pop()
+    os.kill(killed, signal.SIGKILL)
+
+    deadline = time.monotonic() + 10
+    new_pids = set()
+    while time.monotonic() < deadline:
+        new_pids = get_pids(port, timeout=1)
+        if len(new_pids) == WORKERS and killed not in new_pids:
+            break
+
+    assert len(new_pids) == WORKERS
+    assert killed not in new_pids
+
+    os.kill(process.pid, signal.SIGTERM)
+    process.join(10)
+
+    assert process.exitcode == 0
+    for pid in new_pids:
+        with pytest.raises(ProcessLookupError):
+            os.kill(pid, 0)
+
+
+def test_forwarded_signals(supervisor_process):
+    """ Пересылаемый сигнал не завершает воркеры, в которых для него нет
+        обработчика
+    """
+    process, port = supervisor_process
+
+    pids = get_pids(port)
+    assert len(pids) == WORKERS
+
+    for signum in (signal.SIGUSR1, signal.SIGUSR2):
+        os.kill(process.pid, signum)
+    time.sleep(0.5)
+
+    assert get_pids(port, timeout=1) == pids
+
+
+def test_get_serving_options():
+    """ Параметры режима и замена их значений
+    """
+    assert get_serving_options("default") == ServingOptions()
+
+    options = get_serving_options(
+        "tuned", backlog=None, access_log=True, event_loop="asyncio"
+    )
+    assert options.backlog == 2048
+    assert options.access_log
+    assert options.event_loop == "asyncio"
+
+    with pytest.raises(ValueError):
+        get_serving_options("unknown")
+
+
+def test_get_run_app_kwargs():
+    """ Журнал запросов выключается передачей None
+    """
+    kwargs = get_run_app_kwargs(get_serving_options("tuned"))
+
+    assert kwargs["access_log"] is None
+    assert kwargs["backlog"] == 2048
+    assert get_run_app_kwargs(ServingOptions())["access_log"] is not None
+
+
+def test_set_event_loop_policy():
+    """ Цикл событий по настройке
+    """
+    policy = asyncio.get_event_loop_policy()
+
+    try:
+        assert set_event_loop_policy("asyncio") == "asyncio"
+        assert asyncio.get_event_loop_policy() is policy
+
+        try:
+            import uvloop
+        except ImportError:
+            assert set_event_loop_policy("auto") == "asyncio"
+            with pytest.raises(ImportError):
+                set_event_loop_policy("uvloop")
+        else:
+            assert set_event_loop_policy("auto") == "uvloop"
+            assert isinstance(
+                asyncio.get_event_loop_policy(), uvloop.EventLoopPolicy
+            )
+
+        with pytest.raises(ValueError):
+            set_event_loop_policy("unknown")
+
+    finally:
+        asyncio.set_event_loop_policy(policy)
@@ -0,0 +1,254 @@
+""" Тесты двоичных кодеков и выбора формата тела запроса и ответа.
+    Двоичный кодек должен давать (после разбора) тот же результат, что и
+    json_dumps (на ServiceJSONEncoder).
+"""
+import json
+from datetime import datetime, timezone
+from uuid import uuid4
+
+import pytest
+from aiohttp import web
+from data_classes.person import PersonInfo
+from data_classes.wraps import WrapResponse
+from middlewares.body_limits import check_object_limits
+from middlewares.codecs import MsgpackCodec, get_binary_codecs, msgpack
+from middlewares.exceptions import RequestBodyTooDeep, RequestBodyTooLarge
+from middlewares.simple_handler import SimpleHandler
+from middlewares.utils import json_dumps
+from run_wraps import get_app
+
+pytestmark = pytest.mark.skipif(
+    msgpack is None, reason="msgpack is not installed"
+)
+
+MSGPACK = "application/msgpack"
+
+person_info = PersonInfo(id=uuid4(), name="Ivan")
+
+objects = [
+    {"foo": "bar"},
+    "any json",
+    [{"name": "Ivan"}, {"name": "Oleg"}],
+    {"some_key": "some_value", "number": 1, "float": 1.5, "none": None},
+    person_info.dict(),
+    WrapResponse(result=[person_info, person_info], id=1).dict(),
+    {"success": True, "result": [person_info, person_info], "id": 1},
+    person_info,
+    {"created": datetime(2021, 4, 20, 12, 0, tzinfo=timezone.utc)},
+    {"text": "Пример ошибки 500"},
+]
+
+
+@pytest.mark.parametrize("obj", objects)
+def test_msgpack_parity(obj):
+    """ Дамп в MessagePack совпадает (после разбора) с дампом json_dumps
+    """
+    codec = MsgpackCodec()
+
+    assert codec.loads(codec.dumps_bytes(obj)) == json.loads(json_dumps(obj))
+
+
+def test_msgpack_limits():
+    """ Длина массивов и словарей проверяется при разборе MessagePack,
+        глубина вложенности - по разобранному объекту
+    """
+    codec = MsgpackCodec()
+
+    assert codec.loads(codec.dumps_bytes([1, 2]), max_array_length=2) == [1, 2]
+    for obj in ([1, 2, 3], {"a": 1, "b": 2, "c": 3}, {"a": [[1, 2, 3]]}):
+        with pytest.raises(RequestBodyTooLarge):
+            codec.loads(codec.dumps_bytes(obj), max_array_length=2)
+
+    # Ошибка формата - не превышение ограничения
+    with pytest.raises(ValueError):
+        codec.loads(b"\xc1", max_array_length=2)
+
+    check_object_limits([[1], {"a": [2]}], max_depth=3)
+    with pytest.raises(RequestBodyTooDeep):
+        check_object_limits([[1], {"a": [[2]]}], max_depth=3)
+    with pytest.raises(RequestBodyTooLarge):
+        check_object_limits([{"a": [1, 2, 3]}], max_array_length=2)
+
+
+def test_get_binary_codecs():
+    """ Получение двоичных кодеков по именам
+    """
+    assert [type(codec) for codec in get_binary_codecs()] == [MsgpackCodec]
+    assert [type(codec) for codec in get_binary_codecs(["msgpack"])] == [
+        MsgpackCodec
+    ]
+    assert get_binary_codecs([]) == []
+
+    with pytest.raises(ValueError):
+        get_binary_codecs(["unknown"])
+
+
+@pytest.mark.parametrize("accept, expected", [
+    ("application/msgpack", MSGPACK),
+    ("application/x-msgpack", MSGPACK),
+    ("application/json", "application/json"),
+    ("application/json;q=0.5, application/msgpack", MSGPACK),
+    ("application/json, application/msgpack;q=0.5", "application/json"),
+    ("application/json, application/msgpack", "application/json"),
+    ("*/*", None),
+    ("text/html", None),
+])
+def test_choose_accept_codec(accept, expected):
+    """ Выбор кодека ответа по заголовку Accept
+    """
+    handler = SimpleHandler(binary_codecs=get_binary_codecs(["msgpack"]))
+
+    codec = handler.choose_accept_codec(accept)
+
+    if expected is None:
+        assert codec is None
+    else:
+        assert codec.content_type == expected
+
+
+async def iter_items(data: list):
+    for item in data:
+        yield item
+
+
+async def items_handler(request: web.Request, data: list):
+    return iter_items(data)
+
+
+async def post(client, path, data, content_type=MSGPACK, accept=None):
+
+    headers = {"Content-Type": content_type}
+    if accept is not None:
+        headers["Accept"] = accept
+
+    return await client.post(path, data=data, headers=headers)
+
+
+async def test_msgpack_request_and_response(aiohttp_client):
+    """ Ответ на тело запроса в MessagePack - в MessagePack (с той же
+        оболочкой, что и в json)
+    """
+    client = await aiohttp_client(get_app())
+
+    response = await post(
+        client, "/create", msgpack.packb({"data": {"name": "Ivan"}, "id": 1})
+    )
+    assert response.status == 200
+    assert response.content_type == MSGPACK
+    assert "Accept" in response.headers.getall("Vary")
+
+    body = msgpack.unpackb(await response.read())
+    assert body["success"] is True
+    assert body["id"] == 1
+    assert body["result"]["name"] == "Ivan"
+
+    # Чтение (обработчик с кэшем ответов) - тоже в MessagePack
+    for _ in range(2):
+        response = await post(
+            client, "/read",
+            msgpack.packb({"data": body["result"]["id"], "id": 2}),
+        )
+        assert response.status == 200
+        assert msgpack.unpackb(await response.read()) == {
+            "success": True, "result": body["result"], "id": 2,
+        }
+
+
+async def test_accept(aiohttp_client):
+    """ Формат ответа выбирается по заголовку Accept
+    """
+    client = await aiohttp_client(get_app())
+    data = {"data": {"name": "Ivan"}, "id": 1}
+
+    # json -> MessagePack
+    response = await post(
+        client, "/create", json.dumps(data), "application/json", MSGPACK
+    )
+    assert response.content_type == MSGPACK
+    assert msgpack.unpackb(await response.read())["success"] is True
+
+    # MessagePack -> json
+    response = await post(
+        client, "/create", msgpack.packb(data), accept="application/json"
+    )
+    assert response.content_type == "application/json"
+    assert (await response.json())["success"] is True
+
+
+async def test_msgpack_errors(aiohttp_client):
+    """ Ответы с ошибками - в MessagePack
+    """
+    client = await aiohttp_client(get_app())
+
+    # Тело запроса не разбирается
+    response = await post(client, "/create", b"\xc1")
+    assert response.status == 400
+    assert response.content_type == MSGPACK
+    assert msgpack.unpackb(await response.read())["success"] is False
+
+    # Ошибка валидации данных
+    response = await post(
+        client, "/create", msgpack.packb({"data": {"age": 1}, "id": 1})
+    )
+    assert response.status == 400
+    body = msgpack.unpackb(await response.read())
+    assert body["success"] is False
+    assert body["id"] == 1
+
+    # Потоковый разбор тела запроса - только для json
+    response = await post(
+        client, "/create_stream", msgpack.packb([{"name": "Ivan"}])
+    )
+    assert response.status == 400
+    assert msgpack.unpackb(await response.read())["success"] is False
+
+
+async def test_msgpack_list_response(aiohttp_client):
+    """ Большой список в ответе в MessagePack не отдается потоком
+    """
+    client = await aiohttp_client(get_app())
+    persons = [{"name": f"Person {i}"} for i in range(2000)]
+
+    response = await post(
+        client, "/create", msgpack.packb({"data": persons, "id": 1})
+    )
+    assert response.status == 200
+    assert response.headers.get("Transfer-Encoding") != "chunked"
+
+    body = msgpack.unpackb(await response.read())
+    assert len(body["result"]) == len(persons)
+
+
+async def test_msgpack_async_iterator_response(aiohttp_client):
+    """ Асинхронный итератор в ответе в MessagePack собирается в список
+    """
+    handler = SimpleHandler(binary_codecs=get_binary_codecs(["msgpack"]))
+    app = web.Application(middlewares=[handler.middleware])
+    app.router.add_post("/items", items_handler)
+    client = await aiohttp_client(app)
+
+    response = await post(client, "/items", msgpack.packb([1, 2, 3]))
+    assert response.status == 200
+    assert msgpack.unpackb(await response.read()) == [1, 2, 3]
+
+
+async def test_msgpack_body_limits(aiohttp_client):
+    """ Ограничения тела запроса для MessagePack - те же, что и для json
+    """
+    client = await aiohttp_client(get_app())
+    items = list(range(20000))
+    nested = {"name": "Ivan"}
+    for _ in range(40):
+        nested = [nested]
+
+    for data, status in [(items, 413), (nested, 400)]:
+        body = {"data": data, "id": 1}
+
+        response = await post(
+            client, "/create", json.dumps(body), "application/json"
+        )
+        assert response.status == status
+
+        response = await post(client, "/create", msgpack.packb(body))
+        assert response.status == status
+        assert msgpack.unpackb(await response.read())["success"] is False
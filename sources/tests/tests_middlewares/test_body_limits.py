@@ -0,0 +1,166 @@
+""" Тесты ограничений тела запроса.
+"""
+import gzip
+import json
+import time
+
+import pytest
+import run_wraps
+from middlewares.body_limits import (BodyLimitsOptions, check_json_limits,
+                                     get_body_limits_options,
+                                     get_json_skeleton, limit_request_body)
+from middlewares.exceptions import RequestBodyTooDeep, RequestBodyTooLarge
+
+
+@pytest.mark.parametrize(
+    "data, skeleton",
+    [
+        ("string", b""),
+        ([1, "a,b", {"k": None}], b"[,,{}]"),
+        ({"a": 'x[\\"]{', "b": [1, "\\", {}]}, b"{,[,,{}]}"),
+        (['"', '\\"', "a\nb]", {'k,"{': ["["]}], b"[,,,{[]}]"),
+    ],
+)
+def test_get_json_skeleton(data, skeleton):
+    """ От json остаются только скобки и запятые вне строк
+    """
+    for ensure_ascii in (True, False):
+        body = json.dumps(data, ensure_ascii=ensure_ascii).encode()
+        assert get_json_skeleton(body) == skeleton
+
+
+def test_check_json_limits():
+    """ Глубина вложенности и длина массивов
+    """
+    body = json.dumps({"a": [1, 2, {"b": [3, 4, 5]}]}).encode()
+
+    check_json_limits(body)
+    check_json_limits(body, max_depth=4, max_array_length=3)
+    check_json_limits(b"[]", max_depth=1, max_array_length=1)
+    check_json_limits(b"1", max_depth=1)
+
+    with pytest.raises(RequestBodyTooDeep):
+        check_json_limits(body, max_depth=3)
+
+    with pytest.raises(RequestBodyTooLarge):
+        check_json_limits(body, max_array_length=2)
+
+    # Некорректный json (ошибку найдет разбор)
+    check_json_limits(b"[[[", max_depth=1)
+
+
+def test_check_json_limits_deep_body():
+    """ Время проверки глубоко вложенного тела линейно от его размера (и без
+        ограничения глубины)
+    """
+    depth = 40000
+    body = b"[" * depth + b"[1, 2, 3]" + b"]" * depth
+
+    started = time.perf_counter()
+    check_json_limits(body, max_array_length=10000)
+    assert time.perf_counter() - started < 1
+
+    with pytest.raises(RequestBodyTooLarge):
+        check_json_limits(body, max_array_length=2)
+
+    with pytest.raises(RequestBodyTooDeep):
+        check_json_limits(body, max_depth=depth)
+
+
+def test_limit_request_body():
+    """ Декоратор сохраняет ограничения в обработчике
+    """
+    async def handler(data):
+        pass
+
+    assert get_body_limits_options(handler) is None
+
+    decorated = limit_request_body(max_depth=2)(handler)
+
+    assert get_body_limits_options(decorated) == BodyLimitsOptions(
+        max_depth=2
+    )
+
+
+async def test_wraps_body_limits(aiohttp_client, monkeypatch):
+    """ Тело, которое не соответствует ограничениям, отклоняется (413 или
+        400) в формате ответа с ошибкой
+    """
+    monkeypatch.setattr(run_wraps, "REQUEST_MAX_BODY_SIZE", 1000)
+    monkeypatch.setattr(run_wraps, "REQUEST_MAX_DEPTH", 4)
+    monkeypatch.setattr(run_wraps, "REQUEST_MAX_ARRAY_LENGTH", 10)
+
+    client = await aiohttp_client(run_wraps.get_app())
+
+    data = [{"name": "Ivan"}] * 10
+    response = await client.post("/create", json={"data": data, "id": 1})
+    assert response.status == 200
+
+    # Размер из Content-Length
+    data = [{"name": "Ivan" * 100}] * 10
+    response = await client.post("/create", json={"data": data, "id": 1})
+    response_json = await response.json()
+    assert response.status == 413
+    assert response_json["success"] is False
+    assert "RequestBodyTooLarge" in response_json["result"]["error_type"]
+
+    # Размер тела без Content-Length
+    async def chunks():
+        for _ in range(20):
+            yield b" " * 100
+
+    response = await client.post("/create", data=chunks())
+    assert response.status == 413
+
+    data = [{"name": "Ivan"}] * 11
+    response = await client.post("/create", json={"data": data, "id": 1})
+    assert response.status == 413
+
+    response = await client.post(
+        "/create", json={"data": [[[[{"name": "Ivan"}]]]], "id": 1}
+    )
+    response_json = await response.json()
+    assert response.status == 400
+    assert "RequestBodyTooDeep" in response_json["result"]["error_type"]
+
+
+async def test_compressed_request_body(aiohttp_client, monkeypatch):
+    """ Сжатое тело запроса распаковывается, ограничения размера
+        применяются к распакованному телу
+    """
+    monkeypatch.setattr(run_wraps, "REQUEST_MAX_BODY_SIZE", 100_000)
+    monkeypatch.setattr(run_wraps, "REQUEST_MAX_COMPRESSION_RATIO", 50)
+
+    client = await aiohttp_client(run_wraps.get_app())
+    headers = {"Content-Encoding": "gzip"}
+
+    data = [{"name": f"Person {i}"} for i in range(100)]
+    body = gzip.compress(json.dumps({"data": data, "id": 1}).encode())
+
+    response = await client.post("/create", data=body, headers=headers)
+    response_json = await response.json()
+    assert response.status == 200
+    assert len(response_json["result"]) == 100
+
+    # Потоковый разбор сжатого тела
+    body = gzip.compress(json.dumps(data).encode())
+    response = await client.post("/create_stream", data=body, headers=headers)
+    assert response.status == 200
+    assert len((await response.json())["result"]) == 100
+
+    # Распакованное тело больше допустимого размера
+    data = [{"name": f"Person {i}"} for i in range(10_000)]
+    body = gzip.compress(json.dumps({"data": data, "id": 1}).encode())
+    assert len(body) < 100_000
+
+    response = await client.post("/create", data=body, headers=headers)
+    assert response.status == 413
+
+    # "Бомба" - сжатие больше допустимого
+    body = gzip.compress(
+        b'{"data": [], "id": 1' + b" " * 50_000 + b"}"
+    )
+    response = await client.post("/create", data=body, headers=headers)
+    response_json = await response.json()
+    assert response.status == 413
+    assert "ratio" in response_json["result"]["error_message"]
@@ -0,0 +1,253 @@
+""" Тесты кодеков json.
+    Все кодеки должны давать тот же результат, что и json_dumps (на
+    ServiceJSONEncoder), и разбирать json так же, как json.loads.
+"""
+import json
+import math
+import re
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from enum import Enum, IntEnum
+from uuid import uuid4
+
+import pytest
+from data_classes.person import PersonInfo
+from data_classes.wraps import WrapResponse
+from middlewares.codecs import (CODECS, JSONCodec, OrjsonCodec,
+                                get_json_codec, has_long_numbers, orjson)
+from middlewares.simple_handler import SimpleHandler
+from middlewares.utils import json_dumps
+from run_simple import get_app
+from run_wraps import get_app as get_wraps_app
+
+person_info = PersonInfo(id=uuid4(), name="Ivan")
+
+
+class Color(Enum):
+    RED = 1
+
+
+class Name(str, Enum):
+    IVAN = "Ivan"
+
+
+class Number(IntEnum):
+    ONE = 1
+
+
+@dataclass
+class Point:
+    x: int
+
+
+objects = [
+    {"foo": "bar"},
+    {"any": "json"},
+    "any json",
+    {"name": "Ivan"},
+    [{"name": "Ivan"}, {"name": "Oleg"}],
+    {"some_key": "some_value", "number": 1, "float": 1.5, "none": None},
+    person_info.dict(),
+    WrapResponse(result=[person_info, person_info], id=1).dict(),
+    {"success": True, "result": [person_info, person_info], "id": 1},
+    person_info,
+    {"created": datetime(2021, 4, 20, 12, 0, tzinfo=timezone.utc)},
+    {1: "int key"},
+    {None: 1, True: 2, 1.5: 3},
+    {"name": Name.IVAN, "number": Number.ONE},
+    Name.IVAN,
+    {"text": "Пример ошибки 500"},
+    # Значения, в которых orjson расходится со стандартной библиотекой
+    {"big": 2 ** 64, "negative": -2 ** 63 - 1, "max": 2 ** 64 - 1},
+    [2 ** 70, 1.5, 12345678901234567890.5],
+    {"text": "одиночный суррогат \ud800"},
+    # Тела запросов и ответов из тестов обработчиков (в оболочках)
+    {"data": {"name": "Ivan"}, "id": 1},
+    {"data": [{"name": "Ivan"}, {"name": "Oleg"}]},
+    [{"data": {"name": "Ivan"}, "id": 1}, {"data": "wrong", "id": "3"}],
+    {"data": [str(person_info.id)], "id": 5, "method": "read"},
+    {"success": True, "result": {"found": [], "missing": []}, "id": 5},
+    {
+        "success": False, "id": 6,
+        "result": {"error_type": "<class 'Exception'>", "error_message": ""},
+    },
+]
+
+# json, который orjson не разбирает
+texts = [b"NaN", b"[Infinity, -Infinity]", b'"\\ud800"', b"1e400"]
+
+codecs = [
+    codec_class() for codec_class in CODECS.values()
+    if codec_class is not OrjsonCodec or orjson is not None
+]
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda codec: codec.name)
+@pytest.mark.parametrize("obj", objects)
+def test_dumps_parity(codec, obj):
+    """ Дамп кодеком совпадает (после разбора) с дампом json_dumps
+    """
+    assert json.loads(codec.dumps(obj)) == json.loads(json_dumps(obj))
+    assert json.loads(codec.dumps_bytes(obj)) == json.loads(json_dumps(obj))
+
+
+def test_dumps_models():
+    """ Экземпляры классов данных кодируются так же, как результат их .dict()
+    """
+    assert json_dumps(person_info) == json_dumps(person_info.dict())
+
+    wrap_response = WrapResponse(result=[person_info], id=1)
+    assert json_dumps(wrap_response) == json_dumps(wrap_response.dict())
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda codec: codec.name)
+@pytest.mark.parametrize("obj", objects)
+def test_loads_parity(codec, obj):
+    """ Разбор bytes кодеком совпадает с json.loads
+    """
+    data = json_dumps(obj).encode()
+
+    assert codec.loads(data) == json.loads(data)
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda codec: codec.name)
+@pytest.mark.parametrize("text", texts)
+def test_loads_parity_not_strict(codec, text):
+    """ Разбор json с NaN, Infinity и одиночными суррогатами совпадает с
+        json.loads
+    """
+    result = codec.loads(text)
+
+    assert repr(result) == repr(json.loads(text))
+
+
+@pytest.mark.skipif(orjson is None, reason="orjson is not installed")
+def test_orjson_nan():
+    """ NaN и Infinity orjson кодирует в null (в отличие от json.dumps)
+    """
+    codec = OrjsonCodec()
+
+    assert codec.dumps([math.nan, math.inf]) == "[null,null]"
+    assert math.isnan(codec.loads(json_dumps(math.nan)))
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda codec: codec.name)
+@pytest.mark.parametrize(
+    "obj",
+    [
+        complex(4, 3),
+        Color.RED,
+        Point(1),
+        {"point": Point(1)},
+        {datetime(2021, 4, 20): 1},
+        {uuid4(): 1},
+    ],
+)
+def test_dumps_not_serializable(codec, obj):
+    """ Ошибка для объекта, который не кодируется в json (как в json_dumps)
+    """
+    with pytest.raises(TypeError, match="is not JSON serializable|keys"):
+        json_dumps(obj)
+
+    with pytest.raises(TypeError, match="is not JSON serializable|keys"):
+        codec.dumps(obj)
+
+
+def test_has_long_numbers():
+    """ Последовательности от 19 цифр, в том числе на границе частей, на
+        которые делятся большие данные
+    """
+    assert has_long_numbers(b"[1234567890123456789]")
+    assert not has_long_numbers(b"[123456789012345678, 1.5]")
+
+    for position in range(64 * 1024 - 20, 64 * 1024 + 2):
+        data = b" " * position + b"1" * 19 + b" " * 100
+        assert has_long_numbers(data)
+        assert not has_long_numbers(data.replace(b"1" * 19, b"1" * 18))
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda codec: codec.name)
+def test_loads_error(codec):
+    """ Ошибка разбора пустого тела запроса
+    """
+    with pytest.raises(ValueError):
+        codec.loads(b"")
+
+
+def test_get_json_codec():
+    """ Получение кодека по имени
+    """
+    assert isinstance(get_json_codec("json"), JSONCodec)
+
+    expected = OrjsonCodec if orjson is not None else JSONCodec
+    assert type(get_json_codec("auto")) is expected
+
+    with pytest.raises(ValueError):
+        get_json_codec("unknown")
+
+
+def test_simple_handler_default_codec():
+    """ По умолчанию используется кодек стандартной библиотеки
+    """
+    assert type(SimpleHandler().json_codec) is JSONCodec
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda codec: codec.name)
+async def test_middleware_parity(aiohttp_client, monkeypatch, codec):
+    """ Ответы сервиса одинаковы для всех кодеков
+    """
+    monkeypatch.setattr("run_simple.get_json_codec", lambda name: codec)
+    client = await aiohttp_client(get_app())
+
+    response = await client.post("/some_handler", json=objects[:6])
+    assert response.status == 200
+    assert await response.json() == objects[:6]
+
+    response = await client.post("/some_handler")
+    assert response.status == 400
+
+
+def normalize(text: str) -> object:
+    """ Разбирает json ответа, заменяя в нем случайные идентификаторы.
+    """
+    uuid_pattern = r"[0-9a-f]{8}(-[0-9a-f]{4}){3}-[0-9a-f]{12}"
+
+    return json.loads(re.sub(uuid_pattern, "<uuid>", text))
+
+
+@pytest.mark.parametrize("codec", codecs, ids=lambda codec: codec.name)
+async def test_wraps_middleware_parity(aiohttp_client, monkeypatch, codec):
+    """ Ответы сервиса с оболочками одинаковы для всех кодеков
+    """
+    responses = {}
+
+    for current_codec in (JSONCodec(), codec):
+        monkeypatch.setattr(
+            "run_wraps.get_json_codec", lambda name: current_codec
+        )
+        client = await aiohttp_client(get_wraps_app())
+
+        response = await client.post(
+            "/create", json={"data": [{"name": "Ivan"}], "id": 1}
+        )
+        ivan = (await response.json())["result"][0]
+
+        response_texts = [await response.text()]
+        for body in [
+            {"data": ivan["id"], "id": 2},
+            {"data": "wrong_uuid", "id": 3},
+            [
+                {"data": ivan["id"], "id": 4, "method": "read"},
+                {"data": {"name": "Oleg"}, "id": 5},
+                {"data": ivan["id"], "id": 6, "method": "unknown"},
+            ],
+        ]:
+            path = "/read" if isinstance(body, dict) else "/create"
+            response = await client.post(path, json=body)
+            response_texts.append(await response.text())
+
+        responses[current_codec.name] = [
+            normalize(text) for text in response_texts
+        ]
+
+    assert responses[codec.name] == responses["json"]
@@ -0,0 +1,147 @@
+""" Тесты сжатия тел ответов.
+"""
+import gzip
+import zlib
+
+import pytest
+import run_wraps
+from aiohttp import web
+from middlewares import compression
+from middlewares.compression import (ResponseCompressor, compress_head,
+                                     compress_tail, get_compressors,
+                                     parse_accept_encoding)
+from middlewares.response_cache import ResponseCache
+
+DECOMPRESS = {"gzip": gzip.decompress, "deflate": zlib.decompress}
+
+
+def test_parse_accept_encoding():
+    """ Кодировки и их веса
+    """
+    assert parse_accept_encoding("gzip, deflate;q=0.5, BR;q=x, ,") == {
+        "gzip": 1.0, "deflate": 0.5, "br": 0.0
+    }
+
+
+@pytest.mark.parametrize(
+    "accept_encoding, encoding",
+    [
+        ("gzip, deflate", "gzip"),
+        ("deflate, gzip", "gzip"),
+        ("deflate;q=0.5, gzip;q=0.4", "deflate"),
+        ("*", "gzip"),
+        ("*, gzip;q=0", "deflate"),
+        ("identity", None),
+        ("gzip;q=0", None),
+    ],
+)
+def test_choose_encoding(accept_encoding, encoding):
+    """ Кодировка с наибольшим весом, при равных весах - в порядке
+        предпочтения
+    """
+    compressor = ResponseCompressor(encodings=["gzip", "deflate"])
+
+    for _ in range(2):
+        assert compressor.choose_encoding(accept_encoding) == encoding
+
+
+@pytest.mark.parametrize("encoding", ["gzip", "deflate"])
+@pytest.mark.parametrize("tail", [b"", b', "id": 1}'])
+def test_compress_head_and_tail(encoding, tail):
+    """ Голова сжимается отдельно, хвост дописывается к ней
+    """
+    head = b'{"result": ' + b'{"name": "Ivan"}, ' * 1000
+
+    body = compress_tail(encoding, compress_head(encoding, head), tail)
+
+    assert DECOMPRESS[encoding](body) == head + tail
+    assert len(body) < len(get_compressors()[encoding](head + tail)) + 20
+
+
+@pytest.mark.parametrize("encoding", ["gzip", None])
+def test_set_headers(encoding):
+    """ Vary добавляется к уже заданному (и к ответу без сжатия)
+    """
+    response = web.Response(headers={"Vary": "Origin"})
+
+    ResponseCompressor().set_headers(response, encoding)
+
+    assert response.headers.getall("Vary") == ["Origin", "Accept-Encoding"]
+    assert response.headers.get("Content-Encoding") == encoding
+
+
+def test_cache_variants():
+    """ Варианты значения записи кэша сохраняются только для того же
+        значения и удаляются вместе с записью
+    """
+    cache = ResponseCache()
+    value = b"1"
+
+    cache.set("a", value)
+    cache.set_variant("a", value, "gzip", b"gz")
+    assert cache.get_variant("a", "gzip") == b"gz"
+
+    cache.set("a", b"2")
+    assert cache.get_variant("a", "gzip") is None
+    cache.set_variant("a", value, "gzip", b"gz")
+    assert cache.get_variant("a", "gzip") is None
+
+    cache.delete("a")
+    cache.set_variant("a", value, "gzip", b"gz")
+    assert cache.get_variant("a", "gzip") is None
+
+
+async def test_wraps_compressed_responses(aiohttp_client, monkeypatch):
+    """ Большие ответы сжимаются, голова ответа из кэша сжимается один раз
+    """
+    monkeypatch.setattr(run_wraps, "RESPONSE_COMPRESSION_THRESHOLD", 200)
+    monkeypatch.setattr(run_wraps, "RESPONSE_CACHE_SIZE", 100)
+
+    heads = []
+
+    def spy_compress_head(encoding, head):
+        heads.append(encoding)
+        return compress_head(encoding, head)
+
+    monkeypatch.setattr(compression, "compress_head", spy_compress_head)
+
+    client = await aiohttp_client(run_wraps.get_app())
+
+    response = await client.post(
+        "/create", json={"data": {"name": "Ivan"}},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    assert "Content-Encoding" not in response.headers
+    assert "Accept-Encoding" in response.headers.getall("Vary")
+
+    data = [{"name": f"Person {i}"} for i in range(20)]
+    response = await client.post(
+        "/create", json={"data": data, "id": 1},
+        headers={"Accept-Encoding": "gzip"},
+    )
+    persons = (await response.json())["result"]
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert response.headers.getall("Vary") == ["Accept-Encoding", "Accept"]
+    assert len(persons) == 20
+
+    ids = [person["id"] for person in persons]
+    for id_, accept_encoding in [(1, "gzip"), (2, "gzip"), (3, "deflate")]:
+        response = await client.post(
+            "/read_many", json={"data": ids, "id": id_},
+            headers={"Accept-Encoding": accept_encoding},
+        )
+        response_json = await response.json()
+
+        assert response.headers["Content-Encoding"] == accept_encoding
+        assert response_json["id"] == id_
+        assert response_json["result"]["found"] == persons
+
+    assert heads == ["gzip", "deflate"]
+
+    response = await client.post(
+        "/read_many", json={"data": ids, "id": 4},
+        headers={"Accept-Encoding": "identity"},
+    )
+    assert "Content-Encoding" not in response.headers
+    assert response.headers["Vary"] == "Accept-Encoding"
+    assert (await response.json())["id"] == 4
@@ -1,4 +1,5 @@
 import pytest
+from aiohttp import web
 from aiohttp.web import Request
 from middlewares.kwargs_handler import InvalidHandlerArgument, KwargsHandler
 from middlewares.utils import ArgumentsManager
@@ -84,3 +85,45 @@ def test_build_error_message_for_invalid_handler_argument():
     )
     assert str(wrong_handler) in result
     assert "unregistered_argument_name" in result
+
+
+def test_handler_arguments_plan():
+    """ План аргументов обработчика собирается один раз и является
+        неизменяемым кортежем пар (имя аргумента, функция)
+    """
+    handler = KwargsHandler(arguments_manager=arguments_manager)
+
+    plan = handler.get_handler_arguments_plan(some_handler_with_request)
+
+    assert isinstance(plan, tuple)
+    assert [arg_name for arg_name, _ in plan] == ["some_arg_name", "req"]
+    same_plan = handler.get_handler_arguments_plan(some_handler_with_request)
+    assert same_plan is plan
+
+
+def test_make_handler_kwargs_with_direct_getter():
+    """ Функции, добавленные напрямую в ArgumentsManager.getters, получают
+        RawDataForArgument, как и раньше
+    """
+    manager = ArgumentsManager()
+    manager.getters["some_arg_name"] = lambda raw_data: raw_data.arg_name
+    handler = KwargsHandler(arguments_manager=manager)
+
+    result = handler.make_handler_kwargs(
+        request={}, handler=some_handler, request_body={}
+    )
+    assert result == {"some_arg_name": "some_arg_name"}
+
+
+async def test_compile_app_handlers_fail():
+    """ Исключение при старте приложения, если в сигнатуре обработчика есть
+        незарегистрированный аргумент
+    """
+    app = web.Application()
+    app.router.add_post("/wrong", wrong_handler)
+    handler = KwargsHandler(arguments_manager=arguments_manager)
+    app.on_startup.append(handler.on_startup)
+    app.freeze()
+
+    with pytest.raises(InvalidHandlerArgument):
+        await app.startup()
@@ -0,0 +1,134 @@
+""" Тесты метрик middleware.
+"""
+from middlewares.metrics import CONTENT_TYPE, Histogram, Metrics
+from run_simple import get_app as get_simple_app
+from run_wraps import get_app as get_wraps_app
+
+
+def test_histogram():
+    """ Значения попадают в корзины по верхней границе (включительно)
+    """
+    histogram = Histogram((0.1, 1.0))
+
+    for value in (0.05, 0.1, 0.5, 2.0):
+        histogram.observe(value)
+
+    assert histogram.counts == [2, 1, 1]
+    assert histogram.sum == 2.65
+
+
+def test_render():
+    """ Текстовый формат Prometheus
+    """
+    metrics = Metrics(name="m", buckets=(0.1, 1.0))
+
+    metrics.observe("handler", '/a"b', 200, 0.5)
+    metrics.observe("handler", '/a"b', 200, 0.05)
+
+    assert metrics.render().splitlines() == [
+        "# HELP m Duration of request processing stages.",
+        "# TYPE m histogram",
+        'm_bucket{stage="handler",route="/a\\"b",status="200",le="0.1"} 1',
+        'm_bucket{stage="handler",route="/a\\"b",status="200",le="1.0"} 2',
+        'm_bucket{stage="handler",route="/a\\"b",status="200",le="+Inf"} 2',
+        'm_sum{stage="handler",route="/a\\"b",status="200"} 0.55',
+        'm_count{stage="handler",route="/a\\"b",status="200"} 2',
+    ]
+
+
+def test_render_values():
+    """ Метрики с одним значением выводятся после гистограмм
+    """
+    metrics = Metrics(name="m", buckets=(0.1,))
+    counter = [0]
+
+    metrics.add_value("m_gauge", "gauge", "Gauge.", lambda: 2.5)
+    metrics.add_value("m_total", "counter", "Counter.", lambda: counter[0])
+    counter[0] = 3
+
+    assert metrics.render().splitlines()[2:] == [
+        "# HELP m_gauge Gauge.",
+        "# TYPE m_gauge gauge",
+        "m_gauge 2.5",
+        "# HELP m_total Counter.",
+        "# TYPE m_total counter",
+        "m_total 3",
+    ]
+
+
+def test_timer():
+    """ Длительности этапов попадают в гистограммы с кодом статуса ответа
+    """
+    metrics = Metrics()
+
+    timer = metrics.get_timer("/a")
+    timer.mark("request_body")
+    timer.mark("handler")
+    timer.finish(500)
+
+    assert list(metrics.histograms) == [("/a", 500)]
+    assert sorted(metrics.histograms["/a", 500]) == [
+        "handler", "request_body", "total"
+    ]
+
+
+async def test_metrics_endpoint(aiohttp_client):
+    """ Метрики по маршрутам и кодам статуса, маршрут метрик проходит мимо
+        json-обработки
+    """
+    client = await aiohttp_client(get_simple_app())
+
+    await client.post("/some_handler", json={"a": 1})
+    await client.post("/some_handler", data="not json")
+    await client.post("/handler500", json={})
+
+    response = await client.get("/metrics")
+    text = await response.text()
+
+    assert response.status == 200
+    assert response.headers["Content-Type"] == CONTENT_TYPE
+
+    name = "service_request_stage_duration_seconds"
+    for labels, stages in (
+        ('route="/some_handler",status="200"', ("handler", "response")),
+        ('route="/some_handler",status="400"', ("request_body", "response")),
+        ('route="/handler500",status="500"', ("handler", "response")),
+    ):
+        for stage in stages + ("request_body", "total"):
+            assert f'{name}_count{{stage="{stage}",{labels}}} 1' in text
+
+    assert 'route="/metrics"' not in text
+
+
+async def test_metrics_stream_and_cache(aiohttp_client, monkeypatch):
+    """ Этапы для потокового тела запроса и ответа из кэша, счетчики кэша
+    """
+    monkeypatch.setattr("run_wraps.RESPONSE_CACHE_SIZE", 100)
+
+    client = await aiohttp_client(get_wraps_app())
+
+    response = await client.post(
+        "/create_stream", json=[{"name": "Ivan"}, {"name": "Oleg"}]
+    )
+    person = (await response.json())["result"][0]
+
+    for _ in range(2):
+        await client.post("/read", json={"data": person["id"]})
+
+    text = await (await client.get("/metrics")).text()
+
+    name = "service_request_stage_duration_seconds"
+    for labels, stage, count in (
+        ('route="/create_stream",status="200"', "response", 1),
+        ('route="/read",status="200"', "cached_response", 2),
+        ('route="/read",status="200"', "total", 2),
+    ):
+        assert f'{name}_count{{stage="{stage}",{labels}}} {count}' in text
+
+    for line in (
+        "# TYPE service_response_cache_hits_total counter",
+        "service_response_cache_hits_total 1",
+        "service_response_cache_misses_total 1",
+        "service_response_cache_size 1",
+    ):
+        assert line in text.splitlines()
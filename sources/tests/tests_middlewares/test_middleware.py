@@ -42,3 +42,18 @@ async def test_middleware_500(aiohttp_client):
     response = await client.post("/handler500", json=request_json)
 
     assert response.status == 500
+
+
+async def test_middleware_stream_list(aiohttp_client, monkeypatch):
+    """ Большой список отдается потоком (json-массив)
+    """
+    monkeypatch.setattr("run_simple.STREAM_LIST_THRESHOLD", 2)
+    app = get_app()
+    client = await aiohttp_client(app)
+    request_json = [{"n": n} for n in range(250)]
+
+    response = await client.post("/some_handler", json=request_json)
+
+    assert response.status == 200
+    assert response.headers["Transfer-Encoding"] == "chunked"
+    assert await response.json() == request_json
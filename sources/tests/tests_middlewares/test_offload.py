@@ -0,0 +1,138 @@
+""" Тесты выноса работы с большими запросами из цикла событий.
+"""
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+from typing import List
+
+import pytest
+import run_wraps
+from data_classes.person import PersonCreate
+from middlewares.kwargs_handler import KwargsHandler
+from middlewares.offload import can_offload_dumps, get_offload_executor
+from middlewares.utils import ArgumentsManager
+from middlewares.validation import is_validated_argument, validate
+from valdec.errors import ValidationArgumentsError
+
+
+@validate("data", "return")
+async def create(data: List[PersonCreate], storage: dict) -> int:
+    return len(data)
+
+
+def test_get_offload_executor():
+    """ Пулы по настройке
+    """
+    assert get_offload_executor("") is None
+
+    executor = get_offload_executor("thread", 1)
+    assert isinstance(executor, ThreadPoolExecutor)
+    assert can_offload_dumps(executor)
+    executor.shutdown()
+
+    executor = get_offload_executor("process", 1)
+    assert isinstance(executor, ProcessPoolExecutor)
+    assert not can_offload_dumps(executor)
+    executor.shutdown()
+
+    with pytest.raises(ValueError):
+        get_offload_executor("unknown")
+
+
+def test_is_validated_argument():
+    """ Аргументы, которые проверяет декоратор validate
+    """
+    @validate
+    async def func_all(data: int, storage: int) -> None:
+        pass
+
+    @validate("storage", exclude=True)
+    async def func_exclude(data: int, storage: int) -> None:
+        pass
+
+    assert is_validated_argument(create, "data")
+    assert not is_validated_argument(create, "storage")
+    assert is_validated_argument(func_all, "storage")
+    assert is_validated_argument(func_exclude, "data")
+    assert not is_validated_argument(func_exclude, "storage")
+    assert not is_validated_argument(test_get_offload_executor, "data")
+
+
+async def test_offload_validation_in_process():
+    """ Валидация в пуле процессов возвращает экземпляры классов данных
+    """
+    arguments_manager = ArgumentsManager()
+    arguments_manager.reg_request_body("data")
+    arguments_manager.reg_app_key("storage")
+
+    executor = get_offload_executor("process", 1)
+    handler = KwargsHandler(
+        arguments_manager=arguments_manager, offload_executor=executor
+    )
+    storage = {}
+
+    try:
+        kwargs = await handler.offload_validation(
+            create, {"data": [{"name": "Ivan"}], "storage": storage}
+        )
+        assert kwargs == {"data": [PersonCreate(name="Ivan")], "storage": {}}
+        assert kwargs["storage"] is storage
+
+        # Ошибка валидации - такая же, как у декоратора обработчика
+        with pytest.raises(ValidationArgumentsError) as offload_error:
+            await handler.offload_validation(
+                create, {"data": [{}], "storage": storage}
+            )
+        with pytest.raises(ValidationArgumentsError) as error:
+            await create(data=[{}], storage=storage)
+        assert str(offload_error.value) == str(error.value)
+
+        # Данные, которые не передаются в процесс, проверит декоратор
+        kwargs = await handler.offload_validation(
+            create, {"data": [{"name": lambda: None}], "storage": storage}
+        )
+        assert kwargs["data"][0]["name"]() is None
+
+    finally:
+        executor.shutdown()
+
+
+async def test_wraps_large_request(aiohttp_client, monkeypatch):
+    """ Большие запросы обрабатываются в пуле, небольшие - в цикле событий
+    """
+    monkeypatch.setattr(run_wraps, "OFFLOAD_EXECUTOR", "thread")
+    monkeypatch.setattr(run_wraps, "OFFLOAD_THRESHOLD", 100)
+
+    app = run_wraps.get_app()
+    service_handler = app.middlewares[0].__self__
+
+    offloaded = []
+    run_offload = service_handler.run_offload
+
+    async def spy_run_offload(func, *args):
+        offloaded.append(func.__name__)
+        return await run_offload(func, *args)
+
+    monkeypatch.setattr(service_handler, "run_offload", spy_run_offload)
+
+    client = await aiohttp_client(app)
+
+    response = await client.post("/create", json={"data": {"name": "Ivan"}})
+    assert response.status == 200
+    assert offloaded == []
+
+    data = [{"name": f"Person {i}"} for i in range(10)]
+    response = await client.post("/create", json={"data": data, "id": 1})
+    response_json = await response.json()
+
+    assert response.status == 200
+    assert [p["name"] for p in response_json["result"]] == [
+        p["name"] for p in data
+    ]
+    assert offloaded == ["loads", "validate_arguments", "dumps_bytes"]
+
+    response = await client.post(
+        "/create", json={"data": data + [{}], "id": 2}
+    )
+    response_json = await response.json()
+
+    assert response.status == 400
+    assert response_json["id"] == 2
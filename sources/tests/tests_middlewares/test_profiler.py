@@ -0,0 +1,104 @@
+""" Тесты семплирующего профилировщика.
+"""
+import asyncio
+import os
+import signal
+import time
+
+import pytest
+from aiohttp import web
+from middlewares.kwargs_handler import KwargsHandler
+from middlewares.profiler import SamplingProfiler
+from middlewares.utils import ArgumentsManager
+
+
+async def busy_handler(data: float) -> float:
+    """ Обработчик, который занимает поток на data секунд.
+    """
+    finish = time.monotonic() + data
+    while time.monotonic() < finish:
+        pass
+    return data
+
+
+def read_stacks(path: str) -> dict:
+
+    stacks = {}
+    with open(path) as file:
+        for line in file:
+            stack, count = line.rsplit(" ", 1)
+            stacks[stack] = int(count)
+
+    return stacks
+
+
+async def test_samples_attributed_to_handler(tmp_path):
+    """ Стеки во время работы обработчика начинаются с его имени
+    """
+    arguments_manager = ArgumentsManager()
+    arguments_manager.reg_request_body("data")
+    kwargs_handler = KwargsHandler(arguments_manager=arguments_manager)
+
+    profiler = SamplingProfiler(str(tmp_path / "profiles"), interval=0.001)
+
+    path = profiler.start(0.3)
+    with pytest.raises(RuntimeError):
+        profiler.start(0.3)
+
+    await kwargs_handler.run_handler(None, busy_handler, 0.2)
+    profiler.thread.join()
+
+    stacks = read_stacks(path)
+    name = f"handler:{busy_handler.__module__}.busy_handler"
+
+    handler_samples = sum(
+        count for stack, count in stacks.items() if stack.startswith(name)
+    )
+    assert handler_samples > 0
+    assert all(
+        "test_profiler.py:busy_handler" in stack
+        for stack in stacks if stack.startswith(name)
+    )
+    assert not profiler.is_running
+
+
+async def test_signal(tmp_path):
+    """ Включение профилировщика по сигналу
+    """
+    profiler = SamplingProfiler(
+        str(tmp_path), interval=0.001, signal_name="SIGUSR1",
+        signal_seconds=0.01,
+    )
+    await profiler.on_startup(web.Application())
+
+    try:
+        profiler.on_signal()
+        profiler.thread.join()
+
+        assert os.path.dirname(profiler.path) == str(tmp_path)
+        assert os.path.exists(profiler.path)
+
+    finally:
+        asyncio.get_running_loop().remove_signal_handler(signal.SIGUSR1)
+
+
+async def test_profiler_endpoint(aiohttp_client, tmp_path):
+    """ Включение профилировщика запросом
+    """
+    profiler = SamplingProfiler(str(tmp_path), interval=0.001)
+
+    app = web.Application()
+    app.router.add_post("/admin/profile", profiler.handler)
+    client = await aiohttp_client(app)
+
+    response = await client.post("/admin/profile?seconds=0")
+    assert response.status == 400
+
+    response = await client.post("/admin/profile?seconds=0.05")
+    assert response.status == 200
+    assert (await response.json())["path"] == profiler.path
+
+    response = await client.post("/admin/profile?seconds=0.05")
+    assert response.status == 409
+
+    profiler.thread.join()
@@ -0,0 +1,161 @@
+""" Тесты кэша ответов обработчиков.
+"""
+from uuid import uuid4
+
+import pytest
+from handlers import kwargs, wraps
+from middlewares import response_cache
+from middlewares.response_cache import (ResponseCache, freeze,
+                                        get_invalidate_cache_options,
+                                        get_response_cache_options)
+from run_kwargs import get_app as get_kwargs_app
+from run_wraps import get_app as get_wraps_app
+
+
+def test_freeze():
+    """ Хешируемое представление данных из json
+    """
+    assert freeze({"a": [1, {"b": None}]}) == freeze({"a": [1, {"b": None}]})
+    assert freeze({"a": 1, "b": 2}) == freeze({"b": 2, "a": 1})
+
+    assert freeze({"a": 1}) != freeze([["a", 1]])
+    assert freeze(True) != freeze(1)
+    assert freeze(1.0) != freeze(1)
+
+    with pytest.raises(TypeError):
+        freeze(object())
+
+
+def test_lru():
+    """ Вытесняется запись, которая дольше всего не использовалась
+    """
+    cache = ResponseCache(max_size=2)
+
+    cache.set("a", b"1")
+    cache.set("b", b"2")
+    assert cache.get("a") == b"1"
+
+    cache.set("c", b"3")
+
+    assert cache.get("b") is None
+    assert cache.get("a") == b"1"
+    assert cache.get("c") == b"3"
+    assert len(cache) == 2
+    assert cache.stats() == dict(hits=3, misses=1, size=2)
+
+
+def test_ttl(monkeypatch):
+    """ Запись с истекшим временем жизни не отдается
+    """
+    now = 100.0
+    monkeypatch.setattr(response_cache, "monotonic", lambda: now)
+
+    cache = ResponseCache()
+    cache.set("a", b"1", ttl=10, tags=["t"])
+    cache.set("b", b"2")
+
+    now = 109.0
+    assert cache.get("a") == b"1"
+
+    now = 111.0
+    assert cache.get("a") is None
+    assert cache.get("b") == b"2"
+    assert cache.tags_keys == {}
+
+
+def test_invalidate():
+    """ Сброс записей по тегам
+    """
+    cache = ResponseCache()
+
+    cache.set("a", b"1", tags=["x", "y"])
+    cache.set("b", b"2", tags=["y"])
+    cache.set("c", b"3", tags=["z"])
+
+    cache.invalidate(["y"])
+
+    assert cache.get("a") is None
+    assert cache.get("b") is None
+    assert cache.get("c") == b"3"
+    assert cache.tags_keys == {"z": {"c"}}
+
+    cache.clear()
+    assert len(cache) == 0
+
+
+def test_set_after_invalidate():
+    """ Значение, полученное до сброса записей, не сохраняется
+    """
+    cache = ResponseCache()
+
+    generation = cache.generation
+    cache.invalidate(["x"])
+    cache.set("a", b"1", generation=generation)
+
+    assert cache.get("a") is None
+
+
+def test_handlers_options():
+    """ Кэширование включено для обработчиков чтения
+    """
+    assert get_response_cache_options(wraps.read) is not None
+    assert get_response_cache_options(wraps.create) is None
+    assert get_invalidate_cache_options(wraps.create) is not None
+
+
+async def test_wraps_cached_read(aiohttp_client, monkeypatch):
+    """ Повторное чтение берется из кэша, id оболочки - из запроса
+    """
+    monkeypatch.setattr("run_wraps.RESPONSE_CACHE_SIZE", 100)
+    app = get_wraps_app()
+    client = await aiohttp_client(app)
+    middleware = app.middlewares[0].__self__
+    cache = middleware.response_cache
+
+    response = await client.post("/create", json={"data": {"name": "Ivan"}})
+    person = (await response.json())["result"]
+
+    for id_ in (1, 2):
+        response = await client.post(
+            "/read", json={"data": person["id"], "id": id_}
+        )
+        assert response.status == 200
+        assert await response.json() == {
+            "success": True, "result": person, "id": id_
+        }
+
+    assert (cache.hits, cache.misses) == (1, 1)
+
+    # Ошибки не кэшируются
+    for _ in range(2):
+        response = await client.post("/read", json={"data": str(uuid4())})
+        assert response.status == 500
+
+    assert len(cache) == 1
+
+    # Ошибка оболочки запроса
+    response = await client.post("/read", json={"id": "1"})
+    assert response.status == 400
+
+
+async def test_kwargs_create_invalidates(aiohttp_client, monkeypatch):
+    """ Создание персоны сбрасывает записи кэша с её id
+    """
+    monkeypatch.setattr("run_kwargs.RESPONSE_CACHE_SIZE", 100)
+    app = get_kwargs_app()
+    client = await aiohttp_client(app)
+    middleware = app.middlewares[0].__self__
+    cache = middleware.response_cache
+
+    response = await client.post("/create", json={"name": "Ivan"})
+    person = await response.json()
+
+    response = await client.post("/read_many", json=[person["id"]])
+    assert (await response.json())["found"] == [person]
+    assert len(cache) == 1
+
+    middleware.invalidate_response_cache(
+        kwargs.create, {"name": "Ivan"}, person
+    )
+
+    assert len(cache) == 0
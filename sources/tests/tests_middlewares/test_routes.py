@@ -0,0 +1,389 @@
+import warnings
+from functools import partial
+
+import pytest
+from aiohttp import web
+from data_classes.person import PersonCreate
+from middlewares.body_limits import BodyLimitsOptions
+from middlewares.codecs import get_binary_codecs, msgpack
+from middlewares.kwargs_handler import KwargsHandler
+from middlewares.response_cache import ResponseCache, cache_response
+from middlewares.routes import (RouteOptions, get_handler_annotations,
+                                get_route_handler, get_service_handler_mark,
+                                mark_service_handler, service_post)
+from middlewares.simple_handler import SimpleHandler
+from middlewares.stream_body import JSONArrayStream
+from middlewares.utils import ArgumentsManager
+from middlewares.validation import validate
+
+
+async def echo(request: web.Request, data: dict, suffix: str) -> dict:
+    return {**data, "suffix": suffix}
+
+
+class EchoHandler:
+
+    async def __call__(self, data: dict) -> dict:
+        return data
+
+    async def method(self, data: dict) -> dict:
+        return data
+
+
+async def plain(request: web.Request) -> web.Response:
+    return web.Response(text="plain")
+
+
+@mark_service_handler
+async def marked(request: web.Request, data: dict) -> dict:
+    return data
+
+
+async def not_service(request: web.Request) -> web.Response:
+    return web.Response(text="not service")
+
+
+mark_service_handler(not_service, is_service=False)
+
+
+def test_mark_service_handler():
+    """ Отметка функций, partial, методов и экземпляров классов
+    """
+    echo_handler = EchoHandler()
+    handlers = [
+        mark_service_handler(partial(echo, suffix="!")),
+        mark_service_handler(echo_handler),
+        mark_service_handler(echo_handler.method),
+    ]
+    simple_handler = SimpleHandler()
+
+    for handler in handlers:
+        assert get_service_handler_mark(handler) is True
+        assert simple_handler.is_json_service_handler(None, handler)
+
+    # Отметка "не обработчик сервиса" важнее типа
+    function = mark_service_handler(partial(plain), is_service=False)
+    assert not simple_handler.is_json_service_handler(None, function)
+
+    assert get_service_handler_mark(plain) is None
+
+
+def test_get_handler_annotations():
+    """ Аннотации аргументов, которые передаются при вызове обработчика
+    """
+    assert list(get_handler_annotations(partial(echo, suffix="!"))) == [
+        "request", "data", "return"
+    ]
+    assert list(get_handler_annotations(partial(echo, None))) == [
+        "data", "suffix", "return"
+    ]
+    assert list(get_handler_annotations(EchoHandler())) == ["data", "return"]
+    assert list(get_handler_annotations(EchoHandler().method)) == [
+        "data", "return"
+    ]
+
+
+def get_app() -> web.Application:
+
+    arguments_manager = ArgumentsManager()
+    arguments_manager.reg_request_body("data")
+
+    service_handler = KwargsHandler(arguments_manager=arguments_manager)
+
+    app = web.Application()
+    app.add_routes([
+        service_post("/partial", partial(echo, suffix="!")),
+        service_post("/instance", EchoHandler()),
+        web.get("/not_service", not_service),
+    ])
+    app.middlewares.append(service_handler.middleware)
+    app.on_startup.append(service_handler.on_startup)
+
+    return app
+
+
+async def test_service_routes(aiohttp_client):
+    """ Запросы к отмеченным обработчикам сервиса, и к обработчику,
+        отмеченному как обычный обработчик aiohttp
+    """
+    client = await aiohttp_client(get_app())
+
+    response = await client.post("/partial", json={"name": "Ivan"})
+    assert await response.json() == {"name": "Ivan", "suffix": "!"}
+
+    response = await client.post("/instance", json={"name": "Ivan"})
+    assert await response.json() == {"name": "Ivan"}
+
+    response = await client.get("/not_service")
+    assert await response.text() == "not service"
+
+    response = await client.get("/not_found")
+    assert response.status == 404
+
+
+def test_service_route_coroutine_handler():
+    """ Обработчик, который не является корутин-функцией, регистрируется
+        через корутин-функцию (без устаревшей обертки aiohttp)
+    """
+    echo_handler = EchoHandler()
+    app = web.Application()
+
+    with warnings.catch_warnings():
+        warnings.simplefilter("error", DeprecationWarning)
+        app.add_routes([
+            service_post("/instance", echo_handler),
+            service_post("/method", echo_handler.method),
+        ])
+
+    instance_route, method_route = app.router.routes()
+    assert instance_route.handler.__wrapped__ is echo_handler
+    assert get_route_handler(instance_route) is echo_handler
+    assert method_route.handler == echo_handler.method
+    assert get_route_handler(method_route) == echo_handler.method
+
+
+async def test_service_handlers_map(aiohttp_client):
+    """ Словарь обработчиков сервиса по маршрутам собирается при старте
+        приложения, системные маршруты в него не попадают
+    """
+    service_handler = SimpleHandler()
+    app = web.Application()
+    app.router.add_post("/echo", echo)
+    app.router.add_post("/marked", marked)
+    app.router.add_get("/not_service", not_service)
+    app.middlewares.append(service_handler.middleware)
+    app.on_startup.append(service_handler.on_startup)
+
+    client = await aiohttp_client(app)
+    handlers = dict(service_handler.service_handlers)
+    assert sorted(
+        route.resource.canonical for route, handler in handlers.items()
+        if handler is not None
+    ) == ["/echo", "/marked"]
+
+    response = await client.get("/not_service")
+    assert await response.text() == "not service"
+
+    for _ in range(3):
+        await client.get("/not_found")
+    assert service_handler.service_handlers == handlers
+
+
+@web.middleware
+async def inner_middleware(request: web.Request, handler):
+
+    response = await handler(request)
+    response.headers.add("X-Inner", request.path)
+
+    return response
+
+
+async def test_inner_middlewares(aiohttp_client):
+    """ middlewares после middleware сервиса вызываются и для обработчиков
+        сервиса
+    """
+    service_handler = SimpleHandler()
+    app = web.Application()
+    app.router.add_post("/marked", marked)
+    app.router.add_get("/not_service", not_service)
+    app.middlewares.append(service_handler.middleware)
+    app.middlewares.append(inner_middleware)
+    app.middlewares.append(inner_middleware)
+    app.on_startup.append(service_handler.on_startup)
+
+    client = await aiohttp_client(app)
+
+    response = await client.post("/marked", json={"name": "Ivan"})
+    assert await response.json() == {"name": "Ivan"}
+    assert response.headers.getall("X-Inner") == ["/marked", "/marked"]
+
+    response = await client.get("/not_service")
+    assert await response.text() == "not service"
+    assert response.headers.getall("X-Inner") == [
+        "/not_service", "/not_service"
+    ]
+
+
+class UpperHandler(SimpleHandler):
+
+    async def get_request_body(self, request, handler):
+
+        body = await super().get_request_body(request, handler)
+
+        return {key: value.upper() for key, value in body.items()}
+
+
+async def test_get_request_body_override(aiohttp_client):
+    """ Переопределенный в наследнике get_request_body получает обработчик
+        (параметры маршрута берутся по запросу)
+    """
+    service_handler = UpperHandler()
+    app = web.Application()
+    app.add_routes([
+        service_post(
+            "/limited", marked, limits=BodyLimitsOptions(max_body_size=20)
+        ),
+    ])
+    app.middlewares.append(service_handler.middleware)
+    app.on_startup.append(service_handler.on_startup)
+
+    client = await aiohttp_client(app)
+
+    response = await client.post("/limited", json={"name": "Ivan"})
+    assert await response.json() == {"name": "IVAN"}
+
+    response = await client.post("/limited", json={"name": "Ivan" * 10})
+    assert response.status == 413
+
+
+async def either(request: web.Request, data: dict = None):
+    return web.Response(text="plain") if data is None else data
+
+
+class HeaderCheckHandler(SimpleHandler):
+
+    def is_json_service_handler(self, request, handler):
+
+        return request.headers.get("X-Service") == "1" and (
+            super().is_json_service_handler(request, handler)
+        )
+
+
+async def test_is_json_service_handler_override(aiohttp_client):
+    """ Переопределенный в наследнике is_json_service_handler вызывается на
+        каждый запрос, с запросом
+    """
+    service_handler = HeaderCheckHandler()
+    app = web.Application()
+    app.router.add_post("/either", either)
+    app.middlewares.append(service_handler.middleware)
+    app.on_startup.append(service_handler.on_startup)
+
+    client = await aiohttp_client(app)
+
+    for _ in range(2):
+        response = await client.post(
+            "/either", json={"name": "Ivan"}, headers={"X-Service": "1"}
+        )
+        assert await response.json() == {"name": "Ivan"}
+
+        response = await client.post("/either", json={"name": "Ivan"})
+        assert await response.text() == "plain"
+
+
+# Параметры обработки запросов маршрутов ------------------------------------
+
+calls = []
+
+
+@cache_response()
+async def counted(data: dict) -> dict:
+    calls.append(data)
+    return data
+
+
+@validate("data")
+async def validated(data: PersonCreate) -> str:
+    return type(data).__name__
+
+
+async def not_validated(data: PersonCreate) -> str:
+    return type(data).__name__
+
+
+async def stream_names(data: JSONArrayStream) -> list:
+    return [item["name"] async for item in data]
+
+
+def test_service_route_options():
+    """ Параметры маршрута передаются именованными аргументами или в
+        options
+    """
+    route_def = service_post("/read", counted, cache=False, name="read")
+    assert route_def.options == RouteOptions(cache=False)
+    assert route_def.kwargs == {"name": "read"}
+
+    assert service_post("/read", counted).options is None
+
+    with pytest.raises(TypeError):
+        service_post("/read", counted, RouteOptions(), cache=False)
+
+
+def get_options_app() -> web.Application:
+
+    arguments_manager = ArgumentsManager()
+    arguments_manager.reg_request_body("data")
+
+    service_handler = KwargsHandler(
+        arguments_manager=arguments_manager, response_cache=ResponseCache(),
+        binary_codecs=get_binary_codecs(),
+    )
+
+    app = web.Application()
+    app.add_routes([
+        service_post("/cached", counted),
+        service_post("/not_cached", counted, cache=False),
+        service_post("/validated", validated),
+        service_post("/validation_off", validated, validate=False),
+        service_post("/validation_on", not_validated, validate=True),
+        service_post("/stream", stream_names, stream=True),
+        service_post(
+            "/limited", counted, limits=BodyLimitsOptions(max_body_size=10)
+        ),
+        service_post("/json_only", counted, binary_formats=False),
+    ])
+    app.middlewares.append(service_handler.middleware)
+    app.on_startup.append(service_handler.on_startup)
+
+    return app
+
+
+async def test_route_options(aiohttp_client):
+    """ Параметры маршрутов заменяют параметры из декораторов обработчиков
+    """
+    client = await aiohttp_client(get_options_app())
+    calls.clear()
+
+    for path in ("/cached", "/cached", "/not_cached", "/not_cached"):
+        response = await client.post(path, json={"name": "Ivan"})
+        assert await response.json() == {"name": "Ivan"}
+    assert len(calls) == 3
+
+    for path, expected in [
+        ("/validated", "PersonCreate"),
+        ("/validation_off", "dict"),
+        ("/validation_on", "PersonCreate"),
+    ]:
+        response = await client.post(path, json={"name": "Ivan"})
+        assert await response.json() == expected
+
+    response = await client.post("/validation_on", json={"age": 1})
+    assert response.status == 500
+    assert "ValidationArgumentsError" in await response.text()
+
+    response = await client.post(
+        "/stream", json=[{"name": "Ivan"}, {"name": "Oleg"}]
+    )
+    assert await response.json() == ["Ivan", "Oleg"]
+
+    response = await client.post("/limited", json={"name": "Ivan"})
+    assert response.status == 413
+
+
+@pytest.mark.skipif(msgpack is None, reason="msgpack is not installed")
+async def test_route_binary_formats(aiohttp_client):
+    """ Маршрут только с json
+    """
+    client = await aiohttp_client(get_options_app())
+    headers = {"Accept": "application/msgpack"}
+
+    response = await client.post(
+        "/not_cached", json={"name": "Ivan"}, headers=headers
+    )
+    assert response.content_type == "application/msgpack"
+
+    response = await client.post(
+        "/json_only", json={"name": "Ivan"}, headers=headers
+    )
+    assert response.content_type == "application/json"
+    assert await response.json() == {"name": "Ivan"}
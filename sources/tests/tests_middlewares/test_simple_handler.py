@@ -126,3 +126,68 @@ async def test_response_text_and_status_500():
     assert "TypeError" in text
     assert "is not JSON serializable" in text
     assert status == 500
+
+
+@pytest.mark.asyncio
+async def test_get_json_dumps_bytes():
+    """ Получение bytes с json из объекта python
+    """
+    result = await simple_handler.get_json_dumps_bytes({}, {"foo": "bar"})
+    assert result == b'{"foo": "bar"}'
+
+
+@pytest.mark.asyncio
+async def test_response_bytes_and_status_200():
+    """ Получение bytes с json из объекта python со статусом по умолчанию
+    """
+    body, status = await simple_handler.get_response_bytes_and_status(
+        {}, {"foo": "bar"}, 200
+    )
+    assert body == b'{"foo": "bar"}'
+    assert status == 200
+
+
+@pytest.mark.asyncio
+async def test_response_bytes_and_status_500():
+    """ Получение bytes с json с описанием ошибки и статусом 500
+    """
+    not_json_serializable_object = complex(4, 3)
+
+    body, status = await simple_handler.get_response_bytes_and_status(
+        {}, not_json_serializable_object, 200
+    )
+    assert b"TypeError" in body
+    assert b"is not JSON serializable" in body
+    assert status == 500
+
+
+class TextSimpleHandler(SimpleHandler):
+
+    async def get_json_dumps(self, request, response_body):
+        return "text"
+
+
+@pytest.mark.asyncio
+async def test_get_response_with_text_hooks():
+    """ Если в наследнике переопределены "текстовые" методы дампа, то ответ
+        собирается через них
+    """
+    assert not simple_handler.text_hooks_overridden
+
+    handler = TextSimpleHandler()
+    assert handler.text_hooks_overridden
+
+    response = await handler.get_response({}, {"foo": "bar"}, 200)
+    assert response.text == "text"
+
+
+@pytest.mark.asyncio
+async def test_get_response_bytes():
+    """ Ответ собирается из bytes без промежуточной строки
+    """
+    response = await simple_handler.get_response({}, {"foo": "bar"}, 200)
+
+    assert response.body == b'{"foo": "bar"}'
+    assert response.status == 200
+    assert response.content_type == "application/json"
+    assert response.charset == "utf-8"
@@ -0,0 +1,233 @@
+""" Тесты потокового разбора json-тела запроса.
+"""
+import json
+
+import pytest
+from data_classes.person import PersonCreate
+from middlewares.exceptions import (InputDataValidationError,
+                                    InvalidRequestBody, RequestBodyTooDeep,
+                                    RequestBodyTooLarge)
+from middlewares.stream_body import (JSONArrayStream, StreamBodyOptions,
+                                     get_stream_body_options,
+                                     stream_request_body)
+from run_kwargs import get_app as get_kwargs_app
+from run_wraps import get_app as get_wraps_app
+
+
+class FakeContent:
+    """ Заменяет request.content (отдает данные блоками по size байт).
+    """
+    def __init__(self, data: bytes, size: int) -> None:
+        self.data = data
+        self.size = size
+
+    async def read(self, n: int) -> bytes:
+        chunk = self.data[:min(n, self.size)]
+        self.data = self.data[len(chunk):]
+        return chunk
+
+
+def get_stream(data: bytes, size: int = 1, **options) -> JSONArrayStream:
+    content = FakeContent(data, size)
+    return JSONArrayStream(content, StreamBodyOptions(**options))
+
+
+arrays = [
+    [],
+    [1, 22, 333, -4.5e10],
+    ["строка", {"name": "Иван"}, [1, [2, [3]]], True, False, None],
+    [{"name": f"name{n}"} for n in range(250)],
+]
+
+
+@pytest.mark.parametrize("size", [1, 2, 7, 64 * 1024])
+@pytest.mark.parametrize("array", arrays)
+async def test_iter_items(array, size):
+    """ Элементы массива разбираются при любом разбиении тела на блоки
+    """
+    data = json.dumps(array, ensure_ascii=False, indent=1).encode()
+
+    result = [item async for item in get_stream(data, size, chunk_size=7)]
+
+    assert result == array
+
+
+async def test_chunks():
+    """ Элементы можно получать порциями
+    """
+    data = json.dumps(list(range(10))).encode()
+
+    result = [chunk async for chunk in get_stream(data, chunk_size=4).chunks()]
+
+    assert result == [[0, 1, 2, 3], [4, 5, 6, 7], [8, 9]]
+
+
+@pytest.mark.parametrize(
+    "data",
+    [b"", b"{}", b"[1, 2", b"[1 2]", b"[1,]", b"[1] 2", b"[tru]", b"[1.]"],
+)
+async def test_invalid_body(data):
+    """ Ошибки в теле запроса
+    """
+    with pytest.raises(InvalidRequestBody):
+        [item async for item in get_stream(data)]
+
+
+async def test_max_body_size():
+    """ Тело запроса больше допустимого размера
+    """
+    data = json.dumps(list(range(100))).encode()
+
+    with pytest.raises(RequestBodyTooLarge):
+        [item async for item in get_stream(data, 16, max_body_size=100)]
+
+
+async def test_max_items():
+    """ Количество элементов больше допустимого
+    """
+    stream = get_stream(b"[1, 2, 3, 4]", max_items=3)
+    result = []
+
+    with pytest.raises(RequestBodyTooLarge):
+        async for item in stream:
+            result.append(item)
+
+    # Элементы сверх лимита не разбирались
+    assert stream.items_count == 4
+    assert result == []
+
+
+async def test_max_item_depth():
+    """ Вложенность элемента больше допустимой
+    """
+    stream = get_stream(
+        b'[{"a": [1]}, {"a": [[1]]}]', max_item_depth=2, chunk_size=1
+    )
+    result = []
+
+    with pytest.raises(RequestBodyTooDeep):
+        async for item in stream:
+            result.append(item)
+
+    assert result == [{"a": [1]}]
+
+
+async def test_deep_item():
+    """ Вложенность элемента, которую не может разобрать json (без
+        ограничения глубины)
+    """
+    data = b"[" + b"[" * 100000 + b"]" * 100000 + b"]"
+
+    with pytest.raises(RequestBodyTooDeep):
+        [item async for item in get_stream(data, 64 * 1024)]
+
+
+@pytest.mark.parametrize("size", [1, 7, 64 * 1024])
+async def test_max_item_size(size):
+    """ Элемент массива больше допустимого размера
+    """
+    data = b'[[1, 2], "12345678", [1, 2, 3, 4, 5, 6, 7]]'
+
+    stream = get_stream(data, size, max_item_size=10, chunk_size=1)
+    result = []
+
+    with pytest.raises(RequestBodyTooLarge):
+        async for item in stream:
+            result.append(item)
+
+    assert result == [[1, 2], "12345678"]
+
+
+class CountingDecoder(json.JSONDecoder):
+
+    calls = 0
+
+    def raw_decode(self, s, idx=0):
+        self.calls += 1
+        return super().raw_decode(s, idx)
+
+
+async def test_large_item_decode_calls():
+    """ Большой элемент, который приходит маленькими блоками, не
+        разбирается заново после каждого блока
+    """
+    item = [{"name": f"name{n}"} for n in range(10000)]
+    data = json.dumps([item, 1]).encode()
+
+    stream = get_stream(data, 1024)
+    stream.decoder = CountingDecoder()
+
+    assert [item async for item in stream] == [item, 1]
+    # Данных элемента - около 200 блоков
+    assert stream.decoder.calls < 20
+
+
+async def test_item_model_validation():
+    """ Валидация элементов порциями
+    """
+    stream = get_stream(b'[{"name": "Ivan"}]', item_model=PersonCreate)
+    assert [item async for item in stream] == [PersonCreate(name="Ivan")]
+
+    stream = get_stream(b'[{"name": 1}]', item_model=PersonCreate)
+    with pytest.raises(InputDataValidationError):
+        [item async for item in stream]
+
+
+def test_stream_request_body():
+    """ Декоратор сохраняет параметры потокового разбора в обработчике
+    """
+    async def handler(data):
+        pass
+
+    assert get_stream_body_options(handler) is None
+
+    decorated = stream_request_body(max_items=10)(handler)
+
+    assert get_stream_body_options(decorated) == StreamBodyOptions(
+        max_items=10
+    )
+
+
+@pytest.mark.parametrize("get_app", [get_kwargs_app, get_wraps_app])
+async def test_create_stream(aiohttp_client, get_app):
+    """ Создание записей о персонах из потока
+    """
+    client = await aiohttp_client(get_app())
+    persons = [{"name": f"name{n}"} for n in range(300)]
+
+    response = await client.post("/create_stream", json=persons)
+    response_json = await response.json()
+
+    assert response.status == 200
+
+    if get_app is get_wraps_app:
+        assert response_json["success"] is True
+        response_json = response_json["result"]
+
+    assert [person["name"] for person in response_json] == [
+        person["name"] for person in persons
+    ]
+
+
+@pytest.mark.parametrize("get_app", [get_kwargs_app, get_wraps_app])
+async def test_create_stream_errors(aiohttp_client, monkeypatch, get_app):
+    """ Ошибки потокового разбора тела запроса - статус 400 (413 для
+        слишком большого тела)
+    """
+    # Параметры обработчика собираются при старте приложения, поэтому они
+    # заменяются до создания клиента
+    options = StreamBodyOptions(max_body_size=10)
+    for module_name in ("handlers.kwargs", "handlers.wraps"):
+        monkeypatch.setattr(
+            f"{module_name}.create_stream.stream_body_options", options
+        )
+
+    client = await aiohttp_client(get_app())
+
+    response = await client.post("/create_stream", data=b"[{}, ")
+    assert response.status == 400
+
+    # Размер тела запроса известен заранее из Content-Length
+    response = await client.post("/create_stream", json=[{"name": "Ivan"}])
+    assert response.status == 413
+    assert "RequestBodyTooLarge" in await response.text()
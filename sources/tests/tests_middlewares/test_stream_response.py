@@ -0,0 +1,150 @@
+""" Тесты потоковых ответов middleware.
+"""
+import pytest
+from aiohttp import ClientPayloadError, web
+from data_classes.person import PersonInfo
+from middlewares.simple_handler import SimpleHandler
+from middlewares.utils import ArgumentsManager
+from middlewares.wraps_handler import WrapsKwargsHandler
+
+
+async def numbers(request: web.Request, data: dict):
+
+    for number in range(data["count"]):
+        if number == data.get("fail_on"):
+            raise Exception("Stream error")
+        yield number
+
+
+async def stream_handler(request: web.Request, data: dict):
+    return numbers(request, data)
+
+
+async def list_handler(request: web.Request, data: dict):
+    return list(range(data["count"]))
+
+
+def get_simple_app() -> web.Application:
+
+    app = web.Application()
+    app.router.add_post("/stream", stream_handler)
+    app.router.add_post("/list", list_handler)
+
+    service_handler = SimpleHandler(
+        stream_list_threshold=10, stream_chunk_size=3
+    )
+    app.middlewares.append(service_handler.middleware)
+
+    return app
+
+
+async def wraps_stream_handler(data: dict, request: web.Request):
+    return numbers(request, data)
+
+
+async def wraps_persons_handler(data: dict):
+    return [PersonInfo(id=f"{n:032x}", name="Ivan") for n in range(data)]
+
+
+def get_wraps_app() -> web.Application:
+
+    app = web.Application()
+    app.router.add_post("/stream", wraps_stream_handler)
+    app.router.add_post("/persons", wraps_persons_handler)
+
+    arguments_manager = ArgumentsManager()
+    arguments_manager.reg_request_body("data")
+
+    service_handler = WrapsKwargsHandler(
+        arguments_manager=arguments_manager,
+        stream_list_threshold=10, stream_chunk_size=3,
+    )
+    app.middlewares.append(service_handler.middleware)
+
+    return app
+
+
+@pytest.mark.parametrize("count", [0, 1, 3, 7])
+async def test_stream_async_iterator(aiohttp_client, count):
+    """ Асинхронный итератор отдается потоком
+    """
+    client = await aiohttp_client(get_simple_app())
+
+    response = await client.post("/stream", json={"count": count})
+
+    assert response.status == 200
+    assert response.headers["Transfer-Encoding"] == "chunked"
+    assert await response.json() == list(range(count))
+
+
+@pytest.mark.parametrize("count, chunked", [(9, False), (10, True)])
+async def test_stream_list_threshold(aiohttp_client, count, chunked):
+    """ Список отдается потоком, если его длина не меньше порога
+    """
+    client = await aiohttp_client(get_simple_app())
+
+    response = await client.post("/list", json={"count": count})
+
+    assert response.status == 200
+    assert (response.headers.get("Transfer-Encoding") == "chunked") is chunked
+    assert await response.json() == list(range(count))
+
+
+async def test_stream_error_simple(aiohttp_client):
+    """ Ошибка во время отправки потока - ответ не будет завершен
+    """
+    client = await aiohttp_client(get_simple_app())
+
+    response = await client.post("/stream", json={"count": 7, "fail_on": 5})
+
+    assert response.status == 200
+    with pytest.raises(ClientPayloadError):
+        await response.read()
+
+
+async def test_stream_wraps(aiohttp_client):
+    """ Поток в оболочке ответа
+    """
+    client = await aiohttp_client(get_wraps_app())
+
+    response = await client.post(
+        "/stream", json={"data": {"count": 7}, "id": 1}
+    )
+
+    assert response.status == 200
+    assert await response.json() == {
+        "id": 1, "result": list(range(7)), "success": True
+    }
+
+
+async def test_stream_wraps_models(aiohttp_client):
+    """ Элементы-модели в потоке отдаются так же, как и без потока
+    """
+    client = await aiohttp_client(get_wraps_app())
+
+    response = await client.post("/persons", json={"data": 10, "id": None})
+    response_json = await response.json()
+
+    assert response.headers["Transfer-Encoding"] == "chunked"
+    assert response_json["success"] is True
+    assert response_json["id"] is None
+    assert response_json["result"][1] == {
+        "id": "00000000-0000-0000-0000-000000000001", "name": "Ivan"
+    }
+
+
+async def test_stream_error_wraps(aiohttp_client):
+    """ Ошибка во время отправки потока в оболочке ответа - success=false,
+        описание ошибки в поле error
+    """
+    client = await aiohttp_client(get_wraps_app())
+
+    response = await client.post(
+        "/stream", json={"data": {"count": 7, "fail_on": 5}, "id": 2}
+    )
+    response_json = await response.json()
+
+    assert response_json["id"] == 2
+    assert response_json["result"] == list(range(3))
+    assert response_json["success"] is False
+    assert response_json["error"]["error_message"] == "Stream error"
@@ -0,0 +1,131 @@
+from typing import List, Optional, Union
+from uuid import uuid4
+
+import pytest
+from data_classes.person import PersonCreate, PersonInfo
+from data_classes.wraps import WrapRequest
+from middlewares.validation import (ModelValidator, is_validated_value,
+                                    validate)
+from pydantic import ValidationError, root_validator
+from valdec.errors import ValidationArgumentsError
+
+wrap_request_validator = ModelValidator(WrapRequest)
+person = PersonInfo(id=uuid4(), name="Ivan")
+
+valid_values = [
+    {},
+    {"data": None},
+    {"data": {"name": "Ivan"}, "id": 1},
+    {"data": [1, "2", {"3": 4}], "id": None},
+    {"id": 10},
+]
+
+
+@pytest.mark.parametrize("values", valid_values)
+def test_validate(values):
+    """ Результат валидации совпадает с полями экземпляра класса данных
+    """
+    wrap_request = WrapRequest(**values)
+
+    result = wrap_request_validator.validate(values)
+
+    assert result == dict(data=wrap_request.data, id=wrap_request.id)
+
+
+invalid_values = [
+    {"id": "1"},
+    {"id": True},
+    {"id": 1.5},
+    {"foo": "bar"},
+    {"data": 1, "id": "1", "foo": "bar"},
+]
+
+
+@pytest.mark.parametrize("values", invalid_values)
+def test_validate_errors(values):
+    """ Ошибки валидации совпадают с ошибками при создании экземпляра
+    """
+    with pytest.raises(ValidationError) as model_error:
+        WrapRequest(**values)
+
+    with pytest.raises(ValidationError) as validator_error:
+        wrap_request_validator.validate(values)
+
+    assert str(validator_error.value) == str(model_error.value)
+
+
+def test_validate_required_field():
+    """ Отсутствует обязательное поле
+    """
+    with pytest.raises(ValidationError) as error:
+        ModelValidator(PersonCreate).validate({"foo": "bar"})
+
+    assert str(error.value) == (
+        "2 validation errors for PersonCreate\n"
+        "name\n  field required (type=value_error.missing)\n"
+        "foo\n  extra fields not permitted (type=value_error.extra)"
+    )
+
+
+def test_validate_not_dict():
+    """ Значение для валидации должно быть словарем
+    """
+    with pytest.raises(TypeError):
+        wrap_request_validator.validate([1, 2])
+
+
+def test_root_validators_not_supported():
+    """ Валидаторы уровня класса не поддерживаются
+    """
+    class SomeModel(PersonCreate):
+
+        @root_validator
+        def check(cls, values):
+            return values
+
+    with pytest.raises(ValueError):
+        ModelValidator(SomeModel)
+
+
+validated_params = [
+    (PersonInfo, person, True),
+    (PersonCreate, person, False),
+    (Union[PersonInfo, List[PersonInfo]], person, True),
+    (Union[PersonInfo, List[PersonInfo]], [person, person], True),
+    (List[PersonInfo], [person, {"id": uuid4(), "name": "Ivan"}], False),
+    (List[PersonInfo], [], True),
+    (List[int], [1, 2], False),
+    (PersonInfo, person.dict(), False),
+    (Optional[PersonInfo], None, False),
+]
+
+
+@pytest.mark.parametrize("annotation, value, result", validated_params)
+def test_is_validated_value(annotation, value, result):
+    """ Проверка того, что значение уже является проверенным экземпляром
+        класса данных (или списком экземпляров)
+    """
+    assert is_validated_value(annotation, value) is result
+
+
+async def test_validate_skips_validated_models():
+    """ Декоратор validate не проверяет повторно экземпляры классов данных,
+        но проверяет остальные значения
+    """
+    calls = []
+
+    @validate("data", "return")
+    async def handler(data: PersonInfo) -> List[PersonInfo]:
+        calls.append(data)
+        return [data, data]
+
+    result = await handler(data=person)
+
+    assert calls[0] is person
+    assert result[0] is person
+
+    result = await handler(data=person.dict())
+    assert calls[1] == person
+
+    with pytest.raises(ValidationArgumentsError):
+        await handler(data={"id": "wrong", "name": "Ivan"})
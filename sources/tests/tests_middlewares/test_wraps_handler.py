@@ -0,0 +1,197 @@
+import json
+from uuid import uuid4
+
+import pytest
+from data_classes.person import PersonInfo
+from data_classes.wraps import WrapResponse
+from middlewares.exceptions import InputDataValidationError
+from middlewares.utils import ArgumentsManager, json_dumps
+from middlewares.wraps_handler import KEY_NAME_FOR_ID, WrapsKwargsHandler
+from run_wraps import get_app
+
+arguments_manager = ArgumentsManager()
+arguments_manager.reg_request_body("data")
+
+handlers = [
+    WrapsKwargsHandler(arguments_manager=arguments_manager),
+    WrapsKwargsHandler(
+        arguments_manager=arguments_manager, strict_envelope_validation=True
+    ),
+]
+handlers_ids = ["fast", "strict"]
+
+
+async def some_handler(data: dict):
+    return [PersonInfo(id=uuid4(), name=data["name"]), data]
+
+
+@pytest.mark.parametrize("handler", handlers, ids=handlers_ids)
+async def test_run_handler(handler):
+    """ Запуск обработчика и получение оболочки ответа
+    """
+    request = {}
+    request_body = {"data": {"name": "Ivan"}, "id": 1}
+
+    result = await handler.run_handler(request, some_handler, request_body)
+
+    person = result["result"][0]
+    expected = WrapResponse(result=[person, request_body["data"]], id=1)
+    assert json.loads(handler.json_codec.dumps(result)) == json.loads(
+        json_dumps(expected.dict())
+    )
+    assert request[KEY_NAME_FOR_ID] == 1
+
+
+@pytest.mark.parametrize("handler", handlers, ids=handlers_ids)
+@pytest.mark.parametrize(
+    "request_body", [{"data": {}, "id": "1"}, {"foo": "bar"}, "foo", None]
+)
+async def test_run_handler_envelope_errors(handler, request_body):
+    """ Ошибки в оболочке запроса
+    """
+    with pytest.raises(InputDataValidationError):
+        await handler.run_handler({}, some_handler, request_body)
+
+
+@pytest.mark.parametrize("handler", handlers, ids=handlers_ids)
+def test_get_error_body(handler):
+    """ Тело ответа с ошибкой в оболочке ответа
+    """
+    error = Exception("Some error message")
+
+    error_body = handler.get_error_body({KEY_NAME_FOR_ID: 2}, error)
+
+    assert error_body["success"] is False
+    assert error_body["id"] == 2
+    assert error_body["result"]["error_message"] == "Some error message"
+
+
+async def test_read_many_envelope(aiohttp_client):
+    """ Пакетное чтение в оболочках запроса и ответа
+    """
+    client = await aiohttp_client(get_app())
+
+    response = await client.post(
+        "/create", json={"data": [{"name": "Ivan"}, {"name": "Oleg"}]}
+    )
+    created = (await response.json())["result"]
+    missing_id = str(uuid4())
+
+    response = await client.post("/read_many", json={
+        "data": [created[0]["id"], missing_id, created[1]["id"]], "id": 5
+    })
+
+    assert response.status == 200
+    assert await response.json() == {
+        "success": True,
+        "result": {"found": created, "missing": [missing_id]},
+        "id": 5,
+    }
+
+    response = await client.post(
+        "/read_many", json={"data": ["wrong_uuid"], "id": 6}
+    )
+    response_json = await response.json()
+
+    assert response.status == 400
+    assert response_json["success"] is False
+    assert response_json["id"] == 6
+
+
+@pytest.mark.parametrize("handler", handlers, ids=handlers_ids)
+async def test_run_handler_batch(handler):
+    """ Пакет запросов: ответы в том же порядке, ошибка в одном запросе не
+        влияет на остальные
+    """
+    request = {}
+    request_body = [
+        {"data": {"name": "Ivan"}, "id": 1},
+        {"data": {}, "id": 2},
+        {"data": {"name": "Oleg"}, "id": "3"},
+    ]
+
+    result = await handler.run_handler(request, some_handler, request_body)
+
+    assert [item["id"] for item in result] == [1, 2, None]
+    assert [item["success"] for item in result] == [True, False, False]
+    assert result[0]["result"][1] == {"name": "Ivan"}
+    assert not handler.is_stream_response_body(request, result)
+
+
+async def test_run_handler_batch_too_large():
+    """ Пакет больше batch_max_size
+    """
+    handler = WrapsKwargsHandler(
+        arguments_manager=arguments_manager, batch_max_size=1
+    )
+
+    with pytest.raises(InputDataValidationError):
+        await handler.run_handler(
+            {}, some_handler, [{"data": {}}, {"data": {}}]
+        )
+
+
+@pytest.mark.parametrize("handler", handlers, ids=handlers_ids)
+async def test_run_handler_batch_duplicate_ids(handler):
+    """ Пакет с повторяющимися id запросов отклоняется целиком (пустые и
+        некорректные id могут повторяться)
+    """
+    with pytest.raises(InputDataValidationError, match="id 1"):
+        await handler.run_handler({}, some_handler, [
+            {"data": {}, "id": 1}, {"data": {}, "id": 2},
+            {"data": {}, "id": 1},
+        ])
+
+    result = await handler.run_handler({}, some_handler, [
+        {"data": {}}, {"data": {}, "id": None}, {"data": {}, "id": "1"},
+        {"data": {}, "id": "1"}, {"data": {}, "id": 1},
+    ])
+    assert [item["id"] for item in result] == [None, None, None, None, 1]
+
+
+async def test_batch_duplicate_ids(aiohttp_client):
+    """ Ответ на пакет с повторяющимися id - ответ с ошибкой, статус 400
+    """
+    client = await aiohttp_client(get_app())
+
+    response = await client.post("/create", json=[
+        {"data": [{"name": "Ivan"}], "id": 1},
+        {"data": [{"name": "Oleg"}], "id": 1},
+    ])
+    response_json = await response.json()
+
+    assert response.status == 400
+    assert response_json["success"] is False
+    assert "id 1" in response_json["result"]["error_message"]
+
+
+async def test_batch_envelope(aiohttp_client):
+    """ Пакет запросов к разным апи-методам
+    """
+    client = await aiohttp_client(get_app())
+
+    response = await client.post("/create", json=[
+        {"data": [{"name": "Ivan"}], "id": 1},
+        {"data": [{"name": "Oleg"}], "id": 2},
+    ])
+    response_json = await response.json()
+
+    assert response.status == 200
+    assert [item["id"] for item in response_json] == [1, 2]
+    ivan = response_json[0]["result"][0]
+
+    response = await client.post("/create", json=[
+        {"data": ivan["id"], "id": 3, "method": "read"},
+        {"data": [{"name": "Olga"}], "id": 4},
+        {"data": "wrong_uuid", "id": 5, "method": "read"},
+        {"data": ivan["id"], "id": 6, "method": "unknown"},
+    ])
+    response_json = await response.json()
+
+    assert response.status == 200
+    assert response_json[0] == {"success": True, "result": ivan, "id": 3}
+    assert response_json[1]["result"][0]["name"] == "Olga"
+    assert response_json[2]["success"] is False
+    assert response_json[2]["id"] == 5
+    assert response_json[3]["success"] is False
+    assert "unknown" in response_json[3]["result"]["error_message"]
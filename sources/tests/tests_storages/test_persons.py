@@ -0,0 +1,124 @@
+from uuid import UUID, uuid4
+
+import pytest
+from handlers import kwargs, wraps
+from storages.persons import PersonStorage, get_key_bytes
+
+
+@pytest.mark.parametrize("key", [uuid4(), str(uuid4())])
+async def test_put_get(key):
+    """ Запись возвращается с id того же типа, что и ключ
+    """
+    storage = PersonStorage()
+
+    await storage.put(key, {"id": key, "name": "Ivan"})
+
+    assert await storage.get(key) == {"id": key, "name": "Ivan"}
+    assert await storage.get(str(key)) == {"id": str(key), "name": "Ivan"}
+    assert await storage.get(UUID(str(key))) == {
+        "id": UUID(str(key)), "name": "Ivan"
+    }
+
+
+async def test_get_many():
+    """ Пакетное чтение записей
+    """
+    storage = PersonStorage()
+    persons = {uuid4(): f"name{n}" for n in range(100)}
+
+    await storage.put_many(
+        {key: {"id": key, "name": name} for key, name in persons.items()}
+    )
+
+    keys = list(persons) + [uuid4(), "wrong id"]
+    result = await storage.get_many(keys)
+
+    assert result == {
+        key: {"id": key, "name": name} for key, name in persons.items()
+    }
+
+
+async def test_delete():
+    """ Удаление записи
+    """
+    storage = PersonStorage()
+    first, second = uuid4(), uuid4()
+
+    await storage.put(first, {"id": first, "name": "Ivan"})
+    await storage.put(second, {"id": second, "name": "Oleg"})
+
+    assert await storage.delete(first) is True
+    assert await storage.delete(first) is False
+    assert await storage.get(first) is None
+
+    # Хранится только 16 байт UUID и имя
+    assert storage.names == {second.bytes: "Oleg"}
+    assert len(storage) == 1
+
+
+async def test_none_name():
+    """ Запись с именем None хранится (как в словаре)
+    """
+    storage = PersonStorage()
+    key = uuid4()
+
+    await storage.put(key, {"id": key, "name": None})
+
+    assert await storage.get(key) == {"id": key, "name": None}
+    assert await storage.get_many([key]) == {key: {"id": key, "name": None}}
+    assert await storage.delete(key) is True
+    assert await storage.get(key) is None
+
+
+async def test_put_errors():
+    """ Ошибки при сохранении записи
+    """
+    storage = PersonStorage()
+    key = uuid4()
+
+    with pytest.raises(ValueError):
+        await storage.put(key, {"id": uuid4(), "name": "Ivan"})
+
+    with pytest.raises(ValueError):
+        await storage.put("key", {"id": "key", "name": "Ivan"})
+
+
+@pytest.mark.parametrize("key", ["wrong id", None, 1])
+def test_get_key_bytes_wrong_key(key):
+    """ Ключ, который не является UUID
+    """
+    assert get_key_bytes(key) is None
+
+
+@pytest.mark.parametrize("module", [kwargs, wraps])
+async def test_handlers(module):
+    """ Обработчики create и read работают с хранилищем персон, формат их
+        результатов не меняется
+    """
+    storage = PersonStorage()
+    data = [{"name": "Ivan"}, {"name": "Oleg"}]
+
+    created = await module.create(data=data, storage=storage)
+
+    for person in created:
+        person_id = person["id"] if module is kwargs else person.id
+        kwargs_ = dict(data=person_id, storage=storage)
+        if module is wraps:
+            kwargs_["req"] = {}
+
+        assert await module.read(**kwargs_) == person
+
+    with pytest.raises(module.PersonNotFound):
+        kwargs_["data"] = "wrong id" if module is kwargs else uuid4()
+        await module.read(**kwargs_)
+
+
+async def test_kwargs_handlers_none_name():
+    """ Запись без валидации имени (обработчики kwargs) читается после
+        создания
+    """
+    storage = PersonStorage()
+
+    created = await kwargs.create(data={"name": None}, storage=storage)
+
+    assert await kwargs.read(data=created["id"], storage=storage) == created
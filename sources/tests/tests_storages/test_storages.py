@@ -0,0 +1,133 @@
+from uuid import uuid4
+
+import pytest
+from storages.factory import get_storage
+from storages.memory import MemoryStorage
+from storages.sharded import ShardedStorage
+from storages.sqlite import SQLiteStorage
+
+
+storages_names = ["memory", "sqlite", "sharded_memory", "sharded_sqlite"]
+
+
+@pytest.fixture(params=storages_names)
+async def storage(request, tmp_path):
+    """ Экземпляры всех видов хранилищ
+    """
+    path = str(tmp_path / "storage.sqlite3")
+
+    if request.param == "memory":
+        storage = MemoryStorage()
+    elif request.param == "sqlite":
+        storage = SQLiteStorage(path)
+    elif request.param == "sharded_memory":
+        storage = get_storage("memory", shards=3)
+    else:
+        storage = get_storage("sqlite", path, shards=3)
+
+    yield storage
+
+    await storage.close()
+
+
+async def test_put_get(storage):
+    """ Сохранение и чтение записи
+    """
+    key = uuid4()
+    person = {"id": key, "name": "Ivan"}
+
+    await storage.put(key, person)
+
+    assert await storage.get(key) == person
+    assert await storage.get(uuid4()) is None
+
+
+async def test_put_many_get_many(storage):
+    """ Пакетное сохранение и чтение записей
+    """
+    persons = {str(uuid4()): {"id": n, "name": f"name{n}"} for n in range(700)}
+
+    await storage.put_many(persons)
+
+    missing = [str(uuid4()) for _ in range(5)]
+    result = await storage.get_many(list(persons) + missing)
+
+    assert result == persons
+
+
+async def test_overwrite(storage):
+    """ Запись с тем же ключом заменяется
+    """
+    await storage.put("key", {"name": "Ivan"})
+    await storage.put_many({"key": {"name": "Oleg"}})
+
+    assert await storage.get("key") == {"name": "Oleg"}
+
+
+async def test_delete(storage):
+    """ Удаление записи
+    """
+    await storage.put("key", {"name": "Ivan"})
+
+    assert await storage.delete("key") is True
+    assert await storage.delete("key") is False
+    assert await storage.get("key") is None
+
+
+@pytest.mark.parametrize("value", ["text", 1, [1, 2], (1, 2), {"a": [1]}])
+async def test_values(storage, value):
+    """ Записи могут быть не только словарями
+    """
+    await storage.put("key", value)
+
+    assert await storage.get("key") == value
+
+
+async def test_memory_storage_shapes():
+    """ Имена полей хранятся один раз для записей с одинаковым набором полей
+    """
+    storage = MemoryStorage()
+
+    await storage.put_many({n: {"id": n, "name": "Ivan"} for n in range(10)})
+    await storage.put("other", {"name": "Ivan", "id": 1})
+
+    assert storage.shapes_fields == [("id", "name"), ("name", "id")]
+    assert len(storage) == 11
+
+
+async def test_sqlite_storage_persistent(tmp_path):
+    """ Записи в SQLiteStorage сохраняются после закрытия хранилища
+    """
+    path = str(tmp_path / "storage.sqlite3")
+
+    storage = SQLiteStorage(path)
+    await storage.put("key", {"name": "Ivan"})
+    await storage.close()
+
+    storage = SQLiteStorage(path)
+    assert await storage.get("key") == {"name": "Ivan"}
+    await storage.close()
+
+
+def test_sharded_storage_shard_index():
+    """ Номер шарда для ключа не зависит от hash()
+    """
+    storage = ShardedStorage([MemoryStorage() for _ in range(4)])
+
+    assert storage.get_shard_index("key") == 1
+    assert {storage.get_shard_index(n) for n in range(100)} == {0, 1, 2, 3}
+
+    with pytest.raises(ValueError):
+        ShardedStorage([])
+
+
+def test_get_storage():
+    """ Создание хранилища по настройкам
+    """
+    assert isinstance(get_storage("memory"), MemoryStorage)
+
+    with pytest.raises(ValueError):
+        get_storage("sqlite")
+
+    with pytest.raises(ValueError):
+        get_storage("unknown")